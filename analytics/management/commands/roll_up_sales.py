@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollup import rebuild, roll_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Counts the orders placed since the last run into the daily sales '
+        'summaries'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag',
+            type=int,
+            help=(
+                'Seconds an order must be old before it is counted '
+                '(ANALYTICS_ROLLUP_LAG_SECONDS by default)'
+            ),
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Orders counted per transaction',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Empty the summaries and recount every order',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rebuild()
+        result = roll_up(lag=options['lag'], batch_size=options['batch_size'])
+        if result.skipped:
+            self.stdout.write(
+                self.style.WARNING('Another rollup is running; nothing done.')
+            )
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rolled up {result.orders} orders; the summaries now cover "
+                f"orders up to {result.last_order_id}."
+            )
+        )
@@ -0,0 +1,113 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import models
+
+
+class DailyProductSales(models.Model):
+    """
+    Units and revenue of one product over the orders placed on one day, kept up
+    to date by analytics.rollup so sales reports never scan the order tables.
+
+    Attributes:
+        day (DateField): The day the orders were placed on (in the project time
+            zone).
+        product (ForeignKey): The product sold.
+        units (PositiveIntegerField): Units of the product ordered that day.
+        revenue (DecimalField): Revenue of those units at the prices frozen at
+            checkout.
+    """
+
+    day = models.DateField()
+    product = models.ForeignKey(
+        'products.Product', on_delete=models.CASCADE, related_name='daily_sales'
+    )
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal('0')
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'product'], name='daily_product_sales_unique'
+            ),
+        ]
+        indexes = [
+            # Top sellers over a range of days.
+            models.Index(
+                fields=['day', 'product', 'units', 'revenue'],
+                name='daily_product_sales_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"DailyProductSales(product={self.product_id}, day={self.day}, "
+            f"units={self.units})"
+        )
+
+
+class DailyUserOrders(models.Model):
+    """
+    Number and value of the orders one user placed on one day, kept up to date
+    by analytics.rollup.
+
+    Attributes:
+        day (DateField): The day the orders were placed on (in the project time
+            zone).
+        user (ForeignKey): The ordering user.
+        orders (PositiveIntegerField): Orders the user placed that day.
+        revenue (DecimalField): The sum of their stored totals.
+    """
+
+    day = models.DateField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='daily_orders',
+    )
+    orders = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal('0')
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'user'], name='daily_user_orders_unique'
+            ),
+        ]
+        indexes = [
+            # Revenue by day and top customers over a range of days.
+            models.Index(
+                fields=['day', 'user', 'orders', 'revenue'],
+                name='daily_user_orders_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"DailyUserOrders(user={self.user_id}, day={self.day}, "
+            f"orders={self.orders})"
+        )
+
+
+class RollupWatermark(models.Model):
+    """
+    How far the rollups have read the orders: every order up to `last_order_id`
+    is counted in the summary tables, none after it. A single row, locked while
+    a rollup runs.
+
+    Attributes:
+        name (CharField): The rollup the watermark belongs to.
+        last_order_id (BigIntegerField): The highest order ID counted.
+        updated_at (DateTimeField): When the rollup last ran.
+    """
+
+    name = models.CharField(max_length=50, primary_key=True)
+    last_order_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"RollupWatermark({self.name}={self.last_order_id})"
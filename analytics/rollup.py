@@ -0,0 +1,184 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.models import CartItem, Order
+from .models import DailyProductSales, DailyUserOrders, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = 'sales'
+
+
+class RollupResult:
+    """
+    Totals of a rollup run.
+
+    Attributes:
+        orders (int): Orders counted into the summary tables.
+        last_order_id (int): The watermark after the run.
+        skipped (bool): Whether the run was skipped because another rollup held
+            the watermark.
+    """
+
+    def __init__(self, last_order_id=0):
+        self.orders = 0
+        self.last_order_id = last_order_id
+        self.skipped = False
+
+
+def roll_up(lag=None, batch_size=1000, now=None):
+    """
+    Counts the orders placed since the watermark into the daily summary tables,
+    batch by batch.
+
+    Orders are read in ID order. A run stops at the first order younger than
+    `lag` seconds: an order ID is taken when its checkout starts, so a younger
+    order may still be uncommitted behind a committed one with a higher ID, and
+    counting past it would skip it for good. Each batch updates the tables and
+    moves the watermark in one transaction, with the watermark row locked (SKIP
+    LOCKED where supported), so concurrent runs never count an order twice; a
+    run that finds the watermark locked returns at once.
+
+    Args:
+        lag (int): Seconds an order must have been placed for before it is
+            counted (settings.ANALYTICS_ROLLUP_LAG_SECONDS by default).
+        batch_size (int): Orders counted per transaction.
+        now (datetime): The current time, for tests.
+
+    Returns:
+        RollupResult: The number of orders counted and the new watermark.
+    """
+    lag = settings.ANALYTICS_ROLLUP_LAG_SECONDS if lag is None else lag
+    cutoff = (now or timezone.now()) - timedelta(seconds=lag)
+    RollupWatermark.objects.get_or_create(name=WATERMARK)
+    result = RollupResult()
+
+    while True:
+        with transaction.atomic():
+            watermark = (
+                RollupWatermark.objects.select_for_update(skip_locked=True)
+                .filter(name=WATERMARK)
+                .first()
+            )
+            if watermark is None:
+                result.skipped = True
+                return result
+            result.last_order_id = watermark.last_order_id
+
+            pending = (
+                Order.objects.filter(pk__gt=watermark.last_order_id)
+                .order_by('pk')
+                .values_list('pk', 'ordered_at')
+            )
+            batch = []
+            for pk, ordered_at in pending[:batch_size]:
+                if ordered_at > cutoff:
+                    break
+                batch.append(pk)
+            if not batch:
+                return result
+
+            count_orders(watermark.last_order_id, batch[-1])
+            watermark.last_order_id = batch[-1]
+            watermark.save(update_fields=['last_order_id', 'updated_at'])
+            result.orders += len(batch)
+            result.last_order_id = watermark.last_order_id
+
+        logger.info(
+            f"Rolled up {len(batch)} orders into the sales summaries, up to "
+            f"order {batch[-1]}."
+        )
+        if len(batch) < batch_size:
+            return result
+
+
+def count_orders(after_id, last_id):
+    """
+    Adds the orders with IDs in (`after_id`, `last_id`] to the summary tables,
+    aggregating them in the database: one query per table, grouped by day and
+    product or user.
+    """
+    lines = CartItem.objects.filter(
+        cart__order__pk__gt=after_id, cart__order__pk__lte=last_id
+    )
+    product_rows = lines.values(
+        'product_id', day=TruncDate('cart__order__ordered_at')
+    ).annotate(
+        units=Sum('quantity'),
+        revenue=Sum(
+            F('quantity') * F('unit_price'),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+    )
+    accumulate(
+        DailyProductSales, 'product_id', product_rows, ['units', 'revenue']
+    )
+
+    orders = Order.objects.filter(pk__gt=after_id, pk__lte=last_id)
+    user_rows = orders.values('user_id', day=TruncDate('ordered_at')).annotate(
+        orders=Count('pk'),
+        revenue=Sum('total_price'),
+    )
+    accumulate(DailyUserOrders, 'user_id', user_rows, ['orders', 'revenue'])
+
+
+def accumulate(model, key, rows, fields):
+    """
+    Adds aggregated rows to a summary table keyed by `day` and `key`: existing
+    rows are incremented with `bulk_update`, the others inserted with
+    `bulk_create`. Callers hold the watermark lock, so no other rollup writes
+    the table meanwhile.
+
+    Args:
+        model: DailyProductSales or DailyUserOrders.
+        key (str): The other key column, `product_id` or `user_id`.
+        rows: Dicts holding `day`, `key` and the `fields` to add.
+        fields (list): The counter columns.
+    """
+    rows = {(row['day'], row[key]): row for row in rows}
+    if not rows:
+        return
+    existing = model.objects.filter(
+        day__in={day for day, _ in rows},
+        **{f'{key}__in': {key_id for _, key_id in rows}}
+    )
+    changed = []
+    for summary in existing:
+        row = rows.pop((summary.day, getattr(summary, key)), None)
+        if row is None:
+            continue
+        for field in fields:
+            setattr(summary, field, getattr(summary, field) + (row[field] or 0))
+        changed.append(summary)
+    model.objects.bulk_update(changed, fields, batch_size=500)
+    model.objects.bulk_create(
+        [
+            model(
+                day=day,
+                **{key: key_id},
+                **{field: row[field] or 0 for field in fields},
+            )
+            for (day, key_id), row in rows.items()
+        ],
+        batch_size=500,
+    )
+
+
+def rebuild():
+    """
+    Empties the summary tables and resets the watermark, so the next rollup
+    recounts every order (e.g. after orders were edited or deleted, which
+    rollups do not follow).
+    """
+    with transaction.atomic():
+        RollupWatermark.objects.update_or_create(
+            name=WATERMARK, defaults={'last_order_id': 0}
+        )
+        DailyProductSales.objects.all().delete()
+        DailyUserOrders.objects.all().delete()
@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+
+MAX_REPORT_DAYS = 366
+# Revenue summed over up to MAX_REPORT_DAYS days of the 14-digit summary
+# columns.
+REVENUE_MAX_DIGITS = 20
+
+
+class ReportParamsSerializer(serializers.Serializer):
+    """
+    Validates the query parameters of the analytics reports. Without `start` and
+    `end`, reports cover the 30 days up to today.
+    """
+    start = serializers.DateField(
+        required=False, help_text='First day of the report (inclusive)'
+    )
+    end = serializers.DateField(
+        required=False,
+        help_text='Last day of the report (inclusive, today by default)',
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        default=10,
+        min_value=1,
+        max_value=100,
+        help_text='Maximum number of rows of ranked reports',
+    )
+    order_by = serializers.ChoiceField(
+        choices=['units', 'orders', 'revenue'],
+        required=False,
+        help_text=(
+            'What ranked reports are sorted by (units or orders by default)'
+        ),
+    )
+
+    def validate(self, data):
+        data.setdefault('end', timezone.localdate())
+        data.setdefault('start', data['end'] - timedelta(days=29))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError('start must not be after end.')
+        if (data['end'] - data['start']).days >= MAX_REPORT_DAYS:
+            raise serializers.ValidationError(
+                f'Reports cover at most {MAX_REPORT_DAYS} days.'
+            )
+        return data
+
+
+class TopProductSerializer(serializers.Serializer):
+    """
+    A row of the top products report. Revenue is a two-decimal string like other
+    amounts.
+    """
+    product_id = serializers.IntegerField()
+    name = serializers.CharField(source='product__name')
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(
+        max_digits=REVENUE_MAX_DIGITS, decimal_places=2)
+
+
+class DailyRevenueSerializer(serializers.Serializer):
+    """A row of the revenue by day report."""
+    day = serializers.DateField()
+    orders = serializers.IntegerField()
+    revenue = serializers.DecimalField(
+        max_digits=REVENUE_MAX_DIGITS, decimal_places=2)
+
+
+class TopCustomerSerializer(serializers.Serializer):
+    """A row of the top customers report."""
+    user_id = serializers.IntegerField()
+    username = serializers.CharField(source='user__username')
+    orders = serializers.IntegerField()
+    revenue = serializers.DecimalField(
+        max_digits=REVENUE_MAX_DIGITS, decimal_places=2)
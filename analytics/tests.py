@@ -0,0 +1,268 @@
+import datetime
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from orders.models import CartItem, Order, ShoppingCart
+from products.models import Product
+from .models import DailyProductSales, DailyUserOrders, RollupWatermark
+from .rollup import WATERMARK, rebuild, roll_up
+
+
+class AnalyticsTestMixin:
+    """Shared fixtures for the analytics test cases."""
+
+    @classmethod
+    def create_order(cls, user, lines, ordered_at):
+        """
+        Creates a checked-out cart with the given (product, quantity) lines and
+        its order.
+        """
+        cart = ShoppingCart.objects.create(user=user, status='completed')
+        for product, quantity in lines:
+            CartItem.objects.create(
+                cart=cart, product=product, quantity=quantity
+            )
+        order = Order.objects.create(
+            cart=cart,
+            user=user,
+            delivery_date=datetime.date(2024, 3, 1),
+            delivery_time=datetime.time(12, 0),
+            total_price=cart.items.freeze_prices(),
+        )
+        Order.objects.filter(pk=order.pk).update(ordered_at=ordered_at)
+        return order
+
+
+def at(day, hour=12):
+    return datetime.datetime(2024, 3, day, hour, tzinfo=datetime.timezone.utc)
+
+
+class RollupTests(AnalyticsTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.garage = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.fleet = User.objects.create_user(
+            'fleet', 'fleet@example.com', 'secret'
+        )
+        cls.filter = Product.objects.create(
+            name='Toyota Air Filter',
+            description='Filter.',
+            price=Decimal('25.99'),
+            stock_quantity=50,
+        )
+        cls.pads = Product.objects.create(
+            name='Brake Pads',
+            description='Pads.',
+            price=Decimal('45.00'),
+            stock_quantity=50,
+        )
+        cls.create_order(cls.garage, [(cls.filter, 3), (cls.pads, 2)], at(1))
+        cls.create_order(cls.fleet, [(cls.pads, 1)], at(1, 18))
+        cls.create_order(cls.garage, [(cls.filter, 1)], at(2))
+
+    def product_sales(self):
+        return {
+            (row.day.day, row.product_id): (row.units, row.revenue)
+            for row in DailyProductSales.objects.all()
+        }
+
+    def user_orders(self):
+        return {
+            (row.day.day, row.user_id): (row.orders, row.revenue)
+            for row in DailyUserOrders.objects.all()
+        }
+
+    def test_rolls_up_per_day_product_and_user(self):
+        result = roll_up(lag=0)
+        self.assertEqual(result.orders, 3)
+        self.assertEqual(self.product_sales(), {
+            (1, self.filter.pk): (3, Decimal('77.97')),
+            (1, self.pads.pk): (3, Decimal('135.00')),
+            (2, self.filter.pk): (1, Decimal('25.99')),
+        })
+        self.assertEqual(self.user_orders(), {
+            (1, self.garage.pk): (1, Decimal('167.97')),
+            (1, self.fleet.pk): (1, Decimal('45.00')),
+            (2, self.garage.pk): (1, Decimal('25.99')),
+        })
+
+    def test_later_runs_only_add_new_orders(self):
+        roll_up(lag=0, batch_size=2)
+        order = self.create_order(self.garage, [(self.filter, 2)], at(2, 15))
+        result = roll_up(lag=0)
+        self.assertEqual((result.orders, result.last_order_id), (1, order.pk))
+        self.assertEqual(
+            self.product_sales()[(2, self.filter.pk)], (3, Decimal('77.97'))
+        )
+        self.assertEqual(
+            self.user_orders()[(2, self.garage.pk)], (2, Decimal('77.97'))
+        )
+        self.assertEqual(roll_up(lag=0).orders, 0)
+
+    def test_stops_at_orders_younger_than_the_lag(self):
+        now = timezone.now()
+        recent = self.create_order(self.fleet, [(self.filter, 1)], now)
+        self.create_order(
+            self.fleet, [(self.filter, 1)], now - datetime.timedelta(hours=1)
+        )
+        result = roll_up(lag=60, now=now)
+        # The order after the recent one is older, but counting it would move
+        # the watermark past an order that may not be committed.
+        self.assertEqual(
+            (result.orders, result.last_order_id), (3, recent.pk - 1)
+        )
+        self.assertEqual(
+            roll_up(lag=60, now=now + datetime.timedelta(minutes=2)).orders, 2
+        )
+
+    def test_rebuild_recounts_every_order(self):
+        roll_up(lag=0)
+        Order.objects.filter(user=self.fleet).delete()
+        rebuild()
+        roll_up(lag=0)
+        self.assertEqual(
+            set(self.user_orders()), {(1, self.garage.pk), (2, self.garage.pk)}
+        )
+        self.assertEqual(
+            RollupWatermark.objects.get(name=WATERMARK).last_order_id,
+            Order.objects.latest('pk').pk,
+        )
+
+    def test_checkout_leaves_the_rollup_to_the_command(self):
+        client = APIClient()
+        client.force_authenticate(self.fleet)
+        client.post(
+            '/add-to-cart/', {'product_id': self.filter.pk, 'quantity': 2}
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(
+                client.post(
+                    '/create-order/', {'delivery_date': '2024-03-01'}
+                ).status_code,
+                201,
+            )
+        self.assertFalse(
+            DailyUserOrders.objects.filter(
+                user=self.fleet, day=timezone.localdate()
+            ).exists()
+        )
+        roll_up(lag=0)
+        self.assertEqual(
+            DailyUserOrders.objects.get(
+                user=self.fleet, day=timezone.localdate()
+            ).revenue,
+            Decimal('51.98'),
+        )
+
+
+class AnalyticsApiTests(AnalyticsTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'analyst', 'analyst@example.com', 'secret'
+        )
+        cls.garage = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.filter = Product.objects.create(
+            name='Toyota Air Filter',
+            description='Filter.',
+            price=Decimal('25.99'),
+            stock_quantity=50,
+        )
+        cls.pads = Product.objects.create(
+            name='Brake Pads',
+            description='Pads.',
+            price=Decimal('45.00'),
+            stock_quantity=50,
+        )
+        cls.create_order(cls.garage, [(cls.filter, 3), (cls.pads, 2)], at(1))
+        cls.create_order(cls.admin, [(cls.pads, 1)], at(2))
+        roll_up(lag=0)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, path, **params):
+        response = self.client.get(
+            path, dict(start='2024-03-01', end='2024-03-31', **params)
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_top_products(self):
+        with self.assertNumQueries(1):
+            rows = self.get('/analytics/top-products/')
+        self.assertEqual(
+            [(row['name'], row['units']) for row in rows],
+            [('Brake Pads', 3), ('Toyota Air Filter', 3)],
+        )
+        rows = self.get('/analytics/top-products/', order_by='revenue', limit=1)
+        self.assertEqual(
+            [(row['name'], row['revenue']) for row in rows],
+            [('Brake Pads', '135.00')])
+
+    def test_revenue_by_day(self):
+        self.assertEqual(
+            [
+                (row['day'], row['orders'], row['revenue'])
+                for row in self.get('/analytics/revenue/')
+            ],
+            [('2024-03-01', 1, '167.97'), ('2024-03-02', 1, '45.00')],
+        )
+
+    def test_top_customers(self):
+        rows = self.get('/analytics/top-customers/', order_by='revenue')
+        self.assertEqual(
+            [row['username'] for row in rows], ['garage', 'analyst']
+        )
+
+    def test_revenue_renders_as_two_decimal_strings(self):
+        for path in ('/analytics/top-products/', '/analytics/revenue/',
+                     '/analytics/top-customers/'):
+            with self.subTest(path=path):
+                response = self.client.get(
+                    path, {'start': '2024-03-01', 'end': '2024-03-31'})
+                revenues = [
+                    row['revenue'] for row in json.loads(response.content)
+                ]
+                self.assertTrue(revenues)
+                for revenue in revenues:
+                    self.assertRegex(revenue, r'^\d+\.\d\d$')
+
+    def test_rollup_status(self):
+        self.assertEqual(
+            self.client.get('/analytics/').data['last_order_id'],
+            Order.objects.latest('pk').pk,
+        )
+
+    def test_invalid_parameters(self):
+        self.assertEqual(
+            self.client.get(
+                '/analytics/top-products/', {'order_by': 'orders'}
+            ).status_code,
+            400,
+        )
+        self.assertEqual(
+            self.client.get(
+                '/analytics/revenue/',
+                {'start': '2024-03-05', 'end': '2024-03-01'},
+            ).status_code,
+            400,
+        )
+
+    def test_requires_an_admin(self):
+        self.client.force_authenticate(self.garage)
+        self.assertEqual(
+            self.client.get('/analytics/revenue/').status_code, 403
+        )
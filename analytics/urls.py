@@ -0,0 +1,16 @@
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from analytics import views as analytics_views
+
+
+# Analytics router
+router = DefaultRouter()
+router.register(
+    r'analytics', analytics_views.AnalyticsViewSet, basename='analytics'
+)
+
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
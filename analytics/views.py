@@ -0,0 +1,130 @@
+import logging
+
+from django.db.models import Sum
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from autocompany.routers import ReplicaReadsMixin
+from .models import DailyProductSales, DailyUserOrders, RollupWatermark
+from .rollup import WATERMARK
+from .serializers import (
+    DailyRevenueSerializer, ReportParamsSerializer, TopCustomerSerializer,
+    TopProductSerializer,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsViewSet(ReplicaReadsMixin, viewsets.ViewSet):
+    """
+    Read-only sales reports (admin only), answered from the daily summary tables
+    that analytics.rollup maintains, so they never scan orders, carts or items.
+
+    Every report takes `start` and `end` days (the last 30 days by default);
+    ranked reports also take `limit` and `order_by`. The summaries trail the
+    orders by the rollup lag; `list` reports how far they go. Reports read from
+    a replica when replicas are configured.
+    """
+    permission_classes = [IsAdminUser]
+    replica_actions = ('list', 'top_products', 'revenue', 'top_customers')
+
+    def report_params(self, request):
+        params = ReportParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data
+
+    def ranked(self, queryset, params, sortable):
+        """
+        Sorts an aggregated report by `order_by` (the first of `sortable` by
+        default) and cuts it to `limit` rows.
+        """
+        sort = params.get('order_by') or sortable[0]
+        if sort not in sortable:
+            return None
+        ties = [f'-{field}' for field in sortable if field != sort]
+        return list(queryset.order_by(f'-{sort}', *ties)[:params['limit']])
+
+    def list(self, request):
+        """
+        Describes how far the summaries go: orders up to `last_order_id` are
+        counted.
+        """
+        watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+        return Response({
+            'last_order_id': watermark.last_order_id if watermark else 0,
+            'rolled_up_at': watermark.updated_at if watermark else None,
+            'reports': ['top-products', 'revenue', 'top-customers'],
+        })
+
+    @swagger_auto_schema(
+        query_serializer=ReportParamsSerializer,
+        responses={200: TopProductSerializer(many=True)})
+    @action(detail=False, methods=['get'], url_path='top-products')
+    def top_products(self, request):
+        """
+        The best selling products between `start` and `end`, by units (default)
+        or revenue.
+        """
+        params = self.report_params(request)
+        queryset = (
+            DailyProductSales.objects.filter(
+                day__range=(params['start'], params['end'])
+            )
+            .values('product_id', 'product__name')
+            .annotate(units=Sum('units'), revenue=Sum('revenue'))
+        )
+        rows = self.ranked(queryset, params, ('units', 'revenue'))
+        if rows is None:
+            return Response(
+                {'error': 'order_by must be units or revenue.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(TopProductSerializer(rows, many=True).data)
+
+    @swagger_auto_schema(
+        query_serializer=ReportParamsSerializer,
+        responses={200: DailyRevenueSerializer(many=True)})
+    @action(detail=False, methods=['get'])
+    def revenue(self, request):
+        """
+        Orders and revenue per day between `start` and `end`; days without
+        orders are left out.
+        """
+        params = self.report_params(request)
+        rows = (
+            DailyUserOrders.objects.filter(
+                day__range=(params['start'], params['end'])
+            )
+            .values('day')
+            .annotate(orders=Sum('orders'), revenue=Sum('revenue'))
+            .order_by('day')
+        )
+        return Response(DailyRevenueSerializer(rows, many=True).data)
+
+    @swagger_auto_schema(
+        query_serializer=ReportParamsSerializer,
+        responses={200: TopCustomerSerializer(many=True)})
+    @action(detail=False, methods=['get'], url_path='top-customers')
+    def top_customers(self, request):
+        """
+        The customers with the most orders (default) or revenue between `start`
+        and `end`.
+        """
+        params = self.report_params(request)
+        queryset = (
+            DailyUserOrders.objects.filter(
+                day__range=(params['start'], params['end'])
+            )
+            .values('user_id', 'user__username')
+            .annotate(orders=Sum('orders'), revenue=Sum('revenue'))
+        )
+        rows = self.ranked(queryset, params, ('orders', 'revenue'))
+        if rows is None:
+            return Response(
+                {'error': 'order_by must be orders or revenue.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(TopCustomerSerializer(rows, many=True).data)
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class AutocompanyConfig(AppConfig):
+    name = 'autocompany'
+
+    def ready(self):
+        from . import db  # noqa: F401
@@ -2,6 +2,10 @@
 ASGI config for autocompany project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server, e.g.
+``uvicorn autocompany.asgi:application --workers 1`` (``SERVER=uvicorn`` in the
+Docker image), so the async views under ``/async/`` run on the event loop
+instead of holding a worker process per request.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
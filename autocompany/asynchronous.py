@@ -0,0 +1,165 @@
+import functools
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+
+def authenticate(request):
+    """
+    Authenticates a Django request with the REST framework authentication
+    classes used by the sync API (session with CSRF enforcement, then HTTP
+    basic), so both flavours of an endpoint accept the same credentials. Touches
+    the database: call it through `sync_to_async`.
+
+    Returns:
+        User: The authenticated user.
+
+    Raises:
+        NotAuthenticated, AuthenticationFailed, PermissionDenied: As the sync
+        views would.
+    """
+    authenticators = [
+        auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ]
+    drf_request = Request(request, authenticators=authenticators)
+    try:
+        user = drf_request.user
+        if not user or not user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+    except (exceptions.NotAuthenticated, exceptions.AuthenticationFailed) as e:
+        # Like APIView: 401 with a challenge when the first authenticator has
+        # one, else 403.
+        header = (
+            authenticators[0].authenticate_header(drf_request)
+            if authenticators
+            else None
+        )
+        if header:
+            e.auth_header = header
+        else:
+            e.status_code = exceptions.PermissionDenied.status_code
+        raise
+    return user
+
+
+def request_data(request):
+    """Returns the parsed JSON or form body of a request."""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError as e:
+            raise exceptions.ParseError(f'JSON parse error - {e}')
+    return request.POST
+
+
+def negotiate(request, force=False):
+    """
+    Picks the renderer for the Accept header of a request among
+    DEFAULT_RENDERER_CLASSES, as REST framework views do. The browsable API
+    needs a view instance, so it is left out and browsers get JSON.
+
+    Returns:
+        tuple: The renderer and the accepted media type.
+
+    Raises:
+        NotAcceptable: When no renderer matches, unless `force` picks the first
+            one.
+    """
+    renderers = [
+        renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+        if renderer.format != 'api'
+    ]
+    negotiator = api_settings.DEFAULT_CONTENT_NEGOTIATION_CLASS()
+    try:
+        return negotiator.select_renderer(Request(request), renderers)
+    except exceptions.NotAcceptable:
+        if not force:
+            raise
+        return renderers[0], renderers[0].media_type
+
+
+def render(response, renderer, media_type):
+    """
+    Renders a REST framework Response with `renderer` into a plain HttpResponse
+    with the body and Content-Type a REST framework view would send. Unlike a
+    Response, it needs no rendering in a thread once returned to the (async)
+    handler.
+    """
+    content_type = (
+        f'{media_type}; charset={renderer.charset}'
+        if renderer.charset
+        else media_type
+    )
+    rendered = HttpResponse(
+        renderer.render(response.data, media_type, {}),
+        status=response.status_code,
+        content_type=content_type,
+    )
+    for header, value in response.items():
+        if header != 'Content-Type':
+            rendered[header] = value
+    patch_vary_headers(rendered, ['Accept'])
+    return rendered
+
+
+def async_api_view(methods, authenticated=False):
+    """
+    Turns a coroutine returning a REST framework Response into an async API
+    view, rendered by the renderers of the sync API (see `negotiate` and
+    `render`), so both flavours of an endpoint send the same bytes. Other
+    responses (e.g. a JsonResponse mirroring the sync view) are returned as they
+    are.
+
+    Django 4.0's method and CSRF decorators wrap views in sync functions, which
+    would make Django run an async view in a thread, so this decorator checks
+    the method itself and marks the view CSRF-exempt the way REST framework
+    views are (SessionAuthentication enforces CSRF instead). REST framework
+    exceptions raised by the view become the JSON error responses the sync API
+    returns; anything else is logged and answered with 500.
+
+    Args:
+        methods (tuple): The accepted HTTP methods; others get 405.
+        authenticated (bool): Whether to authenticate the request first; the
+            user is passed to the view as its second argument.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            renderer, media_type = negotiate(request, force=True)
+            try:
+                if request.method not in methods:
+                    raise exceptions.MethodNotAllowed(request.method)
+                renderer, media_type = negotiate(request)
+                if authenticated:
+                    args = (await sync_to_async(authenticate)(request),) + args
+                response = await view(request, *args, **kwargs)
+            except exceptions.APIException as e:
+                data = (
+                    e.detail
+                    if isinstance(e.detail, (list, dict))
+                    else {'detail': e.detail}
+                )
+                response = Response(data, status=e.status_code)
+                if getattr(e, 'auth_header', None):
+                    response['WWW-Authenticate'] = e.auth_header
+            except Exception as e:
+                logger.error(f"Error in async view {view.__name__}: {e}")
+                response = Response(
+                    {'error': 'An unexpected error occurred.'}, status=500
+                )
+            if not isinstance(response, Response):
+                return response
+            return render(response, renderer, media_type)
+
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
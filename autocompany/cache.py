@@ -0,0 +1,248 @@
+import hashlib
+import logging
+import threading
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from .routers import may_be_stale
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedCache:
+    """
+    A read-through cache whose keys embed a namespace version stored in a Django
+    cache backend.
+
+    Invalidation increments the version instead of deleting keys, so every entry
+    cached under an older version becomes unreachable at once and simply ages
+    out of the backend. Hit and miss counters are kept per process so the cache
+    can be sized.
+
+    Changes confined to single objects (e.g. the stock of a product) can bump an
+    object version instead (`invalidate_objects`): the entries built with that
+    object's `pk` and every listing (which may show the object) are dropped,
+    while the detail entries of other objects stay cached under the current
+    namespace version.
+
+    Attributes:
+        namespace (str): Prefix shared by every key of this cache.
+        alias (str): The name of the backend in settings.CACHES.
+        timeout (int): Lifetime in seconds of cached entries.
+    """
+    namespace = 'default'
+    alias = 'default'
+    timeout = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    @property
+    def version_key(self):
+        return f'{self.namespace}:version'
+
+    @property
+    def changed_key(self):
+        return f'{self.namespace}:changed'
+
+    def version(self):
+        """
+        Returns the current namespace version. A missing version (first use or
+        eviction) is seeded from the clock so it never collides with versions
+        used before.
+        """
+        version = self.backend.get(self.version_key)
+        if version is None:
+            self.backend.add(self.version_key, time.time_ns(), timeout=None)
+            version = self.backend.get(self.version_key)
+        return version
+
+    def last_modified(self):
+        """
+        Returns the Unix timestamp of the last invalidation. When it is unknown
+        (first use or eviction) the current time is recorded, which is never
+        older than the real change.
+        """
+        changed = self.backend.get(self.changed_key)
+        if changed is None:
+            self.backend.add(self.changed_key, time.time(), timeout=None)
+            changed = self.backend.get(self.changed_key)
+        return changed
+
+    def invalidate(self):
+        """
+        Makes every entry cached so far unreachable by bumping the namespace
+        version.
+        """
+        try:
+            self.backend.incr(self.version_key)
+        except ValueError:
+            self.backend.add(self.version_key, time.time_ns(), timeout=None)
+        self.backend.set(self.changed_key, time.time(), timeout=None)
+
+    def invalidate_on_commit(self):
+        """
+        Invalidates now and again once the current transaction commits. The
+        second bump drops anything a concurrent reader cached from the
+        pre-commit rows while the write was pending.
+        """
+        self.invalidate()
+        transaction.on_commit(self.invalidate)
+
+    @property
+    def lists_key(self):
+        return f'{self.namespace}:lists'
+
+    def object_key(self, pk):
+        return f'{self.namespace}:object:{pk}'
+
+    def lists_version(self):
+        """
+        Returns the version of the listings: the time (in nanoseconds) of the
+        last object invalidation, or 0 when there is none on record.
+        """
+        return self.backend.get(self.lists_key) or 0
+
+    def object_version(self, pk):
+        """
+        Returns the version of one object: the time (in nanoseconds) of its last
+        invalidation, or 0 when it has none on record.
+        """
+        return self.backend.get(self.object_key(pk)) or 0
+
+    def invalidate_objects(self, pks):
+        """
+        Makes the entries built for these objects and every listing unreachable,
+        leaving the detail entries of other objects cached.
+        """
+        version = time.time_ns()
+        versions = {self.object_key(pk): version for pk in pks}
+        versions[self.lists_key] = version
+        self.backend.set_many(versions, timeout=None)
+
+    def invalidate_objects_on_commit(self, pks):
+        """
+        Invalidates the objects now and again once the current transaction
+        commits (see invalidate_on_commit).
+        """
+        pks = list(pks)
+        if not pks:
+            return
+        self.invalidate_objects(pks)
+        transaction.on_commit(lambda: self.invalidate_objects(pks))
+
+    def make_key(self, name, pk=None):
+        """
+        Returns the backend key for `name` under the current version, and under
+        the version of object `pk` for entries that show a single object (the
+        listings version otherwise). Callers should build the key once per
+        request and reuse it for both the lookup and the store, so data read
+        before a concurrent invalidation can never be stored under the newer
+        version.
+        """
+        digest = hashlib.md5(name.encode('utf-8')).hexdigest()
+        if pk is not None:
+            version = self.object_version(pk)
+        else:
+            version = f'lists:{self.lists_version()}'
+        return f'{self.namespace}:{self.version()}:{version}:{digest}'
+
+    def get(self, key):
+        """
+        Returns the value cached under `key` or None, updating the hit/miss
+        counters.
+        """
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """
+        Stores `value` under `key`, unless it was read from a replica that may
+        not have replayed the last invalidation yet: cached under the new
+        version, it would outlive the change.
+        """
+        if may_be_stale(self):
+            return
+        self.backend.set(key, value, timeout=self.timeout)
+
+    def stats(self):
+        """
+        Returns the hit/miss counters of this process and the current version.
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'version': self.version(),
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+class CachedResponseMixin:
+    """
+    Viewset mixin that serves `list` and `retrieve` responses from a
+    VersionedCache.
+
+    Successful response data is cached under the full request path (query string
+    included), and responses carry an `X-Cache: HIT` or `X-Cache: MISS` header.
+    `retrieve` entries are also keyed by the object version and `list` entries
+    by the listings version, so `invalidate_objects` drops both. Cache backend
+    failures are logged and the request falls through to the database.
+
+    Attributes:
+        response_cache (VersionedCache): The cache the responses are stored in.
+    """
+    response_cache = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        return self.cached_response(
+            request, super().retrieve, *args, cache_pk=pk, **kwargs
+        )
+
+    def cached_response(self, request, handler, *args, cache_pk=None, **kwargs):
+        path = request.get_full_path()
+        try:
+            key = self.response_cache.make_key(path, pk=cache_pk)
+            data = self.response_cache.get(key)
+        except Exception as e:
+            logger.error(f"Error reading {path} from the response cache: {e}")
+            return handler(request, *args, **kwargs)
+
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            try:
+                self.response_cache.set(key, response.data)
+            except Exception as e:
+                logger.error(f"Error writing {path} to the response cache: {e}")
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,83 @@
+import hashlib
+import logging
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+
+class ConditionalGetMixin:
+    """
+    Viewset mixin adding `ETag` and `Last-Modified` headers to `list` and
+    `retrieve` responses and answering matching `If-None-Match` /
+    `If-Modified-Since` requests with 304 Not Modified.
+
+    Validators are derived from the versions of the VersionedCaches the
+    representation depends on (also the version of the object for `retrieve`,
+    and of the listings for `list`), so a conditional request is answered
+    without touching the database or the serializers.
+
+    Attributes:
+        conditional_caches (tuple): VersionedCache instances whose invalidation
+            changes the representation served by this viewset.
+    """
+    conditional_caches = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        return self.conditional_response(
+            request, super().retrieve, *args, validator_pk=pk, **kwargs
+        )
+
+    def get_validators(self, request, pk=None):
+        """
+        Returns the (etag, last_modified) pair for the current request. The ETag
+        covers the versions, the full path and the negotiated media type, so
+        JSON and browsable API representations never share a tag.
+        """
+        versions = [cache.version() for cache in self.conditional_caches]
+        changed = [cache.last_modified() for cache in self.conditional_caches]
+        if pk is not None:
+            object_versions = [
+                cache.object_version(pk) for cache in self.conditional_caches
+            ]
+        else:
+            object_versions = [
+                cache.lists_version() for cache in self.conditional_caches
+            ]
+        versions += object_versions
+        changed += [version / 1e9 for version in object_versions]
+        seed = '|'.join([
+            ':'.join(map(str, versions)),
+            request.get_full_path(),
+            str(request.accepted_media_type),
+        ])
+        etag = '"%s"' % hashlib.md5(seed.encode('utf-8')).hexdigest()
+        return etag, int(max(changed))
+
+    def conditional_response(
+        self, request, handler, *args, validator_pk=None, **kwargs
+    ):
+        try:
+            etag, last_modified = self.get_validators(request, pk=validator_pk)
+        except Exception as e:
+            logger.error(
+                f"Error computing validators for {request.get_full_path()}: {e}"
+            )
+            return handler(request, *args, **kwargs)
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,62 @@
+import logging
+
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+def close_if_unusable(connection):
+    """
+    Closes a persistent connection the database server has dropped (restart,
+    failover, idle timeout), so the request reconnects instead of failing on its
+    first query. Only connections with CONN_HEALTH_CHECKS enabled are checked,
+    and never inside a transaction.
+
+    Returns:
+        bool: True when the connection was closed.
+    """
+    if connection.connection is None or connection.in_atomic_block:
+        return False
+    if not connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+        return False
+    if connection.is_usable():
+        return False
+    logger.warning(
+        "Closing unusable persistent connection to database "
+        f"'{connection.alias}'."
+    )
+    connection.close()
+    return True
+
+
+def check_on_first_use(connection):
+    """
+    Makes `connection` health-check itself the next time it is used: its
+    `ensure_connection`, which every cursor and transaction goes through, runs
+    close_if_unusable once first.
+    """
+    if not hasattr(connection, 'health_check_done'):
+        ensure_connection = connection.ensure_connection
+
+        def checked_ensure_connection():
+            if not connection.health_check_done:
+                connection.health_check_done = True
+                close_if_unusable(connection)
+            ensure_connection()
+
+        connection.ensure_connection = checked_ensure_connection
+    connection.health_check_done = False
+
+
+@receiver(request_started)
+def check_persistent_connections(sender, **kwargs):
+    """
+    Schedules a health check of the connections kept open by CONN_MAX_AGE for
+    when a request first uses them, as Django 4.1 does with CONN_HEALTH_CHECKS.
+    Databases the request does not query cost no round trip.
+    """
+    for connection in connections.all():
+        if connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            check_on_first_use(connection)
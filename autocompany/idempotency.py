@@ -0,0 +1,150 @@
+import functools
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Responses a retry may get differently (a conflict that can clear up, a server
+# error) are not stored.
+NOT_STORED = (status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+def fingerprint(request):
+    """Returns a digest of the request method, path and parsed body."""
+    data = request.data
+    if hasattr(data, 'lists'):  # QueryDict (form and multipart bodies)
+        data = sorted(data.lists())
+    payload = json.dumps(
+        [request.method, request.path, data], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cache_key(user, path, key):
+    """
+    Returns the cache key of an idempotency key, scoped to the user and the
+    endpoint.
+    """
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'idempotency:{user.pk}:{path}:{digest}'
+
+
+def replay(entry):
+    response = Response(entry['data'], status=entry['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(handler):
+    """
+    Makes a REST framework view method (e.g. `post`) idempotent for clients that
+    send an `Idempotency-Key` header, so retries over flaky networks run the
+    view only once.
+
+    The first request with a key runs the view and its response is stored for
+    IDEMPOTENCY_KEY_TTL seconds in the IDEMPOTENCY_CACHE_ALIAS cache, keyed by
+    user, path and key. Retries get the stored response back (with an
+    `Idempotent-Replayed: true` header) without running the view: one cache
+    read. A duplicate that arrives while the first request is still running (the
+    first request claims the key with `cache.add`) is answered 409 at once, with
+    a `Retry-After` header, rather than running the view concurrently or holding
+    a worker thread while it waits. Reusing a key with a different body is
+    refused with 422.
+
+    Server errors, conflicts (409) and exceptions are not stored, so they can be
+    retried with the same key. Requests without the header are not affected.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            message = f'{HEADER} must be at most {MAX_KEY_LENGTH} characters.'
+            return Response(
+                {'error': message}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cache = caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+        entry_key = cache_key(request.user, request.path, key)
+        request_fingerprint = fingerprint(request)
+
+        claimed = cache.add(
+            entry_key, {'state': 'running', 'fingerprint': request_fingerprint},
+            timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT
+        )
+        if not claimed:
+            entry = cache.get(entry_key)
+            if entry is None:
+                # The first request failed and released the key meanwhile; run
+                # this one instead.
+                claimed = cache.add(
+                    entry_key,
+                    {'state': 'running', 'fingerprint': request_fingerprint},
+                    timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT,
+                )
+            if not claimed:
+                entry = (
+                    entry
+                    or cache.get(entry_key)
+                    or {'state': 'running', 'fingerprint': request_fingerprint}
+                )
+                if entry['fingerprint'] != request_fingerprint:
+                    logger.error(
+                        f"{HEADER} reused with a different request by user "
+                        f"{request.user} on {request.path}."
+                    )
+                    message = (
+                        f'This {HEADER} was used with a different request.'
+                    )
+                    return Response(
+                        {'error': message},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                if entry['state'] == 'running':
+                    message = (
+                        f'A request with this {HEADER} is still being '
+                        'processed; retry later.'
+                    )
+                    response = Response(
+                        {'error': message}, status=status.HTTP_409_CONFLICT
+                    )
+                    response['Retry-After'] = str(
+                        settings.IDEMPOTENCY_RETRY_AFTER
+                    )
+                    return response
+                return replay(entry)
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except BaseException:
+            cache.delete(entry_key)
+            raise
+        if (
+            not isinstance(response, Response)
+            or response.status_code >= 500
+            or response.status_code in NOT_STORED
+        ):
+            cache.delete(entry_key)
+            return response
+        cache.set(
+            entry_key,
+            {
+                'state': 'done',
+                'fingerprint': request_fingerprint,
+                'status': response.status_code,
+                'data': response.data,
+            },
+            timeout=settings.IDEMPOTENCY_KEY_TTL,
+        )
+        return response
+
+    return wrapper
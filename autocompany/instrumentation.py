@@ -0,0 +1,277 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class QueryRecorder:
+    """
+    A `connection.execute_wrapper` that counts the statements of a request and
+    times them.
+
+    Unlike `connection.queries`, it works with DEBUG=False. Statements are
+    grouped by their SQL text with the parameters left out, so the same lookup
+    repeated with different IDs (the N+1 pattern) shows up as duplicates.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """
+        The number of statements that repeated an SQL text already run by the
+        request.
+        """
+        return self.count - len(self.statements)
+
+    def most_repeated(self):
+        """Returns the most repeated SQL text and its count, or (None, 0)."""
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+class Histogram:
+    """Cumulative bucket counts with a sum, as in a Prometheus histogram."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Yields `(le, count)` pairs, ending with `+Inf`."""
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestMetrics:
+    """
+    In-process, per-view request metrics, rendered in the Prometheus text
+    exposition format.
+
+    Each worker process keeps its own numbers; Prometheus aggregates them across
+    the scraped instances.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+            self.db_durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+            self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+            self.duplicates = Counter()
+            self.responses = Counter()
+
+    def record(self, view, status_code, duration, recorder):
+        with self._lock:
+            self.durations[view].observe(duration)
+            self.db_durations[view].observe(recorder.duration)
+            self.queries[view].observe(recorder.count)
+            self.duplicates[view] += recorder.duplicates
+            self.responses[view, str(status_code)] += 1
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format (version
+        0.0.4).
+        """
+        lines = []
+        with self._lock:
+            for name, help_text, histograms in (
+                (
+                    'autocompany_request_duration_seconds',
+                    'Wall time spent serving requests.',
+                    self.durations,
+                ),
+                (
+                    'autocompany_request_db_duration_seconds',
+                    'Time spent in database queries per request.',
+                    self.db_durations,
+                ),
+                (
+                    'autocompany_request_db_queries',
+                    'Database queries run per request.',
+                    self.queries,
+                ),
+            ):
+                lines += [
+                    f'# HELP {name} {help_text}',
+                    f'# TYPE {name} histogram',
+                ]
+                for view in sorted(histograms):
+                    histogram = histograms[view]
+                    for bound, count in histogram.cumulative():
+                        lines.append(
+                            f'{name}_bucket{{view="{view}",le="{bound}"}} '
+                            f'{count}'
+                        )
+                    lines.append(f'{name}_sum{{view="{view}"}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{view="{view}"}} {histogram.count}'
+                    )
+
+            name = 'autocompany_request_db_duplicate_queries_total'
+            lines += [
+                f'# HELP {name} Queries repeating an SQL statement already '
+                'run by the same request.',
+                f'# TYPE {name} counter',
+            ]
+            lines += [
+                f'{name}{{view="{view}"}} {count}'
+                for view, count in sorted(self.duplicates.items())
+            ]
+
+            name = 'autocompany_responses_total'
+            lines += [
+                f'# HELP {name} Responses by view and status code.',
+                f'# TYPE {name} counter',
+            ]
+            lines += [
+                f'{name}{{view="{view}",status="{status}"}} {count}'
+                for (view, status), count in sorted(self.responses.items())
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+
+
+def view_name(request):
+    """
+    Names the view that served `request`: the class name for API views
+    (`AddToCartView`), the class and action for viewsets (`OrderViewSet.list`),
+    `unresolved` when no URL matched.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view_class = getattr(match.func, 'cls', None) or getattr(
+        match.func, 'view_class', None
+    )
+    if view_class is None:
+        return match.view_name or match._func_path
+    actions = getattr(match.func, 'actions', None)
+    if actions and request.method.lower() in actions:
+        return f'{view_class.__name__}.{actions[request.method.lower()]}'
+    return view_class.__name__
+
+
+class InstrumentationMiddleware(MiddlewareMixin):
+    """
+    Measures every request: wall time, time spent in the database, query count
+    and duplicate queries, recorded per view.
+
+    The numbers are added to the response as a `Server-Timing` header,
+    aggregated into the histograms served by `metrics_view`, and requests slower
+    than SLOW_REQUEST_THRESHOLD_MS or repeating a statement N_PLUS_ONE_THRESHOLD
+    times or more are logged as warnings.
+
+    Database connections belong to a thread, so the query wrapper is installed
+    in `process_request` and removed in `process_response`: under ASGI,
+    MiddlewareMixin runs both hooks in the request's thread-sensitive thread,
+    the one that also runs the views' ORM calls.
+    """
+
+    def process_request(self, request):
+        recorder = QueryRecorder()
+        wrappers = ExitStack()
+        for connection in connections.all():
+            wrappers.enter_context(connection.execute_wrapper(recorder))
+        request._instrumentation = (recorder, wrappers, time.perf_counter())
+
+    def process_response(self, request, response):
+        instrumentation = getattr(request, '_instrumentation', None)
+        if instrumentation is None:
+            return response
+        recorder, wrappers, started = instrumentation
+        wrappers.close()
+        duration = time.perf_counter() - started
+
+        view = view_name(request)
+        try:
+            request_metrics.record(
+                view, response.status_code, duration, recorder
+            )
+        except Exception as e:
+            logger.error(f"Error recording metrics for {view}: {e}")
+
+        response['Server-Timing'] = (
+            f'app;dur={duration * 1000:.1f}, '
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} '
+            f'queries, {recorder.duplicates} duplicates"'
+        )
+        self.log_warnings(request, view, duration, recorder)
+        return response
+
+    def log_warnings(self, request, view, duration, recorder):
+        threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
+        if duration * 1000 >= threshold:
+            logger.warning(
+                f"Slow request: {request.method} {request.get_full_path()} "
+                f"({view}) took {duration * 1000:.0f} ms, "
+                f"{recorder.duration * 1000:.0f} ms in {recorder.count} "
+                "queries."
+            )
+        sql, repeats = recorder.most_repeated()
+        if repeats >= getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5):
+            logger.warning(
+                f"Possible N+1 queries in {view}: a statement ran {repeats} "
+                "times during "
+                f"{request.method} {request.get_full_path()}: {sql[:200]}"
+            )
+
+
+def metrics_view(request):
+    """Serves the request metrics of this process for Prometheus to scrape."""
+    return HttpResponse(
+        request_metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
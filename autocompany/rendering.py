@@ -0,0 +1,211 @@
+import decimal
+import functools
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except (
+    ImportError
+):  # optional: without it, FastJSONRenderer renders exactly like JSONRenderer
+    orjson = None
+
+# Fields whose representation of a column value is the value itself.
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed, producing the
+    same bytes as JSONRenderer several times faster.
+
+    orjson is only used for compact, unindented UTF-8 output (the API's
+    settings), and only for values it encodes exactly like the json module:
+    types it does not know, datetimes and Decimals go through REST framework's
+    encoder, and Decimals are only encoded as floats in the range where both
+    libraries print them the same way. Anything else is rendered by
+    JSONRenderer. orjson writes NaN and infinities as null where JSONRenderer
+    raises; the serializers never produce them.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if (
+            self.get_indent(accepted_media_type, renderer_context or {})
+            is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=encode_default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Like JSONRenderer, escape the line separators JavaScript does not
+        # allow in strings.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029'
+            )
+        return ret
+
+
+_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    """
+    Converts the values orjson does not encode itself, as REST framework's
+    JSONEncoder does. Decimals whose float json and orjson would print
+    differently (exponent notation) raise TypeError, which makes
+    FastJSONRenderer fall back to the json module.
+    """
+    if isinstance(obj, decimal.Decimal):
+        value = float(obj)
+        if value and not 1e-4 <= abs(value) < 1e16:
+            raise TypeError(f'{obj} is rendered by the json module')
+        return value
+    return _encoder.default(obj)
+
+
+class ValuesRows:
+    """
+    Builds the list representation of a ModelSerializer straight from
+    `.values()` rows, without instantiating models or running the serializer for
+    every row.
+
+    Each serializer field reads one column: its source, or the column named for
+    it in the serializer's `Meta.values_columns` (e.g. an annotation behind a
+    read-only property). Integer, string, boolean, primary key and read-only
+    fields output the column value as is; other fields (decimals, dates, times)
+    convert it with their own `to_representation`, so the rows are identical to
+    `serializer_class(instances, many=True).data`.
+
+    Raises:
+        ImproperlyConfigured: When a field cannot be read from a single column
+            (nested serializers, method fields, dotted or `*` sources,
+            many-related fields).
+    """
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        columns = getattr(
+            getattr(serializer_class, 'Meta', None), 'values_columns', {}
+        )
+        self.fields = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            column = columns.get(name, field.source)
+            if (
+                column == '*'
+                or '.' in column
+                or isinstance(
+                    field,
+                    (
+                        serializers.BaseSerializer,
+                        serializers.ManyRelatedField,
+                        serializers.SerializerMethodField,
+                    ),
+                )
+            ):
+                raise ImproperlyConfigured(
+                    f'{serializer_class.__name__}.{name} cannot be read from a '
+                    '.values() column.'
+                )
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                convert = (
+                    field.pk_field.to_representation
+                    if field.pk_field is not None
+                    else None
+                )
+            elif isinstance(field, PASSTHROUGH_FIELDS):
+                convert = None
+            else:
+                convert = field.to_representation
+            self.fields.append((name, column, convert))
+        self.columns = [column for _, column, _ in self.fields]
+
+    def values(self, queryset):
+        """
+        Returns `queryset` as `.values()` dicts holding the columns the fields
+        read.
+        """
+        return queryset.values(*self.columns)
+
+    def rows(self, values):
+        """Returns the serialized representation of `.values()` rows."""
+        fields = self.fields
+        return [
+            {
+                name: (
+                    row[column]
+                    if convert is None or row[column] is None
+                    else convert(row[column])
+                )
+                for name, column, convert in fields
+            }
+            for row in values
+        ]
+
+
+@functools.lru_cache(maxsize=None)
+def values_rows(serializer_class):
+    """Returns the (cached) ValuesRows of a serializer class."""
+    return ValuesRows(serializer_class)
+
+
+class ValuesListMixin:
+    """
+    Viewset mixin opting a viewset's `list` into the fast path when
+    FAST_LIST_RESPONSES is True: pages are built from `.values()` rows by
+    ValuesRows and encoded by FastJSONRenderer, with the same filtering,
+    pagination (page number and keyset) and output as ListModelMixin and
+    JSONRenderer at a fraction of the CPU cost. Otherwise (the default) the
+    viewset is served as usual.
+    """
+
+    def fast_list_responses(self):
+        return (
+            getattr(settings, 'FAST_LIST_RESPONSES', False)
+            and self.action == 'list'
+        )
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if not self.fast_list_responses():
+            return renderers
+        return [
+            FastJSONRenderer() if type(renderer) is JSONRenderer else renderer
+            for renderer in renderers
+        ]
+
+    def list(self, request, *args, **kwargs):
+        if not self.fast_list_responses():
+            return super().list(request, *args, **kwargs)
+
+        plan = values_rows(self.get_serializer_class())
+        queryset = plan.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.rows(page))
+        return Response(plan.rows(queryset))
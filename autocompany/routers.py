@@ -0,0 +1,178 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+_routing = ContextVar('database_routing', default=None)
+
+
+class RoutingState:
+    """
+    How the database queries of the current request are routed.
+
+    Attributes:
+        replica_reads (bool): Whether reads may go to a replica (set by the
+            views that opt in).
+        pinned (bool): Whether every query must stay on the primary: the client
+            wrote recently (the pin cookie) or the request itself has written.
+        wrote (bool): Whether the request has sent a write to the primary.
+        replica (str): The replica alias chosen for the request, once it has
+            read from one.
+    """
+
+    def __init__(self, pinned=False):
+        self.replica_reads = False
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+def replicas():
+    """
+    Returns the aliases of the read replicas in settings.DATABASE_REPLICAS.
+    """
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def served_by_replica():
+    """Returns the replica alias the current request has read from, or None."""
+    state = _routing.get()
+    return state.replica if state is not None else None
+
+
+@contextmanager
+def replica_reads():
+    """
+    Lets the reads in the block go to a replica, unless the request is pinned to
+    the primary. Outside a request (no DatabaseRoutingMiddleware) it does
+    nothing.
+    """
+    state = _routing.get()
+    if state is None:
+        yield
+        return
+    previous, state.replica_reads = state.replica_reads, True
+    try:
+        yield
+    finally:
+        state.replica_reads = previous
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends writes to the primary (`default`) and, for views that opt in with
+    `replica_reads`, reads to one of settings.DATABASE_REPLICAS, picked at
+    random per request so a request sees one consistent replica.
+
+    Reads stay on the primary once the request has written (so it reads its own
+    writes), while the client carries the pin cookie set after a write (see
+    DatabaseRoutingMiddleware), and whenever no replica is configured. Replicas
+    hold the same data, so relations between objects loaded from different
+    aliases are allowed.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if (
+            state is None
+            or not state.replica_reads
+            or state.pinned
+            or not replicas()
+        ):
+            return None
+        if state.replica is None:
+            state.replica = random.choice(replicas())
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+            state.pinned = True
+        # Objects loaded from a replica are saved to the primary; anything else
+        # keeps Django's choice (the primary, or the database an explicit
+        # `using()` names).
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in replicas():
+            return 'default'
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class DatabaseRoutingMiddleware(MiddlewareMixin):
+    """
+    Tracks the routing state of each request for PrimaryReplicaRouter and gives
+    clients read-your-writes consistency: a response to a request that wrote
+    sets a cookie for REPLICA_LAG_SECONDS, during which the client's requests
+    read from the primary while the replicas catch up.
+
+    The state lives in a context variable; under ASGI, MiddlewareMixin runs both
+    hooks in the request's thread-sensitive thread and the views see the same
+    (mutable) state object.
+    """
+
+    def process_request(self, request):
+        pinned = settings.REPLICA_PIN_COOKIE in request.COOKIES
+        _routing.set(RoutingState(pinned=pinned))
+
+    def process_response(self, request, response):
+        state = _routing.get()
+        _routing.set(None)
+        if state is not None and state.wrote and replicas():
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_LAG_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class ReplicaReadsMixin:
+    """
+    View mixin letting the safe requests of the listed actions read from a
+    replica. The authentication queries run before the switch, on the primary.
+
+    Attributes:
+        replica_actions (tuple): The viewset actions whose reads may go to a
+            replica.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        state = _routing.get()
+        if (
+            state is not None
+            and request.method in SAFE_METHODS
+            and getattr(self, 'action', None) in self.replica_actions
+        ):
+            state.replica_reads = True
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        state = _routing.get()
+        if state is not None:
+            state.replica_reads = False
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def may_be_stale(cache):
+    """
+    Returns whether data computed by the current request may predate the last
+    invalidation of `cache`: it was read from a replica less than
+    REPLICA_LAG_SECONDS after the invalidation, so the replica may not have
+    replayed the change yet. Such data must not be cached under the new version.
+    """
+    if served_by_replica() is None:
+        return False
+    return time.time() - cache.last_modified() < settings.REPLICA_LAG_SECONDS
@@ -0,0 +1,18 @@
+"""
+Settings for the test suite: the application settings plus a second, empty
+SQLite database that the router tests use as a replica. `manage.py test` uses
+this module unless DJANGO_SETTINGS_MODULE is set; other runners should point
+DJANGO_SETTINGS_MODULE at it.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+# Tests run on the primary alone; the router tests enable the replica with
+# override_settings(DATABASE_REPLICAS=['replica']).
+DATABASE_REPLICAS = []
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'db.replica.sqlite3',
+    'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+    'CONN_HEALTH_CHECKS': DATABASES['default']['CONN_HEALTH_CHECKS'],
+}
@@ -24,6 +24,8 @@ from django.urls import re_path
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from autocompany.instrumentation import metrics_view
+import analytics.urls
 import orders.urls
 import products.urls
 
@@ -49,8 +51,10 @@ urlpatterns = [
     # path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    path('metrics/', metrics_view, name='metrics'),
     path('', include(products.urls)),
     path('', include(orders.urls)),
+    path('', include(analytics.urls)),
  
    
 ]
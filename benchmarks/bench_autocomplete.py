@@ -0,0 +1,139 @@
+"""
+Measures the product autocomplete index: build time, memory footprint and lookup
+latency for a catalog of synthetic part names such as "Toyota Brake Pad Set
+0012345".
+
+The index is built straight from generated rows, so no database is involved; the
+SKU-like number in every name gives the index one word per product, as real part
+numbers do.
+
+Usage:
+    python -m benchmarks.bench_autocomplete [--products 1000000] [--repeat 2000]
+        [--output report.json]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import ROOT, summarize, time_calls, write_report
+
+MAKES = [
+    'Toyota',
+    'Honda',
+    'Nissan',
+    'Subaru',
+    'Mazda',
+    'Ford',
+    'Volkswagen',
+    'Hyundai',
+]
+PARTS = [
+    'Brake Pad Set',
+    'Brake Disc',
+    'Air Filter',
+    'Oil Filter',
+    'Spark Plug',
+    'Timing Belt',
+    'Water Pump',
+    'Wiper Blade',
+    'Headlight Bulb',
+    'Shock Absorber',
+    'Clutch Kit',
+    'Radiator',
+]
+VARIANTS = [
+    'Front',
+    'Rear',
+    'Left',
+    'Right',
+    'Heavy Duty',
+    'Premium',
+    'OEM',
+    'Sport',
+]
+
+QUERIES = {
+    'one_letter': 't',
+    'make_prefix': 'toy',
+    'two_words': 'toyota brak',
+    'three_words': 'hon air fil',
+    'part_number': '00123',
+    'no_match': 'turbocharger',
+}
+
+
+def catalog(products):
+    """Yields `(id, name)` rows of synthetic part names."""
+    for i in range(1, products + 1):
+        yield i, (
+            f'{MAKES[i % len(MAKES)]} {PARTS[i % 97 % len(PARTS)]} '
+            f'{VARIANTS[i % 13 % len(VARIANTS)]} {i:07d}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument(
+        '--output', help='Write the JSON report to this file instead of stdout'
+    )
+    args = parser.parse_args()
+
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    from products.autocomplete import PrefixIndex
+
+    index = PrefixIndex()
+    started = time.perf_counter()
+    index.build(catalog(args.products))
+    build_seconds = time.perf_counter() - started
+
+    # Memory is measured on a second build: tracing allocations slows the build
+    # down severalfold.
+    index = PrefixIndex()
+    tracemalloc.start()
+    index.build(catalog(args.products))
+    memory_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lookups = {}
+    for name, query in QUERIES.items():
+        lookups[name] = {
+            'query': query,
+            'results': len(index.lookup(query, args.limit)),
+            'latency': summarize(
+                time_calls(lambda: index.lookup(query, args.limit), args.repeat)
+            ),
+        }
+        print(
+            f"{name} ({query!r}): p50 {lookups[name]['latency']['p50_ms']} ms"
+        )
+
+    write_report(
+        {
+            'benchmark': 'autocomplete',
+            'index': index.stats(),
+            'build_seconds': round(build_seconds, 3),
+            'memory_mb': round(memory_bytes / 2**20, 1),
+            'memory_bytes_per_product': (
+                round(memory_bytes / args.products, 1)
+                if args.products
+                else None
+            ),
+            'limit': args.limit,
+            'repeat': args.repeat,
+            'lookups': lookups,
+        },
+        args.output,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Compares the cart backends (orders/cart.py): carts kept in ShoppingCart/CartItem
+rows with stock reserved on every change (DatabaseCartBackend), against carts
+kept in the cache until checkout (CacheCartBackend).
+
+Every simulated session adds `--lines` products (one request each, some twice),
+removes one unit and checks out, through the views, so authentication and
+serialization are included. Latency and query counts are reported per endpoint
+and backend.
+
+The cache is the in-process locmem stand-in, which costs nothing per round trip;
+with Redis or Memcached add one network round trip per cache call (three per
+add-to-cart: lock, get and set, then unlock).
+
+Usage:
+    python -m benchmarks.bench_carts [--sessions 300] [--lines 5]
+        [--output report.json]
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.common import (
+    git_revision,
+    migrate,
+    seed_dataset,
+    setup_django,
+    summarize,
+    write_report,
+)
+
+BACKENDS = {
+    'database': 'orders.cart.DatabaseCartBackend',
+    'cache': 'orders.cart.CacheCartBackend',
+}
+
+
+def run(backend, users, product_ids, lines):
+    """
+    Runs one cart session per user with `backend` and returns latencies and
+    query counts per endpoint.
+    """
+    from django.db import connection, reset_queries
+    from django.test import override_settings
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from orders.views import AddToCartView, CreateOrderView, RemoveFromCartView
+
+    factory = APIRequestFactory()
+    views = {
+        'add_to_cart': AddToCartView.as_view(),
+        'remove_from_cart': RemoveFromCartView.as_view(),
+        'create_order': CreateOrderView.as_view(),
+    }
+    samples, queries, failures = (
+        defaultdict(list),
+        defaultdict(list),
+        defaultdict(int),
+    )
+
+    def post(endpoint, user, data):
+        request = factory.post(f'/{endpoint}/', data, format='json')
+        force_authenticate(request, user=user)
+        # The query log is capped; start each capture from an empty log so the
+        # counts stay right.
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = views[endpoint](request)
+            samples[endpoint].append(time.perf_counter() - started)
+        queries[endpoint].append(len(captured))
+        if response.status_code >= 400:
+            failures[endpoint] += 1
+
+    with override_settings(CART_BACKEND=BACKENDS[backend]):
+        for user in users:
+            chosen = random.sample(product_ids, lines)
+            for product_id in chosen + chosen[:2]:
+                post(
+                    'add_to_cart',
+                    user,
+                    {'product_id': product_id, 'quantity': 1},
+                )
+            post('remove_from_cart', user, {'product_id': chosen[0]})
+            post('create_order', user, {'delivery_date': '2024-03-01'})
+
+    return {
+        endpoint: {
+            'latency': summarize(samples[endpoint]),
+            'queries_mean': round(
+                sum(queries[endpoint]) / len(queries[endpoint]), 2
+            ),
+            'failures': failures[endpoint],
+        }
+        for endpoint in views
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--sessions', type=int, default=300)
+    parser.add_argument('--lines', type=int, default=5)
+    parser.add_argument(
+        '--database', help='SQLite file to use (a temporary file by default)'
+    )
+    parser.add_argument(
+        '--output', help='Write the JSON report to this file instead of stdout'
+    )
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    migrate()
+    dataset = seed_dataset(
+        users=args.sessions * 2, products=2000, orders_per_user=1
+    )
+
+    from django.contrib.auth.models import User
+    from django.db.models import F
+
+    from products.models import Product
+
+    # Plenty of stock, so no session fails on it.
+    Product.objects.update(stock_quantity=F('stock_quantity') + 1_000_000)
+    random.seed(0)
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    users = list(User.objects.order_by('id')[:args.sessions * 2])
+
+    results = {}
+    for index, backend in enumerate(BACKENDS):
+        results[backend] = run(
+            backend, users[index::2], product_ids, args.lines
+        )
+        for endpoint, result in results[backend].items():
+            print(
+                f"{backend} {endpoint}: p50 {result['latency']['p50_ms']} ms, "
+                f"{result['queries_mean']} queries"
+            )
+
+    write_report({
+        'benchmark': 'carts',
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'dataset': dataset,
+        'sessions': args.sessions,
+        'lines': args.lines,
+        'results': results,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
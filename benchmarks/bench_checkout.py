@@ -0,0 +1,240 @@
+"""
+Drives the cart and checkout flow end to end and reports latency, throughput and
+query counts per endpoint.
+
+A dataset an order of magnitude larger than `insert_sample_data` is seeded, then
+every simulated session logs a user in and runs add-to-cart (several products)
+-> remove-from-cart -> create-order -> list-orders through the Django test
+client, so requests pass through the full middleware, authentication and
+serialization stack. The order listing is not routed in `orders/urls.py`, so it
+is dispatched to OrderViewSet directly with an authenticated request.
+
+Usage:
+    python -m benchmarks.bench_checkout [--users 1000] [--sessions 500]
+        [--output report.json]
+"""
+
+import argparse
+import random
+import time
+from collections import Counter, defaultdict
+
+from benchmarks.common import (
+    git_revision,
+    migrate,
+    seed_dataset,
+    setup_django,
+    summarize,
+    write_report,
+)
+
+ENDPOINTS = (
+    'add_to_cart',
+    'remove_from_cart',
+    'create_order',
+    'list_orders',
+    'list_orders_cursor',
+)
+
+
+class Recorder:
+    """
+    Collects the duration, status code and query count of every benchmarked
+    request.
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def call(self, endpoint, send):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = send()
+            duration = time.perf_counter() - started
+        self.samples[endpoint].append(duration)
+        self.queries[endpoint].append(len(queries))
+        self.statuses[endpoint][response.status_code] += 1
+        return response
+
+    def report(self):
+        report = {}
+        for endpoint in ENDPOINTS:
+            if not self.samples[endpoint]:
+                continue
+            counts = self.queries[endpoint]
+            report[endpoint] = {
+                'latency': summarize(self.samples[endpoint]),
+                'queries': {
+                    'mean': round(sum(counts) / len(counts), 2),
+                    'min': min(counts),
+                    'max': max(counts),
+                },
+                'status_codes': {
+                    str(code): count
+                    for code, count in sorted(self.statuses[endpoint].items())
+                },
+            }
+        return report
+
+
+def run_session(recorder, client, factory, user, product_ids, items, page_size):
+    """Runs one add -> remove -> checkout -> list flow for `user`."""
+    from rest_framework.test import force_authenticate
+    from orders.views import OrderViewSet
+
+    client.force_login(user)
+    chosen = random.sample(product_ids, items)
+    for product_id in chosen:
+        recorder.call(
+            'add_to_cart',
+            lambda: client.post(
+                '/add-to-cart/',
+                {'product_id': product_id, 'quantity': 2},
+                content_type='application/json',
+            ),
+        )
+    recorder.call(
+        'remove_from_cart',
+        lambda: client.post(
+            '/remove-from-cart/',
+            {'product_id': chosen[0]},
+            content_type='application/json',
+        ),
+    )
+    recorder.call(
+        'create_order',
+        lambda: client.post(
+            '/create-order/',
+            {'delivery_date': '2024-03-01', 'delivery_time': '12:00'},
+            content_type='application/json',
+        ),
+    )
+
+    list_orders = OrderViewSet.as_view({'get': 'list'})
+    for endpoint, params in (
+        ('list_orders', {}),
+        ('list_orders_cursor', {'pagination': 'cursor'}),
+    ):
+        request = factory.get('/orders/', {'page_size': page_size, **params})
+        force_authenticate(request, user=user)
+        recorder.call(endpoint, lambda: list_orders(request).render())
+    client.logout()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--orders-per-user', type=int, default=5)
+    parser.add_argument(
+        '--sessions',
+        type=int,
+        default=500,
+        help='Flows to run (users are reused round-robin)',
+    )
+    parser.add_argument(
+        '--warmup', type=int, default=20, help='Flows run before measuring'
+    )
+    parser.add_argument(
+        '--items',
+        type=int,
+        default=3,
+        help='Products added to the cart per flow',
+    )
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--database', help='SQLite file to use (a temporary file by default)'
+    )
+    parser.add_argument(
+        '--output', help='Write the JSON report to this file instead of stdout'
+    )
+    args = parser.parse_args()
+
+    database = setup_django(args.database)
+    migrate()
+    dataset = seed_dataset(
+        users=args.users,
+        products=args.products,
+        orders_per_user=args.orders_per_user,
+    )
+
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+    from rest_framework.test import APIRequestFactory
+    from products.models import Product
+
+    random.seed(args.seed)
+    users = list(
+        User.objects.filter(username__startswith='bench-user-').order_by('id')
+    )
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    client = Client()
+    factory = APIRequestFactory()
+
+    warmup = Recorder()
+    for position in range(args.warmup):
+        run_session(
+            warmup,
+            client,
+            factory,
+            users[position % len(users)],
+            product_ids,
+            args.items,
+            args.page_size,
+        )
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    for position in range(args.warmup, args.warmup + args.sessions):
+        run_session(
+            recorder,
+            client,
+            factory,
+            users[position % len(users)],
+            product_ids,
+            args.items,
+            args.page_size,
+        )
+    elapsed = time.perf_counter() - started
+
+    endpoints = recorder.report()
+    for endpoint, result in endpoints.items():
+        print(
+            f"{endpoint}: p50 {result['latency']['p50_ms']} ms, "
+            f"{result['queries']['mean']} queries"
+        )
+
+    write_report(
+        {
+            'benchmark': 'checkout',
+            'revision': git_revision(),
+            'database': {'vendor': connection.vendor, 'name': database},
+            'dataset': dataset,
+            'parameters': {
+                'sessions': args.sessions,
+                'warmup': args.warmup,
+                'items': args.items,
+                'page_size': args.page_size,
+                'seed': args.seed,
+            },
+            'sessions_per_s': (
+                round(args.sessions / elapsed, 1) if elapsed else None
+            ),
+            'endpoints': endpoints,
+        },
+        args.output,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Measures what persistent database connections (CONN_MAX_AGE) save per request.
+
+Requests are sent through Django's WSGI handler, so the request_started /
+request_finished signals open and close connections exactly as they do under
+uWSGI. The same product reads run with CONN_MAX_AGE=0 (a new connection per
+request, the development default) and with a persistent connection (the
+production profile), counting the connections opened and timing bare connection
+setup.
+
+Connection setup is nearly free with SQLite; run with --configured against a
+scratch PostgreSQL (USE_POSTGRES=true and DB_* variables, optionally DB_HOST
+pointing at pgbouncer) to see the network and authentication round trips a real
+server costs.
+
+Usage:
+    python -m benchmarks.bench_connections [--requests 1000] [--configured]
+        [--output report.json]
+"""
+
+import argparse
+import io
+import random
+import time
+
+from benchmarks.common import (
+    git_revision,
+    migrate,
+    seed_dataset,
+    setup_django,
+    summarize,
+    time_calls,
+    write_report,
+)
+
+
+def wsgi_get(handler, path):
+    """
+    Serves one GET through the WSGI handler, closing the response as a WSGI
+    server does.
+    """
+    from wsgiref.util import setup_testing_defaults
+
+    path, _, query = path.partition('?')
+    environ = {
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'REQUEST_METHOD': 'GET',
+        'wsgi.input': io.BytesIO(),
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+    response = handler(environ, lambda status, headers: statuses.append(status))
+    b''.join(response)
+    response.close()
+    return statuses[0]
+
+
+def run(handler, product_ids, max_age):
+    """
+    Reads `product_ids` with the given CONN_MAX_AGE and returns latencies and
+    connections opened.
+    """
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = max_age
+    opened = []
+
+    def count(sender, connection, **kwargs):
+        opened.append(connection.alias)
+
+    connection_created.connect(count)
+    try:
+        samples = []
+        # A unique query string per request misses the response cache, so every
+        # request reads the database.
+        for i, pk in enumerate(product_ids):
+            path = f'/products/{pk}/?conn_max_age={max_age}&request={i}'
+            started = time.perf_counter()
+            status = wsgi_get(handler, path)
+            samples.append(time.perf_counter() - started)
+            if not status.startswith('200'):
+                raise RuntimeError(f'GET {path} answered {status}')
+    finally:
+        connection_created.disconnect(count)
+        connection.close()
+    return {'latency': summarize(samples), 'connections_opened': len(opened)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument(
+        '--max-age',
+        type=int,
+        default=60,
+        help='CONN_MAX_AGE of the persistent run',
+    )
+    parser.add_argument(
+        '--configured',
+        action='store_true',
+        help=(
+            'Use the database configured by the settings (must be a scratch '
+            'database)'
+        ),
+    )
+    parser.add_argument(
+        '--database', help='SQLite file to use (a temporary file by default)'
+    )
+    parser.add_argument(
+        '--output', help='Write the JSON report to this file instead of stdout'
+    )
+    args = parser.parse_args()
+
+    database = setup_django(args.database, configured=args.configured)
+    migrate()
+    dataset = seed_dataset(users=10, products=args.products, orders_per_user=1)
+
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from products.models import Product
+
+    random.seed(0)
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    requested = [random.choice(product_ids) for _ in range(args.requests)]
+    handler = WSGIHandler()
+    wsgi_get(handler, f'/products/{product_ids[0]}/')
+
+    def connect():
+        connection.close()
+        connection.ensure_connection()
+
+    connect_latency = summarize(time_calls(connect, min(args.requests, 200)))
+    per_request = run(handler, requested, 0)
+    persistent = run(handler, requested, args.max_age)
+    for name, result in (
+        ('per_request', per_request),
+        ('persistent', persistent),
+    ):
+        print(
+            f"{name}: p50 {result['latency']['p50_ms']} ms, "
+            f"{result['connections_opened']} connections opened"
+        )
+
+    write_report(
+        {
+            'benchmark': 'connections',
+            'revision': git_revision(),
+            'database': {'vendor': connection.vendor, 'name': str(database)},
+            'dataset': dataset,
+            'requests': args.requests,
+            'connect': connect_latency,
+            'per_request': per_request,
+            'persistent': dict(persistent, conn_max_age=args.max_age),
+            'saved_per_request_ms': {
+                key: round(
+                    per_request['latency'][key] - persistent['latency'][key], 3
+                )
+                for key in ('mean_ms', 'p50_ms', 'p95_ms', 'p99_ms')
+            },
+        },
+        args.output,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Measures what retries of add-to-cart and create-order cost with an
+`Idempotency-Key` header (autocompany/idempotency.py): every simulated session
+sends each request once, then `--retries` more times with the same key, as a
+mobile client on a flaky network would. The first requests run the views; the
+retries are answered from the idempotency cache.
+
+Latency and query counts are reported per endpoint for first requests and
+retries, through the views, so authentication and serialization are included.
+The cache is the in-process locmem stand-in; with Redis or Memcached add one
+network round trip per retry.
+
+Usage:
+    python -m benchmarks.bench_idempotency [--sessions 300] [--retries 3]
+        [--output report.json]
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.common import (
+    git_revision,
+    migrate,
+    seed_dataset,
+    setup_django,
+    summarize,
+    write_report,
+)
+
+
+def run(users, product_ids, retries):
+    """
+    Runs one add-to-cart and checkout session per user and returns latencies and
+    query counts.
+    """
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from orders.models import Order
+    from orders.views import AddToCartView, CreateOrderView
+
+    factory = APIRequestFactory()
+    views = {
+        'add_to_cart': AddToCartView.as_view(),
+        'create_order': CreateOrderView.as_view(),
+    }
+    samples, queries, failures = (
+        defaultdict(list),
+        defaultdict(list),
+        defaultdict(int),
+    )
+
+    def post(endpoint, user, data, key, attempt):
+        request = factory.post(
+            f'/{endpoint}/', data, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+        force_authenticate(request, user=user)
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = views[endpoint](request)
+            samples[endpoint, attempt].append(time.perf_counter() - started)
+        queries[endpoint, attempt].append(len(captured))
+        if response.status_code >= 400:
+            failures[endpoint, attempt] += 1
+
+    for user in users:
+        requests = [
+            ('add_to_cart', {'product_id': product_id, 'quantity': 1})
+            for product_id in random.sample(product_ids, 3)
+        ] + [('create_order', {'delivery_date': '2024-03-01'})]
+        for number, (endpoint, data) in enumerate(requests):
+            key = f'{user.pk}-{number}'
+            post(endpoint, user, data, key, 'first')
+            for _ in range(retries):
+                post(endpoint, user, data, key, 'retry')
+
+    orders = Order.objects.filter(user__in=users).count()
+    return {
+        'results': {
+            f'{endpoint} {attempt}': {
+                'latency': summarize(samples[endpoint, attempt]),
+                'queries_mean': round(
+                    sum(queries[endpoint, attempt])
+                    / len(queries[endpoint, attempt]),
+                    2,
+                ),
+                'failures': failures[endpoint, attempt],
+            }
+            for endpoint, attempt in samples
+        },
+        # One order per session however many retries were sent.
+        'orders_created': orders,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--sessions', type=int, default=300)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument(
+        '--database', help='SQLite file to use (a temporary file by default)'
+    )
+    parser.add_argument(
+        '--output', help='Write the JSON report to this file instead of stdout'
+    )
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    migrate()
+    dataset = seed_dataset(
+        users=args.sessions, products=2000, orders_per_user=0
+    )
+
+    from django.contrib.auth.models import User
+    from django.db.models import F
+
+    from products.models import Product
+
+    # Plenty of stock, so no session fails on it.
+    Product.objects.update(stock_quantity=F('stock_quantity') + 1_000_000)
+    random.seed(0)
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    users = list(User.objects.order_by('id')[:args.sessions])
+
+    report = run(users, product_ids, args.retries)
+    for name, result in report['results'].items():
+        print(
+            f"{name}: p50 {result['latency']['p50_ms']} ms, "
+            f"{result['queries_mean']} queries"
+        )
+    print(
+        f"orders created: {report['orders_created']} for {len(users)} sessions"
+    )
+
+    write_report({
+        'benchmark': 'idempotency',
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'dataset': dataset,
+        'sessions': args.sessions,
+        'retries': args.retries,
+        **report,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
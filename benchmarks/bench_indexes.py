@@ -0,0 +1,133 @@
+"""
+Shows the query plans and latencies of the hot cart and order lookups before and
+after the composite indexes of orders migration 0006.
+
+The dataset is seeded at migration 0005 (without the indexes), the lookups are
+explained and timed, then the index migration is applied and the same lookups
+run again.
+
+Usage:
+    python -m benchmarks.bench_indexes [--users 2000] [--repeat 500]
+        [--output report.json]
+"""
+
+import argparse
+import random
+
+from benchmarks.common import (
+    migrate,
+    seed_dataset,
+    setup_django,
+    summarize,
+    time_calls,
+    write_report,
+)
+
+BEFORE = ('orders', '0005_stockreservation')
+AFTER = ('orders', '0006_lookup_indexes')
+
+
+def lookups(user_ids, cart_items):
+    """Returns the benchmarked lookups as name -> (queryset factory) pairs."""
+    from orders.models import CartItem, Order, ShoppingCart
+
+    return {
+        'active_cart_by_user_status': lambda: ShoppingCart.objects.filter(
+            user_id=random.choice(user_ids), status='active'
+        ).order_by('-created_at')[:1],
+        'completed_carts_by_user_status': lambda: ShoppingCart.objects.filter(
+            user_id=random.choice(user_ids), status='completed'
+        ).order_by('-created_at'),
+        'cart_item_by_cart_product': lambda: CartItem.objects.filter(
+            **dict(zip(('cart_id', 'product_id'), random.choice(cart_items)))
+        ),
+        'orders_by_user_newest_first': lambda: Order.objects.filter(
+            user_id=random.choice(user_ids)
+        ).order_by('-ordered_at')[:10],
+        'orders_by_date_range': lambda: Order.objects.order_by('-ordered_at')[
+            :50
+        ],
+    }
+
+
+def measure(label, user_ids, cart_items, repeat):
+    from django.db import connection
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    results = {}
+    for name, factory in lookups(user_ids, cart_items).items():
+        results[name] = {
+            'plan': factory().explain(),
+            'latency': summarize(time_calls(lambda: list(factory()), repeat)),
+        }
+        print(f"[{label}] {name}: p50 {results[name]['latency']['p50_ms']} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--orders-per-user', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument(
+        '--database', help='SQLite file to use (a temporary file by default)'
+    )
+    parser.add_argument(
+        '--output', help='Write the JSON report to this file instead of stdout'
+    )
+    args = parser.parse_args()
+
+    database = setup_django(args.database)
+    migrate()
+    migrate(BEFORE)
+    dataset = seed_dataset(
+        users=args.users,
+        products=args.products,
+        orders_per_user=args.orders_per_user,
+    )
+
+    from django.db import connection
+    from orders.models import CartItem, ShoppingCart
+
+    random.seed(0)
+    user_ids = list(
+        ShoppingCart.objects.values_list('user_id', flat=True).distinct()
+    )
+    cart_items = list(
+        CartItem.objects.values_list('cart_id', 'product_id')[:5000]
+    )
+
+    before = measure('before', user_ids, cart_items, args.repeat)
+    migrate(AFTER)
+    after = measure('after', user_ids, cart_items, args.repeat)
+
+    write_report(
+        {
+            'benchmark': 'indexes',
+            'database': {'vendor': connection.vendor, 'name': database},
+            'dataset': dataset,
+            'repeat': args.repeat,
+            'before': before,
+            'after': after,
+            'p50_speedup': {
+                name: round(
+                    before[name]['latency']['p50_ms']
+                    / after[name]['latency']['p50_ms'],
+                    2,
+                )
+                for name in before
+                if after[name]['latency']['p50_ms']
+            },
+        },
+        args.output,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Measures the quote endpoint for fleet baskets of hundreds to thousands of lines.
+
+Each basket is priced three ways: a per-line loop in the style of
+`CartItem.total_price` (one product query and Decimal arithmetic per line, the
+baseline), orders.pricing.price_basket (one query, integer cents a column at a
+time), and end to end through POST /quote/ (JSON parsing, validation, pricing
+and rendering). Both pricings must agree on the totals; the benchmark checks it
+before timing.
+
+Usage:
+    python -m benchmarks.bench_quotes [--lines 100 1000 5000] [--repeat 50]
+        [--output report.json]
+"""
+
+import argparse
+import json
+import random
+import sys
+from decimal import ROUND_HALF_UP, Decimal
+
+from benchmarks.common import (
+    git_revision,
+    migrate,
+    seed_dataset,
+    setup_django,
+    summarize,
+    time_calls,
+    write_report,
+)
+
+
+def per_line_quote(quantities):
+    """
+    The baseline: prices every line with its own query and Decimal arithmetic.
+    """
+    from django.conf import settings
+
+    from products.models import Product
+
+    tiers = sorted(
+        (quantity, Decimal(percent))
+        for quantity, percent in settings.QUOTE_VOLUME_DISCOUNTS.items()
+    )
+    subtotal = Decimal('0')
+    for product_id, quantity in quantities.items():
+        product = Product.objects.filter(pk=product_id).first()
+        if product is None:
+            continue
+        gross = product.price * quantity
+        percent = max(
+            [rate for threshold, rate in tiers if quantity >= threshold],
+            default=Decimal('0'),
+        )
+        discount = (gross * percent / 100).quantize(
+            Decimal('0.01'), rounding=ROUND_HALF_UP
+        )
+        subtotal += gross - discount
+    tax = (subtotal * Decimal(settings.QUOTE_TAX_RATE) / 100).quantize(
+        Decimal('0.01'), rounding=ROUND_HALF_UP
+    )
+    return subtotal + tax
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument(
+        '--lines', type=int, nargs='+', default=[100, 1000, 5000]
+    )
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument(
+        '--database', help='SQLite file to use (a temporary file by default)'
+    )
+    parser.add_argument(
+        '--output', help='Write the JSON report to this file instead of stdout'
+    )
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    migrate()
+    dataset = seed_dataset(users=10, products=args.products, orders_per_user=1)
+
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from orders.pricing import price_basket
+    from orders.views import QuoteView
+    from products.models import Product
+
+    random.seed(0)
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    user = User.objects.first()
+    view = QuoteView.as_view()
+    factory = APIRequestFactory()
+
+    results = {}
+    for lines in args.lines:
+        quantities = {
+            product_id: random.choice([1, 2, 5, 12, 60, 150])
+            for product_id in random.sample(product_ids, lines)
+        }
+        body = json.dumps(
+            {
+                'items': [
+                    {'product_id': pk, 'quantity': quantity}
+                    for pk, quantity in quantities.items()
+                ]
+            }
+        )
+
+        def endpoint():
+            request = factory.post(
+                '/quote/', body, content_type='application/json'
+            )
+            force_authenticate(request, user=user)
+            response = view(request)
+            response.render()
+            return response
+
+        if price_basket(quantities).total != per_line_quote(quantities) * 100:
+            raise RuntimeError(
+                f'{lines} lines: the per-line and the batched quotes differ'
+            )
+        if endpoint().status_code != 200:
+            raise RuntimeError(f'{lines} lines: POST /quote/ failed')
+
+        results[lines] = {
+            'per_line': summarize(
+                time_calls(
+                    lambda: per_line_quote(quantities), max(1, args.repeat // 5)
+                )
+            ),
+            'batched': summarize(
+                time_calls(lambda: price_basket(quantities), args.repeat)
+            ),
+            'endpoint': summarize(time_calls(endpoint, args.repeat)),
+        }
+        print(
+            f"{lines} lines: per-line p50 "
+            f"{results[lines]['per_line']['p50_ms']} ms, "
+            f"batched p50 {results[lines]['batched']['p50_ms']} ms, endpoint "
+            f"p50 {results[lines]['endpoint']['p50_ms']} ms"
+        )
+
+    write_report({
+        'benchmark': 'quotes',
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'dataset': dataset,
+        'repeat': args.repeat,
+        'results': results,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Compares the two ways a list page is turned into JSON: model instances through
+the ModelSerializer and REST framework's JSONRenderer, against `.values()` rows
+built by autocompany.rendering.ValuesRows and encoded by FastJSONRenderer
+(orjson when installed).
+
+For product, order and cart item pages of `--page-size` rows, each pipeline is
+timed end to end (query, rows, JSON) and split into its stages: fetching and
+building the rows, and encoding them. Both pipelines must produce the same
+bytes; the benchmark checks it before timing.
+
+Usage:
+    python -m benchmarks.bench_rendering [--page-size 100] [--repeat 300]
+        [--output report.json]
+"""
+
+import argparse
+import sys
+
+from benchmarks.common import (
+    git_revision,
+    migrate,
+    seed_dataset,
+    setup_django,
+    summarize,
+    time_calls,
+    write_report,
+)
+
+
+def measure(queryset, serializer_class, repeat):
+    """Times the serializer and the values pipelines for one page queryset."""
+    from rest_framework.renderers import JSONRenderer
+
+    from autocompany.rendering import FastJSONRenderer, values_rows
+
+    plan = values_rows(serializer_class)
+    slow_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+
+    def serializer_pipeline():
+        return slow_renderer.render(
+            serializer_class(list(queryset.all()), many=True).data
+        )
+
+    def values_pipeline():
+        return fast_renderer.render(plan.rows(plan.values(queryset.all())))
+
+    if serializer_pipeline() != values_pipeline():
+        raise RuntimeError(
+            f'{serializer_class.__name__}: the two pipelines produce different '
+            'JSON'
+        )
+
+    instances = list(queryset.all())
+    serializer_data = serializer_class(instances, many=True).data
+    values = list(plan.values(queryset.all()))
+    rows = plan.rows(values)
+
+    result = {
+        'rows': len(instances),
+        'bytes': len(values_pipeline()),
+        'serializer': {
+            'total': summarize(time_calls(serializer_pipeline, repeat)),
+            'fetch': summarize(
+                time_calls(lambda: list(queryset.all()), repeat)
+            ),
+            'serialize': summarize(
+                time_calls(
+                    lambda: serializer_class(instances, many=True).data, repeat
+                )
+            ),
+            'encode': summarize(
+                time_calls(
+                    lambda: slow_renderer.render(serializer_data), repeat
+                )
+            ),
+        },
+        'values': {
+            'total': summarize(time_calls(values_pipeline, repeat)),
+            'fetch': summarize(
+                time_calls(lambda: list(plan.values(queryset.all())), repeat)
+            ),
+            'serialize': summarize(
+                time_calls(lambda: plan.rows(values), repeat)
+            ),
+            'encode': summarize(
+                time_calls(lambda: fast_renderer.render(rows), repeat)
+            ),
+        },
+    }
+    result['p50_speedup'] = {
+        stage: round(
+            result['serializer'][stage]['p50_ms']
+            / result['values'][stage]['p50_ms'],
+            2,
+        )
+        for stage in result['serializer']
+        if result['values'][stage]['p50_ms']
+    }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=300)
+    parser.add_argument(
+        '--database', help='SQLite file to use (a temporary file by default)'
+    )
+    parser.add_argument(
+        '--output', help='Write the JSON report to this file instead of stdout'
+    )
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    migrate()
+    dataset = seed_dataset(users=50, products=2000, orders_per_user=4)
+
+    from autocompany.rendering import orjson
+    from orders.models import CartItem, Order
+    from orders.serializers import CartItemSerializer, OrderSerializer
+    from products.models import Product
+    from products.serializers import ProductSerializer
+
+    pages = {
+        'products': (
+            Product.objects.order_by('id')[: args.page_size],
+            ProductSerializer,
+        ),
+        'orders': (
+            Order.objects.order_by('-id')[: args.page_size],
+            OrderSerializer,
+        ),
+        'cart_items': (
+            CartItem.objects.order_by('id')[: args.page_size],
+            CartItemSerializer,
+        ),
+    }
+    results = {}
+    for name, (queryset, serializer_class) in pages.items():
+        results[name] = measure(queryset, serializer_class, args.repeat)
+        print(f"{name}: {results[name]['p50_speedup']}")
+
+    write_report(
+        {
+            'benchmark': 'rendering',
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'encoder': (
+                f'orjson {orjson.__version__}'
+                if orjson is not None
+                else 'json (orjson not installed)'
+            ),
+            'dataset': dataset,
+            'page_size': args.page_size,
+            'repeat': args.repeat,
+            'results': results,
+        },
+        args.output,
+    )
+
+
+if __name__ == '__main__':
+    main()
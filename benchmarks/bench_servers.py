@@ -0,0 +1,322 @@
+"""
+Compares how many concurrent catalog reads the uWSGI deployment (sync views,
+WORKERS processes as in the Dockerfile) and a single uvicorn process (ASGI, sync
+and async views) sustain, and the memory each server uses to do it.
+
+Both servers run against the same seeded SQLite file through a generated
+settings module that adds a simulated network round trip to every query
+(`--db-latency-ms`), which is where a server that holds a process per request
+runs out of concurrency. The delay is added by a query wrapper installed on
+every new database connection, not by a middleware, so the async views keep
+their async middleware chain under uvicorn. Requests are fired by an asyncio
+client at increasing concurrency levels; the resident memory of each server's
+process tree is sampled while it runs.
+
+Requires `uwsgi` and `uvicorn` on the PATH; a missing server is reported and
+skipped.
+
+Usage:
+    python -m benchmarks.bench_servers [--concurrency 1 8 32 64]
+        [--requests 400] [--output report.json]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import (
+    ROOT,
+    git_revision,
+    migrate,
+    seed_dataset,
+    setup_django,
+    summarize,
+    write_report,
+)
+
+SETTINGS_TEMPLATE = '''from autocompany.settings import *  # noqa: F401,F403
+
+DEBUG = False
+DATABASES = {{
+    'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': {database!r}}},
+}}
+BENCH_DB_LATENCY_MS = {latency}
+
+from django.db.backends.signals import connection_created  # noqa: E402
+from benchmarks.bench_servers import add_database_latency  # noqa: E402
+
+connection_created.connect(add_database_latency)
+LOGGING = {{'version': 1, 'disable_existing_loggers': True}}
+'''
+
+
+def add_database_latency(sender, connection, **kwargs):
+    """
+    Adds BENCH_DB_LATENCY_MS of blocking sleep to every query of a new
+    connection, like a remote database would. Connected to `connection_created`;
+    a reconnecting connection keeps its wrapper.
+    """
+    from django.conf import settings
+
+    if getattr(connection, 'bench_latency', False):
+        return
+    delay = settings.BENCH_DB_LATENCY_MS / 1000
+
+    def sleep_first(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    connection.execute_wrappers.append(sleep_first)
+    connection.bench_latency = True
+
+
+def server_commands(port, workers):
+    """Returns the command line of each benchmarked server."""
+    return {
+        'uwsgi': [
+            'uwsgi',
+            '--http',
+            f':{port}',
+            '--processes',
+            str(workers),
+            '--master',
+            '--module',
+            'autocompany.wsgi:application',
+            '--disable-logging',
+            '--die-on-term',
+        ],
+        'uvicorn': [
+            'uvicorn',
+            'autocompany.asgi:application',
+            '--port',
+            str(port),
+            '--workers',
+            '1',
+            '--no-access-log',
+            '--log-level',
+            'warning',
+        ],
+    }
+
+
+def process_tree_rss(pid):
+    """
+    Returns the resident memory in bytes of a process and its descendants (Linux
+    /proc).
+    """
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            for line in (
+                Path(f'/proc/{current}/status').read_text().splitlines()
+            ):
+                if line.startswith('VmRSS:'):
+                    total += int(line.split()[1]) * 1024
+            for task in Path(f'/proc/{current}/task').iterdir():
+                pending += [
+                    int(child)
+                    for child in (task / 'children').read_text().split()
+                ]
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+async def fetch(port, path):
+    """
+    Sends one GET request on a fresh connection and returns the status code.
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request = (
+        f'GET {path} HTTP/1.1\r\n'
+        'Host: localhost\r\nConnection: close\r\n\r\n'
+    )
+    writer.write(request.encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+async def load(port, paths, concurrency, requests, pid):
+    """
+    Runs `requests` GETs with `concurrency` in flight and samples the server's
+    memory.
+    """
+    samples, errors, peak_rss = [], 0, 0
+    queue = iter(paths[:requests])
+
+    async def worker():
+        nonlocal errors
+        for path in queue:
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, path)
+            except OSError:
+                status = None
+            samples.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+
+    async def sample_memory():
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, process_tree_rss(pid))
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.ensure_future(sample_memory())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    peak_rss = max(peak_rss, process_tree_rss(pid))
+
+    result = summarize(samples)
+    result['throughput_per_s'] = round(len(samples) / elapsed, 1)
+    result['errors'] = errors
+    result['peak_rss_mb'] = round(peak_rss / 2**20, 1)
+    return result
+
+
+def wait_until_ready(port, path, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited with code {process.returncode}')
+        try:
+            if asyncio.run(fetch(port, path)) == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(
+        f'Server did not answer on port {port} within {timeout}s'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=2,
+        help='uWSGI processes (the Dockerfile default)',
+    )
+    parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=[1, 8, 32, 64]
+    )
+    parser.add_argument(
+        '--requests',
+        type=int,
+        default=400,
+        help='Requests per concurrency level',
+    )
+    parser.add_argument('--db-latency-ms', type=float, default=5.0)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument(
+        '--database', help='SQLite file to use (a temporary file by default)'
+    )
+    parser.add_argument(
+        '--output', help='Write the JSON report to this file instead of stdout'
+    )
+    args = parser.parse_args()
+
+    database = setup_django(args.database)
+    migrate()
+    dataset = seed_dataset(users=10, products=args.products, orders_per_user=1)
+
+    from products.models import Product
+    product_ids = list(Product.objects.values_list('id', flat=True))
+
+    settings_dir = tempfile.mkdtemp(prefix='autocompany-bench-settings-')
+    Path(settings_dir, 'bench_settings.py').write_text(
+        SETTINGS_TEMPLATE.format(database=database, latency=args.db_latency_ms)
+    )
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='bench_settings',
+        PYTHONPATH=os.pathsep.join([settings_dir, str(ROOT)]),
+    )
+
+    scenarios = [
+        ('uwsgi', 'sync', '/products/{}/'),
+        ('uvicorn', 'sync', '/products/{}/'),
+        ('uvicorn', 'async', '/async/products/{}/'),
+    ]
+    commands = server_commands(args.port, args.workers)
+    results, skipped = {}, []
+    random.seed(0)
+    for server, flavour, template in scenarios:
+        if shutil.which(commands[server][0]) is None:
+            skipped.append(server)
+            print(f'{server} is not installed; skipping.')
+            continue
+        process = subprocess.Popen(
+            commands[server], cwd=ROOT, env=dict(env, SERVER=server),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        name = f'{server}_{flavour}'
+        try:
+            wait_until_ready(
+                args.port, template.format(product_ids[0]), process
+            )
+            results[name] = {}
+            for concurrency in args.concurrency:
+                # A unique query string per request misses the response cache,
+                # so every request reads the database.
+                paths = [
+                    f'{template.format(random.choice(product_ids))}?request={i}'
+                    for i in range(args.requests)
+                ]
+                result = asyncio.run(
+                    load(
+                        args.port,
+                        paths,
+                        concurrency,
+                        args.requests,
+                        process.pid,
+                    )
+                )
+                results[name][str(concurrency)] = result
+                print(
+                    f"{name} x{concurrency}: {result['throughput_per_s']} "
+                    f"req/s, p99 {result['p99_ms']} ms, "
+                    f"{result['peak_rss_mb']} MB, {result['errors']} errors"
+                )
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    write_report({
+        'benchmark': 'servers',
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'dataset': dataset,
+        'parameters': {
+            'uwsgi_processes': args.workers,
+            'uvicorn_processes': 1,
+            'requests_per_level': args.requests,
+            'db_latency_ms': args.db_latency_ms,
+        },
+        'skipped': skipped,
+        'results': results,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+Helpers shared by the benchmark scripts: scratch database setup, dataset
+seeding, latency statistics and machine-readable reports.
+
+Benchmarks run against a throwaway SQLite file by default so they never touch
+the development database; pass --database to choose the file.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup_django(database=None, configured=False):
+    """
+    Configures Django for a benchmark run against a scratch SQLite database.
+
+    Args:
+        database (str): Path of the SQLite file to use; a temporary file by
+            default.
+        configured (bool): Keep the database configured by the settings (e.g. a
+            scratch PostgreSQL selected with USE_POSTGRES and DB_*) instead of
+            SQLite.
+
+    Returns:
+        str: The path or name of the database.
+    """
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'autocompany.settings')
+
+    from django.conf import settings
+    if configured:
+        database = settings.DATABASES['default']['NAME']
+    else:
+        database = database or os.path.join(
+            tempfile.mkdtemp(prefix='autocompany-bench-'), 'bench.sqlite3'
+        )
+        settings.DATABASES['default'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': database,
+        }
+    settings.DEBUG = False
+
+    import django
+    django.setup()
+    return database
+
+
+def migrate(*targets):
+    """
+    Runs `migrate` quietly, optionally to the given (app_label, migration)
+    targets.
+    """
+    from django.core.management import call_command
+
+    if not targets:
+        call_command('migrate', verbosity=0)
+    for app_label, migration in targets:
+        call_command('migrate', app_label, migration, verbosity=0)
+
+
+def seed_dataset(
+    users=1000,
+    products=2000,
+    orders_per_user=5,
+    items_per_cart=3,
+    batch_size=2000,
+):
+    """
+    Bulk-loads a dataset far larger than `insert_sample_data`: every user gets
+    an active cart and `orders_per_user` completed carts with orders. Signals
+    are bypassed (bulk operations), so the product cache is not involved.
+
+    Returns:
+        dict: The number of rows created per model.
+    """
+    from django.contrib.auth.models import User
+    from orders.models import CartItem, Order, ShoppingCart
+    from products.models import Product
+
+    Product.objects.bulk_create(
+        (
+            Product(
+                sku=f'BENCH-{i:07d}',
+                name=f'Toyota Part {i:07d}',
+                description=f'Benchmark part number {i}.',
+                price=Decimal(10 + i % 490) + Decimal('0.99'),
+                stock_quantity=1_000_000
+            )
+            for i in range(products)
+        ),
+        batch_size=batch_size
+    )
+    prices = dict(Product.objects.values_list('id', 'price'))
+    product_ids = list(prices)
+
+    User.objects.bulk_create(
+        (
+            User(username=f'bench-user-{i:06d}', password='!')
+            for i in range(users)
+        ),
+        batch_size=batch_size,
+    )
+    user_ids = list(
+        User.objects.filter(username__startswith='bench-user-').values_list(
+            'id', flat=True
+        )
+    )
+
+    carts = []
+    for user_id in user_ids:
+        carts.extend(
+            ShoppingCart(user_id=user_id, status='completed')
+            for _ in range(orders_per_user)
+        )
+        carts.append(ShoppingCart(user_id=user_id, status='active'))
+    ShoppingCart.objects.bulk_create(carts, batch_size=batch_size)
+    cart_rows = list(
+        ShoppingCart.objects.filter(user_id__in=user_ids).values_list(
+            'id', 'user_id', 'status'
+        )
+    )
+
+    # Completed carts carry the prices frozen at checkout and their orders the
+    # stored total.
+    items, totals = [], {}
+    for position, (cart_id, _, status) in enumerate(cart_rows):
+        completed = status == 'completed'
+        for line in range(items_per_cart):
+            product_id = product_ids[
+                (position * items_per_cart + line * 7919) % len(product_ids)
+            ]
+            unit_price = prices[product_id] if completed else None
+            items.append(
+                CartItem(
+                    cart_id=cart_id,
+                    product_id=product_id,
+                    quantity=1 + line,
+                    unit_price=unit_price,
+                )
+            )
+            if completed:
+                totals[cart_id] = (
+                    totals.get(cart_id, Decimal('0')) + (1 + line) * unit_price
+                )
+    CartItem.objects.bulk_create(items, batch_size=batch_size)
+
+    Order.objects.bulk_create(
+        (
+            Order(
+                cart_id=cart_id,
+                user_id=user_id,
+                delivery_date=date(2024, 3, 1),
+                delivery_time=dtime(12, 0),
+                total_price=totals.get(cart_id, Decimal('0')),
+            )
+            for cart_id, user_id, status in cart_rows
+            if status == 'completed'
+        ),
+        batch_size=batch_size,
+    )
+    return {
+        'users': len(user_ids),
+        'products': len(product_ids),
+        'carts': len(cart_rows),
+        'cart_items': len(items),
+        'orders': users * orders_per_user,
+    }
+
+
+def summarize(samples):
+    """
+    Returns latency percentiles (milliseconds) and throughput for a list of
+    durations in seconds.
+    """
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return round(
+            ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000,
+            3,
+        )
+
+    total = sum(ordered)
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'throughput_per_s': round(len(ordered) / total, 1) if total else None,
+    }
+
+
+def time_calls(function, repeat):
+    """
+    Calls `function` `repeat` times and returns the individual durations in
+    seconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def git_revision():
+    """
+    Returns the commit the benchmark ran against, so reports can be matched to
+    releases.
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(report, output=None):
+    """
+    Writes a JSON report to `output` (a path) or stdout, with sorted keys so
+    runs diff cleanly.
+    """
+    text = json.dumps(report, indent=2, sort_keys=True, default=str)
+    if output:
+        Path(output).write_text(text + '\n')
+    else:
+        print(text)
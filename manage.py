@@ -6,7 +6,14 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'autocompany.settings')
+    # The test suite adds a replica test database
+    # (autocompany/test_settings.py).
+    settings_module = (
+        'autocompany.test_settings'
+        if sys.argv[1:2] == ['test']
+        else 'autocompany.settings'
+    )
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
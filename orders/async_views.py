@@ -0,0 +1,49 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework.response import Response
+
+from autocompany.asynchronous import async_api_view, request_data
+from .serializers import AddToCartSerializer
+from .views import (
+    add_to_cart as add_to_cart_sync,
+    remove_from_cart as remove_from_cart_sync,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@async_api_view(('POST',), authenticated=True)
+async def add_to_cart(request, user):
+    """
+    Async version of `POST /add-to-cart/`, with the same body, validation, stock
+    reservation and responses.
+
+    Django 4.0 has no async ORM interface (it arrives in 4.1), so the cart
+    transaction runs as one `sync_to_async` call; the event loop stays free
+    while the database answers.
+    """
+    serializer = AddToCartSerializer(data=request_data(request))
+    serializer.is_valid(raise_exception=True)
+    data, status = await sync_to_async(add_to_cart_sync)(
+        user,
+        serializer.validated_data['product_id'],
+        serializer.validated_data.get('quantity', 1),
+    )
+    return Response(data, status=status)
+
+
+@async_api_view(('POST',), authenticated=True)
+async def remove_from_cart(request, user):
+    """
+    Async version of `POST /remove-from-cart/`: removes one unit of a product
+    from the cart.
+    """
+    product_id = request_data(request).get('product_id')
+    if not product_id:
+        logger.error("Product ID not provided in the request.")
+        # The sync view answers this one with a JsonResponse too.
+        return JsonResponse({'error': 'product_id is required'}, status=400)
+    data, status = await sync_to_async(remove_from_cart_sync)(user, product_id)
+    return Response(data, status=status)
@@ -0,0 +1,19 @@
+from django.conf import settings
+
+from autocompany.cache import VersionedCache
+
+
+class OrderCache(VersionedCache):
+    """
+    Version counter for order representations, bumped whenever an Order is saved
+    or deleted (see orders/signals.py). Order totals are stored at checkout, so
+    the version alone validates order representations.
+    """
+    namespace = 'orders'
+
+    @property
+    def alias(self):
+        return settings.ORDER_CACHE_ALIAS
+
+
+order_cache = OrderCache()
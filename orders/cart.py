@@ -0,0 +1,303 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework import status
+
+from products.models import Product
+from .models import CartItem, ShoppingCart, bulk_add_quantities
+from .serializers import CartItemSerializer
+from .stock import InsufficientStock, release, reserve
+
+logger = logging.getLogger(__name__)
+
+
+class CartBusy(Exception):
+    """
+    Raised when a cart stays locked by concurrent requests of the same user.
+    """
+
+
+class CartCheckedOut(Exception):
+    """
+    Raised inside a checkout whose cart was checked out by a concurrent request,
+    to roll it back.
+    """
+
+
+def get_cart_backend():
+    """
+    Returns an instance of the cart backend named by settings.CART_BACKEND.
+    """
+    return import_string(settings.CART_BACKEND)()
+
+
+class CartBackend:
+    """
+    Where active carts live between the first add-to-cart and checkout. The
+    add-to-cart and remove-from-cart endpoints (sync and async) go through `add`
+    and `remove`; checkout gets the cart to turn into an order from `checkout`,
+    as ShoppingCart and CartItem rows.
+    """
+
+    def add(self, user, product_id, quantity):
+        """
+        Adds `quantity` units of a product to the user's cart.
+
+        Returns:
+            tuple: The response data (the cart line, or an error) and the HTTP
+                status code.
+        """
+        raise NotImplementedError
+
+    def remove(self, user, product_id):
+        """
+        Removes one unit of a product from the user's cart.
+
+        Returns:
+            tuple: The response data and the HTTP status code.
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def checkout(self, user):
+        """
+        Yields the user's active ShoppingCart, with every line stored as
+        CartItem rows, or None when the user has no cart. Used inside the
+        checkout transaction; a checkout that does not place the order must
+        raise (e.g. CartCheckedOut), so the transaction and the backend undo
+        their changes.
+        """
+        yield ShoppingCart.objects.active().filter(user=user).first()
+
+
+class DatabaseCartBackend(CartBackend):
+    """
+    Keeps active carts in ShoppingCart/CartItem rows and reserves the added
+    units from stock in the same transaction (orders/stock.py). The default
+    backend.
+    """
+
+    def add(self, user, product_id, quantity):
+        try:
+            with transaction.atomic():
+                # Fetch the active cart; the one-active-cart-per-user constraint
+                # keeps this unique.
+                cart = ShoppingCart.objects.get_active(user)
+                reserve(cart, product_id, quantity)
+                cart_item = CartItem.objects.add_quantity(
+                    cart, product_id, quantity
+                )
+        except InsufficientStock:
+            if not Product.objects.filter(id=product_id).exists():
+                logger.error(f"Product with id {product_id} does not exist.")
+                return {
+                    'error': 'Invalid Product ID'
+                }, status.HTTP_404_NOT_FOUND
+            logger.error(
+                f"Insufficient stock to add {quantity} of product {product_id} "
+                f"for user {user}."
+            )
+            return {
+                'error': 'Insufficient stock.',
+                'product_id': product_id,
+            }, status.HTTP_409_CONFLICT
+
+        # Serialize the cart item to return
+        return CartItemSerializer(cart_item).data, status.HTTP_200_OK
+
+    def remove(self, user, product_id):
+        with transaction.atomic():
+            removed = CartItem.objects.remove_one(user, product_id)
+            if removed:
+                release(user, product_id, 1)
+
+        if not removed:
+            logger.error(
+                f"Product ID {product_id} is not in user {user.username}'s "
+                "active cart."
+            )
+            return {
+                'error': 'Item not found in the active cart.'
+            }, status.HTTP_404_NOT_FOUND
+
+        logger.info(
+            f"Removed one unit of product ID {product_id} from user "
+            f"{user.username}'s cart."
+        )
+        return {'status': 'Item removed'}, status.HTTP_200_OK
+
+
+class CacheCartBackend(CartBackend):
+    """
+    Keeps active carts in the CART_CACHE_ALIAS cache (Redis or Memcached in
+    production, locmem as the in-memory stand-in for development and tests) as
+    one `{product_id: quantity}` entry per user, and writes them to
+    ShoppingCart/CartItem only at checkout.
+
+    Adding costs one primary key read of the product (existence and stock) and
+    two cache round trips, instead of a transaction of several statements. Stock
+    is not reserved while the cart is in the cache: adding only checks that the
+    product has enough stock left, and checkout takes the stock (commit_cart) or
+    fails with 409 when it has run out since. Mutations of one user's cart are
+    serialized with a short lock taken with `cache.add`. Carts expire from the
+    cache after CART_CACHE_TIMEOUT seconds of inactivity.
+
+    The bulk add-to-cart endpoint keeps writing (and reserving) the database
+    cart; checkout merges both.
+    """
+    lock_timeout = 5
+    lock_attempts = 50
+    lock_wait = 0.01
+
+    @property
+    def cache(self):
+        return caches[settings.CART_CACHE_ALIAS]
+
+    def key(self, user):
+        return f'cart:{user.pk}'
+
+    def lock_key(self, user):
+        return f'{self.key(user)}:lock'
+
+    def acquire(self, user):
+        """
+        Takes the user's cart lock, waiting up to about half a second for it.
+        """
+        for _ in range(self.lock_attempts):
+            if self.cache.add(
+                self.lock_key(user), 1, timeout=self.lock_timeout
+            ):
+                return
+            time.sleep(self.lock_wait)
+        raise CartBusy(f"The cart of user {user} is locked by another request.")
+
+    def release(self, user):
+        self.cache.delete(self.lock_key(user))
+
+    @contextmanager
+    def locked(self, user):
+        """Holds the user's cart lock."""
+        self.acquire(user)
+        try:
+            yield
+        finally:
+            self.release(user)
+
+    def lines(self, user):
+        return self.cache.get(self.key(user)) or {}
+
+    def save(self, user, lines):
+        if lines:
+            self.cache.set(
+                self.key(user), lines, timeout=settings.CART_CACHE_TIMEOUT
+            )
+        else:
+            self.cache.delete(self.key(user))
+
+    def add(self, user, product_id, quantity):
+        stock = (
+            Product.objects.filter(pk=product_id)
+            .values_list('stock_quantity', flat=True)
+            .first()
+        )
+        if stock is None:
+            logger.error(f"Product with id {product_id} does not exist.")
+            return {'error': 'Invalid Product ID'}, status.HTTP_404_NOT_FOUND
+
+        with self.locked(user):
+            lines = self.lines(user)
+            in_cart = lines.get(product_id, 0) + quantity
+            if in_cart > stock:
+                logger.error(
+                    f"Insufficient stock to add {quantity} of product "
+                    f"{product_id} for user {user}."
+                )
+                return {
+                    'error': 'Insufficient stock.',
+                    'product_id': product_id,
+                }, status.HTTP_409_CONFLICT
+            lines[product_id] = in_cart
+            self.save(user, lines)
+
+        # The line has no database row (nor cart) until checkout.
+        return {
+            'id': None,
+            'cart': None,
+            'product': product_id,
+            'quantity': in_cart,
+        }, status.HTTP_200_OK
+
+    def remove(self, user, product_id):
+        # The remove-from-cart views pass the raw request value, e.g. a form
+        # field string.
+        product_id = int(product_id)
+        with self.locked(user):
+            lines = self.lines(user)
+            if product_id not in lines:
+                logger.error(
+                    f"Product ID {product_id} is not in user {user.username}'s "
+                    "active cart."
+                )
+                return {
+                    'error': 'Item not found in the active cart.'
+                }, status.HTTP_404_NOT_FOUND
+            if lines[product_id] > 1:
+                lines[product_id] -= 1
+            else:
+                del lines[product_id]
+            self.save(user, lines)
+
+        logger.info(
+            f"Removed one unit of product ID {product_id} from user "
+            f"{user.username}'s cart."
+        )
+        return {'status': 'Item removed'}, status.HTTP_200_OK
+
+    @contextmanager
+    def checkout(self, user):
+        """
+        Writes the cached lines into the user's active ShoppingCart (creating
+        it, and adding to any lines already stored there) with bulk statements.
+        The cached cart is only emptied once the checkout transaction commits:
+        until then it stays in the cache, and the lock stays held so no
+        concurrent add slips in between. A checkout that raises leaves the
+        cached cart as it was and releases the lock at once; if the commit
+        itself fails, the lock expires after `lock_timeout` seconds.
+        """
+        self.acquire(user)
+        try:
+            lines = self.lines(user)
+            if not lines:
+                with super().checkout(user) as cart:
+                    yield cart
+                self.release(user)
+                return
+            cart, created = ShoppingCart.objects.get_or_create(
+                user=user, status='active'
+            )
+            if created:
+                CartItem.objects.bulk_create(
+                    [
+                        CartItem(
+                            cart=cart, product_id=product_id, quantity=quantity
+                        )
+                        for product_id, quantity in lines.items()
+                    ]
+                )
+            else:
+                bulk_add_quantities(CartItem, cart, lines)
+            yield cart
+        except BaseException:
+            self.release(user)
+            raise
+
+        def empty_cart():
+            self.cache.delete(self.key(user))
+            self.release(user)
+
+        transaction.on_commit(empty_cart)
@@ -0,0 +1,236 @@
+import csv
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.utils import timezone
+
+from .models import CartItem, Order
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+ORDER_FIELDS = [
+    'id',
+    'cart_id',
+    'ordered_at',
+    'user_id',
+    'user__username',
+    'delivery_date',
+    'delivery_time',
+    'total_price',
+]
+LINE_FIELDS = [
+    'cart_id',
+    'product_id',
+    'product__sku',
+    'product__name',
+    'quantity',
+    'unit_price',
+]
+CSV_HEADER = [
+    'order_id',
+    'ordered_at',
+    'user_id',
+    'username',
+    'delivery_date',
+    'delivery_time',
+    'order_total',
+    'product_id',
+    'sku',
+    'product_name',
+    'quantity',
+    'unit_price',
+    'line_total',
+]
+
+
+def orders_for_export(start=None, end=None, user_id=None, using='default'):
+    """
+    Returns the orders to export, oldest first.
+
+    Args:
+        start (date): First day (inclusive) of the orders to export, in the
+            current time zone.
+        end (date): Last day (inclusive) of the orders to export.
+        user_id (int): Only export the orders of this user.
+        using (str): The database alias to read from, e.g. a replica.
+
+    Returns:
+        QuerySet: The orders, filtered on `ordered_at` so the
+            order_ordered_at_idx index applies.
+    """
+    queryset = Order.objects.using(using).order_by('pk')
+    if start is not None:
+        queryset = queryset.filter(ordered_at__gte=start_of_day(start))
+    if end is not None:
+        queryset = queryset.filter(
+            ordered_at__lt=start_of_day(end + timedelta(days=1))
+        )
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    return queryset
+
+
+def start_of_day(day):
+    """
+    Returns midnight of `day` as an aware datetime in the current time zone.
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def iter_orders(queryset, chunk_size=1000):
+    """
+    Lazily yields `(order, lines)` pairs, with the order and its cart items as
+    `.values()` dicts.
+
+    Orders are streamed with `.iterator(chunk_size)` (a server-side cursor on
+    PostgreSQL), and the lines of every chunk of orders are read in one query,
+    so memory is bounded by the chunk size whatever the number of orders
+    exported.
+
+    Args:
+        queryset (QuerySet): The orders to export, e.g. from
+            `orders_for_export`.
+        chunk_size (int): Orders fetched from the cursor, and whose lines are
+            read, at a time.
+    """
+    orders = queryset.values(*ORDER_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(orders, chunk_size))
+        if not chunk:
+            break
+        lines = defaultdict(list)
+        items = CartItem.objects.using(queryset.db).filter(
+            cart_id__in=[order['cart_id'] for order in chunk]
+        )
+        for line in items.order_by('cart_id', 'pk').values(*LINE_FIELDS):
+            lines[line['cart_id']].append(line)
+        for order in chunk:
+            yield order, lines.get(order['cart_id'], [])
+
+
+def line_total(line):
+    """
+    Returns the total of an order line at its frozen unit price, or None without
+    one.
+    """
+    if line['unit_price'] is None:
+        return None
+    return line['quantity'] * line['unit_price']
+
+
+def text(value):
+    """
+    Formats a value for the export: ISO dates and times, exact decimals, '' for
+    None.
+    """
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class Echo:
+    """
+    A file-like object whose `write` returns the written value, for csv.writer
+    to stream.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_export(orders):
+    """
+    Yields the CSV export of `(order, lines)` pairs: a header, then one row per
+    order line repeating the order columns. An order without lines gets one row
+    with empty line columns.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for order, lines in orders:
+        head = [
+            order['id'],
+            text(order['ordered_at']),
+            order['user_id'],
+            order['user__username'],
+            text(order['delivery_date']),
+            text(order['delivery_time']),
+            text(order['total_price']),
+        ]
+        if not lines:
+            yield writer.writerow(head + [''] * 6)
+        for line in lines:
+            yield writer.writerow(
+                head
+                + [
+                    line['product_id'],
+                    line['product__sku'] or '',
+                    line['product__name'],
+                    line['quantity'],
+                    text(line['unit_price']),
+                    text(line_total(line)),
+                ]
+            )
+
+
+def jsonl_export(orders):
+    """
+    Yields the JSON Lines export of `(order, lines)` pairs: one object per order
+    with its lines nested. Amounts are strings, so they keep their exact decimal
+    value.
+    """
+    for order, lines in orders:
+        yield json.dumps({
+            'id': order['id'],
+            'ordered_at': text(order['ordered_at']),
+            'user_id': order['user_id'],
+            'username': order['user__username'],
+            'delivery_date': text(order['delivery_date']),
+            'delivery_time': text(order['delivery_time']),
+            'total_price': text(order['total_price']),
+            'lines': [
+                {
+                    'product_id': line['product_id'],
+                    'sku': line['product__sku'],
+                    'name': line['product__name'],
+                    'quantity': line['quantity'],
+                    'unit_price': text(line['unit_price']) or None,
+                    'line_total': text(line_total(line)) or None,
+                }
+                for line in lines
+            ],
+        }) + '\n'
+
+
+def export_orders(queryset, export_format, chunk_size=1000):
+    """
+    Lazily renders orders with their lines and totals, one string per row, for a
+    StreamingHttpResponse or a file.
+
+    Args:
+        queryset (QuerySet): The orders to export, e.g. from
+            `orders_for_export`.
+        export_format (str): `csv` (one row per order line) or `jsonl` (one
+            object per order).
+        chunk_size (int): Orders read from the database at a time.
+
+    Returns:
+        iterator: The lines of the export.
+
+    Raises:
+        ValueError: When the format is not supported.
+    """
+    if export_format == 'csv':
+        return csv_export(iter_orders(queryset, chunk_size))
+    if export_format == 'jsonl':
+        return jsonl_export(iter_orders(queryset, chunk_size))
+    raise ValueError(f"Unsupported export format: {export_format}")
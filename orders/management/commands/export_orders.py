@@ -0,0 +1,84 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from orders.export import EXPORT_FORMATS, export_orders, orders_for_export
+
+
+def day(value):
+    """Parses a YYYY-MM-DD argument."""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams orders with their lines and totals to a CSV or JSONL file, '
+        'for accounting'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', help='File to write (stdout by default)'
+        )
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            help=(
+                'Export format (guessed from the output file extension, csv by '
+                'default)'
+            ),
+        )
+        parser.add_argument(
+            '--start',
+            help='First day of the orders to export, YYYY-MM-DD (inclusive)',
+        )
+        parser.add_argument(
+            '--end',
+            help='Last day of the orders to export, YYYY-MM-DD (inclusive)',
+        )
+        parser.add_argument(
+            '--user', type=int, help='Only export the orders of this user ID'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Orders read from the database at a time',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database to read from, e.g. a replica',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        export_format = options['format'] or (
+            'jsonl'
+            if output and output.endswith(('.jsonl', '.ndjson'))
+            else 'csv'
+        )
+        queryset = orders_for_export(
+            start=day(options['start']) if options['start'] else None,
+            end=day(options['end']) if options['end'] else None,
+            user_id=options['user'],
+            using=options['database'],
+        )
+        lines = export_orders(
+            queryset, export_format, chunk_size=options['chunk_size']
+        )
+
+        if not output:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        try:
+            with open(output, 'w', newline='', encoding='utf-8') as stream:
+                stream.writelines(lines)
+        except OSError as e:
+            raise CommandError(f"Could not write {output}: {e}")
+        self.stderr.write(self.style.SUCCESS(f"Exported orders to {output}."))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from orders.reaper import reap_carts
+
+
+class Command(BaseCommand):
+    help = (
+        'Abandons idle active carts, releases their stock and moves abandoned '
+        'carts to the archive tables'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--idle-days',
+            type=int,
+            help=(
+                'Days without activity before an active cart is abandoned '
+                '(ABANDONED_CART_DAYS by default)'
+            ),
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Carts handled per transaction',
+        )
+
+    def handle(self, *args, **options):
+        result = reap_carts(
+            idle_days=options['idle_days'], batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Abandoned {result.abandoned_carts} idle carts and released "
+                f"{result.released_reservations} stock reservations; "
+                f"archived {result.archived_carts} carts with "
+                f"{result.archived_items} items. "
+                f"{result.rows_reclaimed} rows reclaimed."
+            )
+        )
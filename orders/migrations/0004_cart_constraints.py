@@ -0,0 +1,53 @@
+# Generated by Django 4.0.3 on 2026-10-17 20:46
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Merges rows that would violate the new constraints: duplicate cart items are folded into
+    one row per (cart, product), and each user's extra active carts are merged into the most
+    recently created one.
+    """
+    ShoppingCart = apps.get_model('orders', 'ShoppingCart')
+    CartItem = apps.get_model('orders', 'CartItem')
+
+    duplicate_users = (
+        ShoppingCart.objects.filter(status='active')
+        .values('user').annotate(carts=Count('id')).filter(carts__gt=1)
+        .values_list('user', flat=True)
+    )
+    for user_id in duplicate_users:
+        carts = list(ShoppingCart.objects.filter(user_id=user_id, status='active').order_by('-created_at', '-id'))
+        keep, extras = carts[0], carts[1:]
+        CartItem.objects.filter(cart__in=extras).update(cart=keep)
+        ShoppingCart.objects.filter(pk__in=[cart.pk for cart in extras]).delete()
+
+    duplicate_lines = (
+        CartItem.objects.values('cart', 'product').annotate(rows=Count('id')).filter(rows__gt=1)
+    )
+    for line in duplicate_lines:
+        items = list(CartItem.objects.filter(cart_id=line['cart'], product_id=line['product']).order_by('id'))
+        keep, extras = items[0], items[1:]
+        CartItem.objects.filter(pk=keep.pk).update(quantity=F('quantity') + sum(item.quantity for item in extras))
+        CartItem.objects.filter(pk__in=[item.pk for item in extras]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_shoppingcart_status_alter_shoppingcart_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='unique_cart_product'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'active')), fields=('user',), name='unique_active_cart_per_user'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.3 on 2026-10-17 20:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('orders', '0004_cart_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(help_text='The number of units held.')),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='When the held units are released back to stock unless the cart is checked out.')),
+                ('cart', models.ForeignKey(help_text='The shopping cart the stock is held for.', on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='orders.shoppingcart')),
+                ('product', models.ForeignKey(help_text='The product whose stock is held.', on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stockreservation',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='unique_reservation_cart_product'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:19
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 5000
+
+
+def backfill_snapshots(apps, schema_editor):
+    """
+    Freezes the prices of the orders placed before snapshots existed. Their historical prices
+    were never recorded, so the current product prices are the best available: the totals stay
+    what the API reported until now. Orders are processed in primary key batches, two UPDATE
+    statements per batch, so no statement locks the whole table.
+    """
+    Order = apps.get_model('orders', 'Order')
+    CartItem = apps.get_model('orders', 'CartItem')
+    Product = apps.get_model('products', 'Product')
+
+    price = Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1])
+    price_field = DecimalField(max_digits=12, decimal_places=2)
+    totals = (
+        CartItem.objects.filter(cart_id=OuterRef('cart_id')).order_by()
+        .values('cart_id')
+        .annotate(total=Sum(ExpressionWrapper(F('quantity') * F('unit_price'), output_field=price_field)))
+        .values('total')
+    )
+
+    last_id = 0
+    while True:
+        ids = list(Order.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not ids:
+            break
+        last_id = ids[-1]
+        CartItem.objects.filter(cart__order__pk__in=ids, unit_price__isnull=True).update(unit_price=price)
+        Order.objects.filter(pk__in=ids).update(
+            total_price=Coalesce(Subquery(totals, output_field=price_field), Value(Decimal('0')), output_field=price_field)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_lookup_indexes'),
+        ('products', '0004_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='The product price frozen at checkout; empty while the cart is active.', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), help_text='Total of the order at the prices frozen at checkout.', max_digits=12, verbose_name='Order total'),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('orders', '0007_price_snapshots'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('abandoned', 'Abandoned')], default='active', help_text='The status of the shopping cart.', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ArchivedShoppingCart',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(help_text='When the shopping cart was created.')),
+                ('status', models.CharField(help_text='The status of the shopping cart when it was archived.', max_length=10)),
+                ('archived_at', models.DateTimeField(auto_now_add=True, help_text='When the shopping cart was archived.')),
+                ('user', models.ForeignKey(help_text='The user the shopping cart belonged to.', on_delete=django.db.models.deletion.CASCADE, related_name='archived_carts', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedCartItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField(help_text='The quantity of the product.')),
+                ('added_at', models.DateTimeField(help_text='When the item was added to the cart.')),
+                ('unit_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('cart', models.ForeignKey(help_text='The archived shopping cart the item belonged to.', on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.archivedshoppingcart')),
+                ('product', models.ForeignKey(help_text='The product the item represented.', on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+            ],
+        ),
+    ]
@@ -1,18 +1,204 @@
 import logging
-from django.db import models
+from decimal import Decimal
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from products.models import Product
 
-import logging
-
 logger = logging.getLogger(__name__)
 
 
+def total_price_expression(prefix=''):
+    """
+    Builds a ``SUM(quantity * price)`` aggregate over cart items so totals can
+    be computed by the database in a single query instead of one query per item.
+    Lines use the unit price frozen at checkout when there is one and the
+    current product price otherwise.
+
+    Args:
+        prefix (str): The lookup path from the queried model to CartItem, e.g.
+            ``'items__'`` for ShoppingCart or ``'cart__items__'`` for Order.
+
+    Returns:
+        Coalesce: An aggregate expression that evaluates to 0 for empty carts.
+    """
+    price_field = models.DecimalField(max_digits=12, decimal_places=2)
+    line_total = ExpressionWrapper(
+        F(f'{prefix}quantity')
+        * Coalesce(F(f'{prefix}unit_price'), F(f'{prefix}product__price')),
+        output_field=price_field,
+    )
+    return Coalesce(
+        Sum(line_total), Value(Decimal('0')), output_field=price_field
+    )
+
+
+def bulk_add_quantities(model, cart, quantities, **fields):
+    """
+    Adds quantities to the (cart, product) rows of `model` with a fixed number
+    of statements: existing rows get one bulk
+    `UPDATE ... SET quantity = quantity + CASE ...` and missing rows one bulk
+    INSERT. If a concurrent request inserts one of the
+    missing rows first, the unique (cart, product) constraint fails the insert
+    and the batch is retried once as an update.
+
+    Args:
+        model: CartItem or StockReservation.
+        cart (ShoppingCart): The cart the rows belong to.
+        quantities (dict): Maps product IDs to the quantity to add.
+        **fields: Extra field values written to every affected row.
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                existing = dict(
+                    model.objects.filter(
+                        cart=cart, product_id__in=quantities
+                    ).values_list('product_id', 'pk')
+                )
+                if existing:
+                    model.objects.bulk_update(
+                        [
+                            model(
+                                pk=pk,
+                                quantity=F('quantity') + quantities[product_id],
+                                **fields,
+                            )
+                            for product_id, pk in existing.items()
+                        ],
+                        ['quantity', *fields],
+                    )
+                model.objects.bulk_create(
+                    [
+                        model(
+                            cart=cart,
+                            product_id=product_id,
+                            quantity=quantity,
+                            **fields,
+                        )
+                        for product_id, quantity in quantities.items()
+                        if product_id not in existing
+                    ]
+                )
+            return
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+class ShoppingCartQuerySet(models.QuerySet):
+    """QuerySet for ShoppingCart with database-computed totals."""
+
+    def with_totals(self):
+        """Annotates every cart with the total price of its items."""
+        return self.annotate(_total_price=total_price_expression('items__'))
+
+    def active(self):
+        return self.filter(status='active')
+
+    def get_active(self, user):
+        """
+        Returns the user's active cart, creating it if needed. The
+        one-active-cart-per-user constraint turns concurrent creations into an
+        IntegrityError, which get_or_create resolves by fetching the cart the
+        other request created.
+        """
+        cart, _ = self.get_or_create(user=user, status='active')
+        return cart
+
+
+class CartItemQuerySet(models.QuerySet):
+    """
+    QuerySet for CartItem with database-computed totals and atomic quantity
+    changes.
+    """
+
+    def total_price(self):
+        """
+        Returns the summed price of all cart items in this queryset with one
+        aggregate query.
+        """
+        return self.aggregate(total=total_price_expression())['total']
+
+    def add_quantity(self, cart, product_id, quantity):
+        """
+        Adds `quantity` units of a product to a cart without a read-modify-write
+        cycle.
+
+        The quantity is incremented with a single
+        `UPDATE ... SET quantity = quantity + n`; when no row exists one is
+        inserted, and an insert that loses a race against a concurrent request
+        (unique cart/product constraint) falls back to the increment.
+
+        Returns:
+            CartItem: The cart item as stored after the change.
+        """
+        lookup = self.filter(cart=cart, product_id=product_id)
+        if not lookup.update(quantity=F('quantity') + quantity):
+            try:
+                with transaction.atomic():
+                    return self.create(
+                        cart=cart, product_id=product_id, quantity=quantity
+                    )
+            except IntegrityError:
+                lookup.update(quantity=F('quantity') + quantity)
+        return lookup.get()
+
+    def remove_one(self, user, product_id):
+        """
+        Removes one unit of a product from the user's active cart with single
+        conditional statements: the quantity is decremented while it is above
+        one and the row is deleted otherwise.
+
+        Returns:
+            bool: False when the product is not in the user's active cart.
+        """
+        lookup = self.filter(
+            cart__user=user, cart__status='active', product_id=product_id
+        )
+        if lookup.filter(quantity__gt=1).update(quantity=F('quantity') - 1):
+            return True
+        deleted, _ = lookup.filter(quantity__lte=1).delete()
+        return deleted > 0
+
+    def freeze_prices(self):
+        """
+        Copies the current product price of every item into `unit_price` with
+        one `UPDATE ... SET unit_price = (SELECT price ...)` and returns the
+        total of the items at those prices. Checkout calls it on the cart's
+        items inside its transaction.
+
+        Returns:
+            Decimal: The summed price of the items, 0 when there are none.
+        """
+        self.update(
+            unit_price=Subquery(
+                Product.objects.filter(pk=OuterRef('product_id')).values(
+                    'price'
+                )[:1]
+            )
+        )
+        return self.total_price()
+
+
 class ShoppingCart(models.Model):
     """
     A shopping cart model that represents a unique cart for each user, ensuring a one-to-one relationship
     with the user model defined in settings.AUTH_USER_MODEL. It includes a creation timestamp and a method
     to calculate the total price of all items in the cart.
+
+    Active carts left idle for ABANDONED_CART_DAYS are marked `abandoned` by the
+    cart reaper (orders/reaper.py), which then moves them to
+    ArchivedShoppingCart.
     """
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
@@ -28,44 +214,56 @@ class ShoppingCart(models.Model):
     )
     status = models.CharField(
         max_length=10,
-        choices=[('active', 'Active'), ('completed', 'Completed')],
+        choices=[
+            ('active', 'Active'),
+            ('completed', 'Completed'),
+            ('abandoned', 'Abandoned'),
+        ],
         default='active',
-        help_text="The status of the shopping cart."
+        help_text="The status of the shopping cart.",
     )
 
+    objects = ShoppingCartQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=Q(status='active'),
+                name='unique_active_cart_per_user'
+            ),
+        ]
+        indexes = [
+            # Cart lookups filter on (user, status) and checkout takes the
+            # newest cart.
+            models.Index(
+                fields=['user', 'status', '-created_at'],
+                name='cart_user_status_created_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"ShoppingCart({self.user.username}, Status: {self.status})"
 
-    @property
-    def total_price(self):
-        total = 0
-        for item in self.items.all():
-            try:
-                total += item.total_price
-            except Exception as e:
-                logger.error(f"Error calculating total price for item {item.id} in ShoppingCart {self.id}: {e}")
-                continue
-        return total
-
     @property
     def total_price(self):
         """
-        Calculates the total price of all items in the shopping cart. If any item's price is undefined,
-        it gracefully handles the error and continues with other items.
+        Calculates the total price of all items in the shopping cart.
+
+        Uses the value annotated by ``ShoppingCart.objects.with_totals()`` when
+        present, sums prefetched items in Python when they are already loaded,
+        and otherwise falls back to a single aggregate query.
 
         Returns:
-            Decimal: The total price of all valid items in the shopping cart.
+            Decimal: The total price of all items in the shopping cart.
         """
-        total = 0
-        for item in self.items.all():
-            try:
-                total += item.total_price
-            except AttributeError:
-                logger.error(f"Error calculating total price for item {item.id} in ShoppingCart {self.id}: ")
-
-                continue
-            
-        return total
+        if hasattr(self, '_total_price'):
+            return self._total_price
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            return sum(
+                (item.total_price for item in self.items.all()), Decimal('0')
+            )
+        return self.items.total_price()
 
 
 class CartItem(models.Model):
@@ -93,6 +291,25 @@ class CartItem(models.Model):
         auto_now_add=True,
         help_text="The datetime when the item was added to the cart."
     )
+    unit_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text=(
+            "The product price frozen at checkout; empty while the cart is "
+            "active."
+        ),
+    )
+
+    objects = CartItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cart', 'product'], name='unique_cart_product'
+            ),
+        ]
 
     def __str__(self):
         """Returns a readable string representation of the CartItem instance."""
@@ -102,10 +319,13 @@ class CartItem(models.Model):
     def total_price(self):
         """
         Calculates and returns the total price for this cart item as the product
-        of its quantity and the associated product's price. Includes error handling
-        to log issues when calculating the total price.
+        of its quantity and the unit price frozen at checkout, or the associated
+        product's current price while the cart is active. Includes error
+        handling to log issues when calculating the total price.
         """
         try:
+            if self.unit_price is not None:
+                return self.quantity * self.unit_price
             return self.quantity * self.product.price
         except TypeError:
             logger.error(f"Error calculating total price for CartItem {self.id}: Invalid type.")
@@ -126,8 +346,11 @@ class Order(models.Model):
         ordered_at (DateTimeField): The timestamp when the order was placed.
         delivery_date (DateField): The scheduled delivery date for the order.
         delivery_time (TimeField): The scheduled delivery time for the order.
+        total_price (DecimalField): The order total at the prices frozen on its
+            cart items at checkout, so reading it touches neither the items nor
+            the products.
     """
-    
+
     cart = models.OneToOneField(
         'ShoppingCart',
         on_delete=models.CASCADE,
@@ -143,6 +366,23 @@ class Order(models.Model):
     ordered_at = models.DateTimeField(auto_now_add=True, verbose_name="Order timestamp")
     delivery_date = models.DateField(verbose_name="Scheduled delivery date")
     delivery_time = models.TimeField(verbose_name="Scheduled delivery time")
+    total_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0'),
+        verbose_name="Order total",
+        help_text="Total of the order at the prices frozen at checkout."
+    )
+
+    class Meta:
+        indexes = [
+            # Order history per user, newest first, and date-range scans over
+            # all orders.
+            models.Index(
+                fields=['user', '-ordered_at'], name='order_user_ordered_at_idx'
+            ),
+            models.Index(fields=['-ordered_at'], name='order_ordered_at_idx'),
+        ]
 
     def __str__(self):
         """Provides a human-readable string representation of the order."""
@@ -151,14 +391,115 @@ class Order(models.Model):
     @property
     def total_order_price(self):
         """
-        Calculates the total price of the order by leveraging the ShoppingCart's
-        total_price property. This dynamically computed property is not stored in the database.
-        
+        The total price of the order, stored at checkout. Catalog price changes
+        after the order was placed do not change it.
+
         Returns:
-            Decimal: Total price of all items in the linked ShoppingCart.
+            Decimal: Total price of all items in the linked ShoppingCart at
+                checkout.
         """
-        try:
-            return self.cart.total_price
-        except Exception as e:
-            logger.error(f"Error calculating total_order_price: {e}")
-            return 0
\ No newline at end of file
+        return self.total_price
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for an active shopping cart. Reserved units have already been
+    taken off `Product.stock_quantity`; they are handed back when the item is
+    removed or the reservation expires, and consumed when the cart is checked
+    out (see orders/stock.py).
+    """
+    cart = models.ForeignKey(
+        'ShoppingCart',
+        related_name='reservations',
+        on_delete=models.CASCADE,
+        help_text="The shopping cart the stock is held for."
+    )
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        help_text="The product whose stock is held."
+    )
+    quantity = models.PositiveIntegerField(
+        help_text="The number of units held."
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        help_text=(
+            "When the held units are released back to stock unless the cart is "
+            "checked out."
+        ),
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cart', 'product'],
+                name='unique_reservation_cart_product',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"StockReservation(cart={self.cart_id}, product={self.product_id}, "
+            f"quantity={self.quantity})"
+        )
+
+
+class ArchivedShoppingCart(models.Model):
+    """
+    An abandoned shopping cart moved out of the live cart table by the cart
+    reaper, keeping its original ID, owner and timestamps for reporting.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_carts',
+        help_text="The user the shopping cart belonged to."
+    )
+    created_at = models.DateTimeField(
+        help_text="When the shopping cart was created."
+    )
+    status = models.CharField(
+        max_length=10,
+        help_text="The status of the shopping cart when it was archived.",
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True, help_text="When the shopping cart was archived."
+    )
+
+    def __str__(self):
+        return f"ArchivedShoppingCart({self.pk}, user={self.user_id})"
+
+
+class ArchivedCartItem(models.Model):
+    """
+    An item of an archived shopping cart, with its original ID.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    cart = models.ForeignKey(
+        'ArchivedShoppingCart',
+        related_name='items',
+        on_delete=models.CASCADE,
+        help_text="The archived shopping cart the item belonged to."
+    )
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        help_text="The product the item represented."
+    )
+    quantity = models.PositiveIntegerField(
+        help_text="The quantity of the product."
+    )
+    added_at = models.DateTimeField(
+        help_text="When the item was added to the cart."
+    )
+    unit_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+
+    def __str__(self):
+        return (
+            f"ArchivedCartItem(cart={self.cart_id}, product={self.product_id}, "
+            f"quantity={self.quantity})"
+        )
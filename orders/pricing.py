@@ -0,0 +1,196 @@
+from bisect import bisect_right
+from decimal import Decimal
+from operator import mul, sub
+
+from django.conf import settings
+from django.db.models import F, IntegerField
+from django.db.models.functions import Cast, Round
+
+from products.models import Product
+
+
+def basis_points(percent):
+    """
+    Converts a percentage (e.g. `Decimal('2.5')`) to integer basis points (250).
+    """
+    return int(Decimal(percent) * 100)
+
+
+def percent_of(cents, rate):
+    """
+    Returns `rate` basis points of an amount in cents, rounded half up to a
+    whole cent.
+    """
+    return (cents * rate + 5000) // 10000
+
+
+def price_in_cents():
+    """An expression reading `Product.price` as integer cents."""
+    return Cast(Round(F('price') * 100), IntegerField())
+
+
+def to_amount(cents):
+    """
+    Formats integer cents as the fixed two-decimal string the API renders prices
+    as (the serializers' DecimalFields), e.g. 1999 -> '19.99', exactly and
+    without building a Decimal.
+    """
+    if cents < 0:
+        return '-' + to_amount(-cents)
+    return '%d.%02d' % divmod(cents, 100)
+
+
+class DiscountTiers:
+    """
+    Tiered volume discounts: a line of at least `quantity` units of a product
+    gets the percentage of the highest tier it reaches, e.g.
+    `{10: '2.5', 50: '5', 100: '10'}`.
+    """
+
+    def __init__(self, tiers):
+        tiers = sorted(
+            (int(quantity), basis_points(percent))
+            for quantity, percent in tiers.items()
+        )
+        self.quantities = [quantity for quantity, _ in tiers]
+        self.rates = [0] + [rate for _, rate in tiers]
+
+    def rates_for(self, quantities):
+        """Returns the discount of each quantity in basis points."""
+        quantities_at, rates = self.quantities, self.rates
+        return [
+            rates[bisect_right(quantities_at, quantity)]
+            for quantity in quantities
+        ]
+
+
+class Quote:
+    """
+    A priced basket, held as columns of integer cents with one entry per
+    product.
+
+    Attributes:
+        product_ids (list): The quoted products, in request order.
+        quantities (list): Units of each product.
+        unit_prices (list): Unit prices, in cents.
+        gross (list): Quantity x unit price, in cents.
+        discount_rates (list): Volume discount of each line, in basis points.
+        discounts (list): Discount of each line, in cents.
+        net (list): Gross minus discount, in cents.
+        not_found (list): Requested product IDs that do not exist.
+        subtotal (int): The sum of the net line amounts, in cents.
+        tax (int): Tax on the subtotal, in cents.
+        total (int): Subtotal plus tax, in cents.
+    """
+
+    def __init__(
+        self, product_ids, quantities, unit_prices, not_found, tiers, tax_rate
+    ):
+        self.product_ids = product_ids
+        self.quantities = quantities
+        self.unit_prices = unit_prices
+        self.not_found = not_found
+        self.gross = list(map(mul, unit_prices, quantities))
+        self.discount_rates = tiers.rates_for(quantities)
+        self.discounts = list(map(percent_of, self.gross, self.discount_rates))
+        self.net = list(map(sub, self.gross, self.discounts))
+        self.subtotal = sum(self.net)
+        self.tax_rate = tax_rate
+        self.tax = percent_of(self.subtotal, tax_rate)
+        self.total = self.subtotal + self.tax
+
+    def as_dict(self):
+        """
+        Returns the quote as the API renders it: amounts as two-decimal strings
+        like product prices, and discount and tax rates as percentages in the
+        same format (250 -> '2.50').
+        """
+        # Whole columns are formatted at once; thousands of lines make per-value
+        # overhead add up.
+        columns = zip(
+            self.product_ids,
+            self.quantities,
+            *(
+                map(to_amount, column)
+                for column in (
+                    self.unit_prices,
+                    self.gross,
+                    self.discount_rates,
+                    self.discounts,
+                    self.net,
+                )
+            )
+        )
+        return {
+            'lines': [
+                {
+                    'product_id': product_id,
+                    'quantity': quantity,
+                    'unit_price': unit_price,
+                    'gross': gross,
+                    'discount_rate': rate,
+                    'discount': discount,
+                    'net': net,
+                }
+                for (
+                    product_id, quantity, unit_price, gross, rate, discount, net
+                ) in columns
+            ],
+            'not_found': self.not_found,
+            'subtotal': to_amount(self.subtotal),
+            'discount': to_amount(sum(self.discounts)),
+            'tax_rate': to_amount(self.tax_rate),
+            'tax': to_amount(self.tax),
+            'total': to_amount(self.total),
+        }
+
+
+def price_basket(quantities, tiers=None, tax_rate=None):
+    """
+    Prices a whole basket in one pass: the prices of all products are read with
+    one query, then every step (line amounts, volume discounts, net amounts) is
+    applied to whole columns of integer cents (see Quote), so amounts are exact
+    and rounding happens once per line discount and once for the tax.
+
+    Tax is charged on the discounted subtotal at settings.QUOTE_TAX_RATE
+    percent; discounts follow the tiers of settings.QUOTE_VOLUME_DISCOUNTS by
+    line quantity.
+
+    Args:
+        quantities (dict): Maps product IDs to quantities, in the order the
+            lines are quoted.
+        tiers (DiscountTiers): The volume discounts (from the settings by
+            default).
+        tax_rate (int): The tax rate in basis points (from the settings by
+            default).
+
+    Returns:
+        Quote: The priced lines and totals.
+    """
+    tiers = tiers or DiscountTiers(settings.QUOTE_VOLUME_DISCOUNTS)
+    tax_rate = (
+        basis_points(settings.QUOTE_TAX_RATE) if tax_rate is None else tax_rate
+    )
+
+    # Prices come back as integer cents, which spares building a Decimal per
+    # row.
+    prices = dict(
+        Product.objects.filter(pk__in=quantities).values_list(
+            'pk', price_in_cents()
+        )
+    )
+    product_ids = [
+        product_id for product_id in quantities if product_id in prices
+    ]
+    not_found = [
+        product_id for product_id in quantities if product_id not in prices
+    ]
+
+    return Quote(
+        product_ids,
+        [quantities[product_id] for product_id in product_ids],
+        [prices[product_id] for product_id in product_ids],
+        not_found,
+        tiers,
+        tax_rate,
+    )
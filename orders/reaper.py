@@ -0,0 +1,187 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedCartItem,
+    ArchivedShoppingCart,
+    CartItem,
+    ShoppingCart,
+    StockReservation,
+)
+from .stock import hand_back
+
+logger = logging.getLogger(__name__)
+
+
+class ReapResult:
+    """
+    Running totals of a cart reaper run.
+
+    Attributes:
+        abandoned_carts (int): Idle active carts marked `abandoned`.
+        released_reservations (int): Stock reservations of those carts handed
+            back and deleted.
+        archived_carts (int): Abandoned carts moved to ArchivedShoppingCart.
+        archived_items (int): Their items, moved to ArchivedCartItem.
+    """
+
+    def __init__(self):
+        self.abandoned_carts = 0
+        self.released_reservations = 0
+        self.archived_carts = 0
+        self.archived_items = 0
+
+    @property
+    def rows_reclaimed(self):
+        """Rows removed from the live cart, item and reservation tables."""
+        return (
+            self.released_reservations
+            + self.archived_carts
+            + self.archived_items
+        )
+
+    def as_dict(self):
+        return {
+            'abandoned_carts': self.abandoned_carts,
+            'released_reservations': self.released_reservations,
+            'archived_carts': self.archived_carts,
+            'archived_items': self.archived_items,
+            'rows_reclaimed': self.rows_reclaimed,
+        }
+
+
+def stale_carts(idle_days, now):
+    """
+    Returns the active carts nobody has touched for `idle_days`: created before
+    the cutoff, with no item added since, and no reservation renewed since
+    (adding to a cart pushes its reservations' expiry to STOCK_RESERVATION_TTL
+    past the change).
+    """
+    cutoff = now - timedelta(days=idle_days)
+    return (
+        ShoppingCart.objects.active()
+        .filter(created_at__lt=cutoff)
+        .exclude(items__added_at__gte=cutoff)
+        .exclude(
+            reservations__expires_at__gte=cutoff
+            + timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+        )
+    )
+
+
+def abandon_stale_carts(result, idle_days, batch_size, now):
+    """
+    Marks stale active carts `abandoned` and hands back the stock they hold, a
+    batch per short transaction. Carts locked by a concurrent request (e.g. a
+    checkout) are skipped and picked up by a later run; a checkout that comes
+    after the reaper finds the cart no longer active.
+    """
+    while True:
+        with transaction.atomic():
+            cart_ids = list(
+                stale_carts(idle_days, now).select_for_update(skip_locked=True)
+                .order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not cart_ids:
+                break
+            result.abandoned_carts += (
+                ShoppingCart.objects.active()
+                .filter(pk__in=cart_ids)
+                .update(status='abandoned')
+            )
+            reservations = list(
+                StockReservation.objects.select_for_update().filter(
+                    cart_id__in=cart_ids
+                )
+            )
+            if reservations:
+                hand_back(reservations)
+                result.released_reservations += len(reservations)
+        logger.info(f"Marked {len(cart_ids)} idle carts as abandoned.")
+        if len(cart_ids) < batch_size:
+            break
+
+
+def archive_abandoned_carts(result, batch_size):
+    """
+    Moves abandoned carts and their items to the archive tables, a batch per
+    short transaction: the rows are copied with bulk inserts, then deleted from
+    the live tables.
+    """
+    while True:
+        with transaction.atomic():
+            carts = list(
+                ShoppingCart.objects.select_for_update(skip_locked=True)
+                .filter(status='abandoned').order_by('pk')[:batch_size]
+            )
+            if not carts:
+                break
+            cart_ids = [cart.pk for cart in carts]
+            items = list(CartItem.objects.filter(cart_id__in=cart_ids))
+            ArchivedShoppingCart.objects.bulk_create(
+                [
+                    ArchivedShoppingCart(
+                        id=cart.pk,
+                        user_id=cart.user_id,
+                        created_at=cart.created_at,
+                        status=cart.status,
+                    )
+                    for cart in carts
+                ],
+                batch_size=500,
+            )
+            ArchivedCartItem.objects.bulk_create(
+                [
+                    ArchivedCartItem(
+                        id=item.pk,
+                        cart_id=item.cart_id,
+                        product_id=item.product_id,
+                        quantity=item.quantity,
+                        added_at=item.added_at,
+                        unit_price=item.unit_price,
+                    )
+                    for item in items
+                ],
+                batch_size=500,
+            )
+            CartItem.objects.filter(cart_id__in=cart_ids).delete()
+            ShoppingCart.objects.filter(pk__in=cart_ids).delete()
+        result.archived_carts += len(carts)
+        result.archived_items += len(items)
+        logger.info(
+            f"Archived {len(carts)} abandoned carts with {len(items)} items."
+        )
+        if len(carts) < batch_size:
+            break
+
+
+def reap_carts(idle_days=None, batch_size=500, now=None):
+    """
+    Expires the active carts left idle for `idle_days`, releasing their stock
+    reservations, then moves abandoned carts and their items to the archive
+    tables. Every batch runs in its own short transaction and skips rows locked
+    by live requests, so the job can run on a schedule next to the traffic.
+
+    Completed carts stay in the live tables: their orders (and the order export
+    and analytics rollups) reference them and their items, and the (user,
+    status) index keeps them out of the way of active cart lookups.
+
+    Args:
+        idle_days (int): Days without activity after which an active cart is
+            abandoned (settings.ABANDONED_CART_DAYS by default).
+        batch_size (int): Carts handled per transaction.
+        now (datetime): The current time, for tests.
+
+    Returns:
+        ReapResult: How many carts, items and reservations were expired,
+            archived or released.
+    """
+    idle_days = settings.ABANDONED_CART_DAYS if idle_days is None else idle_days
+    result = ReapResult()
+    abandon_stale_carts(result, idle_days, batch_size, now or timezone.now())
+    archive_abandoned_carts(result, batch_size)
+    return result
@@ -1,14 +1,21 @@
 import logging
 from rest_framework import serializers
+from .export import EXPORT_FORMATS
 from .models import CartItem, Order
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 
 logger = logging.getLogger(__name__)
 
 # This allows the serializer to reference the correct user model.
 User = get_user_model()
 
+# Upper bounds of the columns quote lines are looked up against: product IDs are
+# BigAutoFields and quantities PositiveIntegerFields.
+MAX_PRODUCT_ID = 2 ** 63 - 1
+MAX_QUANTITY = 2 ** 31 - 1
+
 class CartItemSerializer(serializers.ModelSerializer):
     """
     Serializer for the CartItem model.
@@ -25,11 +32,12 @@ class OrderSerializer(serializers.ModelSerializer):
     """
     Serializer for the Order model.
 
-    In addition to serializing model fields, this serializer includes a read-only field to
-    represent the total_order_price. This calculated property comes from the associated
-    ShoppingCart's items, encapsulating the logic within the model for data representation.
+    In addition to serializing model fields, this serializer includes a
+    read-only field to represent the total_order_price: the order total stored
+    at checkout, at the unit prices frozen on the cart's items, so it is read
+    without touching the items or the products.
     """
-    total_order_price = serializers.ReadOnlyField()
+    total_order_price = serializers.ReadOnlyField(source='total_price')
     delivery_time = serializers.TimeField(format='%H:%M:%S', default='12:00:00', help_text="Default delivery time is 12:00:00")
 
 
@@ -40,10 +48,18 @@ class OrderSerializer(serializers.ModelSerializer):
 
 
     def create(self, validated_data):
+        """
+        Creates the order like checkout does: the cart's current prices are
+        frozen on its items and the order total is stored, then the cart is
+        marked completed.
+        """
         try:
-            order = super().create(validated_data)
-            order.cart.status = 'completed'  # Mark the cart as completed
-            order.cart.save()
+            with transaction.atomic():
+                cart = validated_data['cart']
+                validated_data['total_price'] = cart.items.freeze_prices()
+                order = super().create(validated_data)
+                order.cart.status = 'completed'  # Mark the cart as completed
+                order.cart.save()
             return order
         except IntegrityError as e:
             logger.error(f"Error creating order due to cart uniqueness constraint: {e}")
@@ -72,7 +88,23 @@ class AddToCartSerializer(serializers.Serializer):
     Validates the product ID and quantity before adding them to the cart.
     """
     product_id = serializers.IntegerField(help_text='ID of the product to add')
-    quantity = serializers.IntegerField(default=1, help_text='Quantity of the product')
+    quantity = serializers.IntegerField(
+        default=1, min_value=1, help_text='Quantity of the product'
+    )
+
+
+class BulkAddToCartSerializer(serializers.Serializer):
+    """
+    Serializer for adding many products to the shopping cart in one request.
+
+    Each line is validated like a single add-to-cart request.
+    """
+    items = AddToCartSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=500,
+        help_text='Products and quantities to add',
+    )
 
 
 class RemoveFromCartSerializer(serializers.Serializer):
@@ -82,4 +114,106 @@ class RemoveFromCartSerializer(serializers.Serializer):
     Validates the product ID and quantity before removing them from the cart.
     """
     product_id = serializers.IntegerField(help_text='ID of the product to remove')
-    quantity = serializers.IntegerField(default=1, help_text='Quantity of the product to remove')
\ No newline at end of file
+    quantity = serializers.IntegerField(default=1, help_text='Quantity of the product to remove')
+
+
+class OrderExportSerializer(serializers.Serializer):
+    """
+    Validates the query parameters of the order export.
+
+    The format parameter is `export_format`: REST framework reserves `format`
+    for picking a renderer.
+    """
+    export_format = serializers.ChoiceField(
+        choices=EXPORT_FORMATS,
+        default='csv',
+        help_text=(
+            'csv (one row per order line) or jsonl (one object per order)'
+        ),
+    )
+    start = serializers.DateField(
+        required=False,
+        help_text='First day of the orders to export (inclusive)',
+    )
+    end = serializers.DateField(
+        required=False, help_text='Last day of the orders to export (inclusive)'
+    )
+    user = serializers.IntegerField(
+        required=False, help_text='Only export the orders of this user ID'
+    )
+
+    def validate(self, data):
+        if 'start' in data and 'end' in data and data['start'] > data['end']:
+            raise serializers.ValidationError('start must not be after end.')
+        return data
+
+
+class QuoteItemsField(serializers.Field):
+    """
+    A list of `{"product_id": int, "quantity": int}` lines, validated in one
+    loop rather than with a nested serializer per line, which would dominate the
+    cost of quoting thousands of lines. Quantities of repeated products are
+    added up. Product IDs and (added up) quantities must fit the columns they
+    are looked up and priced against (MAX_PRODUCT_ID, MAX_QUANTITY).
+    """
+    default_error_messages = {
+        'not_a_list': 'Expected a list of lines.',
+        'empty': 'At least one line is required.',
+        'max_length': 'At most {max_length} lines are allowed.',
+        'invalid_line': (
+            'Line {index}: product_id must be a positive 64-bit integer and '
+            'quantity an integer from 1 to {max_quantity}.'
+        ),
+    }
+
+    def __init__(self, max_length, **kwargs):
+        self.max_length = max_length
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            self.fail('not_a_list')
+        if not data:
+            self.fail('empty')
+        if len(data) > self.max_length:
+            self.fail('max_length', max_length=self.max_length)
+        quantities = {}
+        for index, line in enumerate(data):
+            try:
+                product_id, quantity = line['product_id'], line.get(
+                    'quantity', 1
+                )
+            except (TypeError, KeyError):
+                self.fail(
+                    'invalid_line', index=index, max_quantity=MAX_QUANTITY
+                )
+            if (type(product_id) is not int or type(quantity) is not int
+                    or not 1 <= product_id <= MAX_PRODUCT_ID
+                    or not 1 <= quantity <= MAX_QUANTITY):
+                self.fail(
+                    'invalid_line', index=index, max_quantity=MAX_QUANTITY
+                )
+            quantity += quantities.get(product_id, 0)
+            if quantity > MAX_QUANTITY:
+                self.fail(
+                    'invalid_line', index=index, max_quantity=MAX_QUANTITY
+                )
+            quantities[product_id] = quantity
+        return quantities
+
+    def to_representation(self, value):
+        return [
+            {'product_id': product_id, 'quantity': quantity}
+            for product_id, quantity in value.items()
+        ]
+
+
+class QuoteSerializer(serializers.Serializer):
+    """
+    Serializer for quote requests: the lines of a basket to price, without
+    touching the cart.
+    """
+    items = QuoteItemsField(
+        max_length=settings.QUOTE_MAX_LINES,
+        help_text='Products and quantities to price',
+    )
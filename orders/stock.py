@@ -0,0 +1,232 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from products.cache import product_cache
+from products.models import Product
+from .models import StockReservation, bulk_add_quantities
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when a product does not have enough stock left to reserve the
+    requested quantity.
+    """
+
+    def __init__(self, product_id, quantity):
+        self.product_id = product_id
+        self.quantity = quantity
+        super().__init__(
+            f"Insufficient stock for product {product_id} (requested "
+            f"{quantity})."
+        )
+
+
+def take_stock(product_id, quantity):
+    """
+    Takes `quantity` units off a product with a single conditional statement::
+
+        UPDATE ... SET stock_quantity = stock_quantity - n
+        WHERE stock_quantity >= n
+
+    so stock can never go negative and no row is locked longer than that
+    statement's transaction.
+
+    Returns:
+        bool: False when the product does not exist or has fewer than `quantity`
+            units.
+    """
+    return (
+        Product.objects.filter(
+            pk=product_id, stock_quantity__gte=quantity
+        ).update(stock_quantity=F('stock_quantity') - quantity)
+        == 1
+    )
+
+
+def return_stock(product_id, quantity):
+    """Puts `quantity` units back on a product."""
+    Product.objects.filter(pk=product_id).update(
+        stock_quantity=F('stock_quantity') + quantity
+    )
+
+
+def reservation_expiry():
+    return timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+
+
+def reserve(cart, product_id, quantity):
+    """
+    Reserves `quantity` more units of a product for a cart and pushes the
+    reservation's expiry back. Must run inside the transaction that adds the
+    items to the cart.
+
+    Raises:
+        InsufficientStock: When the product has fewer than `quantity` units
+            left.
+    """
+    if not take_stock(product_id, quantity):
+        raise InsufficientStock(product_id, quantity)
+
+    expires_at = reservation_expiry()
+    reservation = StockReservation.objects.filter(
+        cart=cart, product_id=product_id
+    )
+    if not reservation.update(
+        quantity=F('quantity') + quantity, expires_at=expires_at
+    ):
+        try:
+            with transaction.atomic():
+                StockReservation.objects.create(
+                    cart=cart,
+                    product_id=product_id,
+                    quantity=quantity,
+                    expires_at=expires_at,
+                )
+        except IntegrityError:
+            reservation.update(
+                quantity=F('quantity') + quantity, expires_at=expires_at
+            )
+    product_cache.invalidate_objects_on_commit([product_id])
+
+
+def reserve_many(cart, quantities):
+    """
+    Reserves several products for a cart at once. Stock is taken with one
+    conditional statement per product, in primary key order, and the
+    reservations are written in bulk. Must run inside the transaction that adds
+    the items to the cart.
+
+    Args:
+        quantities (dict): Maps product IDs to the quantity to reserve.
+
+    Returns:
+        dict: The subset of `quantities` that could be reserved; the other
+            products are short.
+    """
+    reserved = {
+        product_id: quantities[product_id]
+        for product_id in sorted(quantities)
+        if take_stock(product_id, quantities[product_id])
+    }
+    if reserved:
+        bulk_add_quantities(
+            StockReservation, cart, reserved, expires_at=reservation_expiry()
+        )
+        product_cache.invalidate_objects_on_commit(reserved)
+    return reserved
+
+
+def release(user, product_id, quantity):
+    """
+    Hands back up to `quantity` units reserved for a product in the user's
+    active cart.
+
+    Returns:
+        int: The number of units put back on the product.
+    """
+    with transaction.atomic():
+        reservation = (
+            StockReservation.objects.select_for_update(of=('self',))
+            .filter(
+                cart__user=user, cart__status='active', product_id=product_id
+            )
+            .first()
+        )
+        if reservation is None:
+            return 0
+        released = min(quantity, reservation.quantity)
+        if released == reservation.quantity:
+            reservation.delete()
+        else:
+            StockReservation.objects.filter(pk=reservation.pk).update(
+                quantity=F('quantity') - released
+            )
+        return_stock(product_id, released)
+    product_cache.invalidate_objects_on_commit([product_id])
+    return released
+
+
+def commit_cart(cart):
+    """
+    Turns a cart's reservations into a sale at checkout. Lines that are not
+    fully covered by a live reservation (expired and released, or added before
+    reservations existed) take their stock now; units held beyond what the cart
+    still contains are handed back. Products are touched in primary key order so
+    concurrent checkouts cannot deadlock. Must run inside the checkout
+    transaction.
+
+    Raises:
+        InsufficientStock: When a line cannot be covered; the caller rolls the
+            checkout back.
+    """
+    held = dict(
+        StockReservation.objects.select_for_update()
+        .filter(cart=cart).values_list('product_id', 'quantity')
+    )
+    lines = dict(cart.items.values_list('product_id', 'quantity'))
+
+    changed = []
+    for product_id in sorted(set(held) | set(lines)):
+        shortfall = lines.get(product_id, 0) - held.get(product_id, 0)
+        if shortfall > 0 and not take_stock(product_id, shortfall):
+            raise InsufficientStock(product_id, shortfall)
+        if shortfall < 0:
+            return_stock(product_id, -shortfall)
+        if shortfall:
+            changed.append(product_id)
+
+    StockReservation.objects.filter(cart=cart).delete()
+    # Fully reserved lines leave stock_quantity as it is; only the others
+    # changed.
+    product_cache.invalidate_objects_on_commit(changed)
+
+
+def hand_back(reservations):
+    """
+    Puts the units of locked reservations back on their products, one statement
+    per product in primary key order, and deletes the reservations. Must run
+    inside the transaction that locked them.
+    """
+    quantities = defaultdict(int)
+    for reservation in reservations:
+        quantities[reservation.product_id] += reservation.quantity
+    for product_id in sorted(quantities):
+        return_stock(product_id, quantities[product_id])
+    StockReservation.objects.filter(
+        pk__in=[reservation.pk for reservation in reservations]
+    ).delete()
+    product_cache.invalidate_objects_on_commit(quantities)
+
+
+def release_expired(batch_size=500, now=None):
+    """
+    Hands the stock of expired reservations back in small batches, each in its
+    own short transaction. Rows locked by a concurrent checkout are skipped and
+    picked up by a later run.
+
+    Returns:
+        int: The number of reservations released.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lt=now).order_by('pk')[:batch_size]
+            )
+            if not batch:
+                break
+            hand_back(batch)
+        released += len(batch)
+        logger.info(f"Released {len(batch)} expired stock reservations.")
+
+    return released
@@ -1,3 +1,1148 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import io
+import json
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+
+from products.models import Product
+from products.cache import product_cache
+from .cache import order_cache
+from .cart import CartBusy, CartCheckedOut, get_cart_backend
+from .export import export_orders, orders_for_export
+from .pricing import price_basket
+from .reaper import reap_carts
+from autocompany.rendering import values_rows
+from .models import (
+    ArchivedShoppingCart,
+    CartItem,
+    Order,
+    ShoppingCart,
+    StockReservation,
+)
+from .serializers import CartItemSerializer, OrderSerializer
+from .stock import release_expired
+from .views import OrderViewSet
+
+
+class OrderTestMixin:
+    """Shared fixtures for the orders test cases."""
+
+    @classmethod
+    def create_product(
+        cls, name='Toyota Air Filter', price='25.99', stock_quantity=50
+    ):
+        return Product.objects.create(
+            name=name,
+            description=f"{name} description.",
+            price=Decimal(price),
+            stock_quantity=stock_quantity
+        )
+
+    @classmethod
+    def create_order(cls, user, lines):
+        """
+        Creates a completed cart with the given (product, quantity) lines and an
+        order for it, with the prices frozen as checkout does.
+        """
+        cart = ShoppingCart.objects.create(user=user, status='completed')
+        for product, quantity in lines:
+            CartItem.objects.create(
+                cart=cart, product=product, quantity=quantity
+            )
+        return Order.objects.create(
+            cart=cart,
+            user=user,
+            delivery_date=datetime.date(2024, 3, 1),
+            delivery_time=datetime.time(12, 0),
+            total_price=cart.items.freeze_prices()
+        )
+
+
+class TotalsTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.filter = cls.create_product('Toyota Air Filter', '25.99')
+        cls.pads = cls.create_product('Toyota Brake Pad Set', '45.00')
+        cls.order = cls.create_order(cls.user, [(cls.filter, 3), (cls.pads, 2)])
+        cls.empty_cart = ShoppingCart.objects.create(user=cls.user)
+
+    def test_cart_total_is_a_single_query(self):
+        cart = ShoppingCart.objects.get(pk=self.order.cart_id)
+        with self.assertNumQueries(1):
+            self.assertEqual(cart.total_price, Decimal('167.97'))
+
+    def test_cart_with_totals_needs_no_extra_queries(self):
+        with self.assertNumQueries(1):
+            totals = {
+                cart.pk: cart.total_price
+                for cart in ShoppingCart.objects.with_totals()
+            }
+        self.assertEqual(totals[self.order.cart_id], Decimal('167.97'))
+        self.assertEqual(totals[self.empty_cart.pk], Decimal('0'))
+
+    def test_cart_total_uses_prefetched_items(self):
+        cart = ShoppingCart.objects.prefetch_related('items__product').get(
+            pk=self.order.cart_id
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(cart.total_price, Decimal('167.97'))
+
+    def test_order_total_is_stored(self):
+        order = Order.objects.get(pk=self.order.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(order.total_order_price, Decimal('167.97'))
+
+    def test_order_totals_keep_checkout_prices(self):
+        Product.objects.filter(pk=self.pads.pk).update(price=Decimal('50.00'))
+        self.assertEqual(
+            Order.objects.get(pk=self.order.pk).total_order_price,
+            Decimal('167.97'),
+        )
+        cart = ShoppingCart.objects.with_totals().get(pk=self.order.cart_id)
+        self.assertEqual(cart.total_price, Decimal('167.97'))
+        self.assertEqual(
+            {item.total_price for item in cart.items.all()},
+            {Decimal('77.97'), Decimal('90.00')},
+        )
+
+    def test_serializer_created_orders_store_their_total(self):
+        cart = ShoppingCart.objects.get_active(self.user)
+        CartItem.objects.add_quantity(cart, self.pads.pk, 2)
+        serializer = OrderSerializer(data={'delivery_date': '2024-03-01'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        order = serializer.save(cart=cart, user=self.user)
+        Product.objects.filter(pk=self.pads.pk).update(price=Decimal('50.00'))
+        self.assertEqual(
+            Order.objects.get(pk=order.pk).total_order_price, Decimal('90.00')
+        )
+        self.assertEqual(cart.items.get().unit_price, Decimal('45.00'))
+        self.assertEqual(
+            ShoppingCart.objects.get(pk=cart.pk).status, 'completed'
+        )
+
+    def test_active_cart_totals_follow_current_prices(self):
+        cart = ShoppingCart.objects.get_active(self.user)
+        CartItem.objects.add_quantity(cart, self.pads.pk, 2)
+        Product.objects.filter(pk=self.pads.pk).update(price=Decimal('50.00'))
+        self.assertEqual(
+            ShoppingCart.objects.get(pk=cart.pk).total_price, Decimal('100.00')
+        )
+
+
+class OrderViewSetQueryTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.products = [
+            cls.create_product(f'Toyota Part {i}', f'{10 + i}.50')
+            for i in range(8)
+        ]
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def list_orders(self):
+        view = OrderViewSet.as_view({'get': 'list'})
+        return view(self.factory.get('/orders/'))
+
+    def assert_list_queries(self, lines_per_order):
+        for _ in range(10):
+            self.create_order(
+                self.user,
+                [(product, 2) for product in self.products[:lines_per_order]],
+            )
+        # One COUNT for the paginator and one query for the page, totals
+        # included, both reading the order table alone.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.list_orders()
+        self.assertEqual(len(queries), 2)
+        for query in queries:
+            self.assertNotIn('orders_cartitem', query['sql'])
+            self.assertNotIn('products_product', query['sql'])
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_query_count_with_small_orders(self):
+        response = self.assert_list_queries(1)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_list_query_count_with_large_orders(self):
+        response = self.assert_list_queries(8)
+        expected = sum(2 * product.price for product in self.products)
+        self.assertEqual(
+            {row['total_order_price'] for row in response.data['results']},
+            {expected},
+        )
+
+    def test_retrieve_is_a_single_query(self):
+        order = self.create_order(
+            self.user, [(product, 1) for product in self.products]
+        )
+        view = OrderViewSet.as_view({'get': 'retrieve'})
+        with self.assertNumQueries(1):
+            response = view(
+                self.factory.get(f'/orders/{order.pk}/'), pk=order.pk
+            )
+        self.assertEqual(
+            response.data['total_order_price'],
+            sum(p.price for p in self.products),
+        )
+
+    def test_cursor_listing_is_newest_first_without_count(self):
+        orders = [
+            self.create_order(self.user, [(self.products[0], 1)])
+            for _ in range(3)
+        ]
+        view = OrderViewSet.as_view({'get': 'list'})
+        with self.assertNumQueries(1):
+            response = view(
+                self.factory.get(
+                    '/orders/', {'pagination': 'cursor', 'page_size': 2}
+                )
+            )
+        self.assertEqual(
+            [row['id'] for row in response.data['results']],
+            [orders[2].pk, orders[1].pk],
+        )
+        self.assertIsNotNone(response.data['next'])
+
+
+class OrderConditionalGetTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.product = cls.create_product()
+        cls.order = cls.create_order(cls.user, [(cls.product, 2)])
+
+    def setUp(self):
+        for cache in (order_cache, product_cache):
+            caches[cache.alias].clear()
+        self.factory = APIRequestFactory()
+        self.view = OrderViewSet.as_view({'get': 'list'})
+
+    def get(self, **headers):
+        return self.view(self.factory.get('/orders/', **headers))
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.get()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_order_changes_the_etag(self):
+        etag = self.get()['ETag']
+        self.create_order(self.user, [(self.product, 1)])
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_price_change_keeps_the_etag(self):
+        response = self.get()
+        self.product.price = Decimal('30.00')
+        self.product.save()
+        self.assertEqual(
+            self.get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+        self.assertEqual(
+            self.get().data['results'][0]['total_order_price'],
+            response.data['results'][0]['total_order_price'],
+        )
+
+
+class CartMutationTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.product = cls.create_product()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, quantity=1, product_id=None):
+        return self.client.post(
+            '/add-to-cart/',
+            {'product_id': product_id or self.product.pk, 'quantity': quantity},
+        )
+
+    def remove(self):
+        return self.client.post(
+            '/remove-from-cart/', {'product_id': self.product.pk}
+        )
+
+    def test_add_increments_a_single_line(self):
+        self.add(2)
+        response = self.add(3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['quantity'], 5)
+        self.assertEqual(
+            ShoppingCart.objects.filter(
+                user=self.user, status='active'
+            ).count(),
+            1,
+        )
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+    def test_add_rejects_unknown_products_and_non_positive_quantities(self):
+        self.assertEqual(self.add(product_id=999999).status_code, 404)
+        self.assertEqual(self.add(0).status_code, 400)
+        self.assertEqual(self.add(-3).status_code, 400)
+
+    def test_remove_decrements_then_deletes(self):
+        self.add(2)
+        self.assertEqual(self.remove().status_code, 200)
+        self.assertEqual(CartItem.objects.get().quantity, 1)
+        self.assertEqual(self.remove().status_code, 200)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(self.remove().status_code, 404)
+
+    def test_remove_ignores_other_users_carts(self):
+        other = User.objects.create_user('other', 'other@example.com', 'secret')
+        CartItem.objects.add_quantity(
+            ShoppingCart.objects.get_active(other), self.product.pk, 1
+        )
+        self.assertEqual(self.remove().status_code, 404)
+        self.assertEqual(CartItem.objects.get().quantity, 1)
+
+    def test_checkout_completes_the_cart_once(self):
+        self.add(2)
+        response = self.client.post(
+            '/create-order/', {'delivery_date': '2024-03-01'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ShoppingCart.objects.get().status, 'completed')
+        self.assertEqual(
+            self.client.post(
+                '/create-order/', {'delivery_date': '2024-03-01'}
+            ).status_code,
+            404,
+        )
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_checkout_freezes_prices(self):
+        self.add(2)
+        self.client.post('/create-order/', {'delivery_date': '2024-03-01'})
+        Product.objects.filter(pk=self.product.pk).update(
+            price=Decimal('99.00')
+        )
+        self.assertEqual(CartItem.objects.get().unit_price, Decimal('25.99'))
+        self.assertEqual(
+            Order.objects.get().total_order_price, Decimal('51.98')
+        )
+
+    def test_only_one_active_cart_per_user(self):
+        ShoppingCart.objects.get_active(self.user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ShoppingCart.objects.create(user=self.user, status='active')
+        ShoppingCart.objects.create(user=self.user, status='completed')
+
+    def test_only_one_line_per_product(self):
+        cart = ShoppingCart.objects.get_active(self.user)
+        CartItem.objects.create(cart=cart, product=self.product)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CartItem.objects.create(cart=cart, product=self.product)
+
+
+class StockReservationTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.product = cls.create_product(
+            'Toyota Spark Plugs', '22.50', stock_quantity=5
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, quantity):
+        return self.client.post(
+            '/add-to-cart/',
+            {'product_id': self.product.pk, 'quantity': quantity},
+        )
+
+    def checkout(self):
+        return self.client.post(
+            '/create-order/', {'delivery_date': '2024-03-01'}
+        )
+
+    def stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock_quantity
+
+    def test_add_to_cart_reserves_stock(self):
+        self.add(2)
+        self.add(1)
+        self.assertEqual(self.stock(), 2)
+        self.assertEqual(StockReservation.objects.get().quantity, 3)
+
+    def test_add_to_cart_fails_cleanly_when_stock_is_short(self):
+        self.add(4)
+        response = self.add(2)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['product_id'], self.product.pk)
+        self.assertEqual(self.stock(), 1)
+        self.assertEqual(CartItem.objects.get().quantity, 4)
+
+    def test_remove_from_cart_hands_stock_back(self):
+        self.add(2)
+        self.client.post('/remove-from-cart/', {'product_id': self.product.pk})
+        self.assertEqual(self.stock(), 4)
+        self.assertEqual(StockReservation.objects.get().quantity, 1)
+
+    def test_checkout_consumes_reservations(self):
+        self.add(3)
+        self.assertEqual(self.checkout().status_code, 201)
+        self.assertEqual(self.stock(), 2)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_takes_stock_for_released_reservations(self):
+        self.add(3)
+        release_expired(
+            now=datetime.datetime.max.replace(tzinfo=datetime.timezone.utc)
+        )
+        self.assertEqual(self.stock(), 5)
+        self.assertEqual(self.checkout().status_code, 201)
+        self.assertEqual(self.stock(), 2)
+
+    def test_checkout_fails_cleanly_when_stock_is_short(self):
+        self.add(3)
+        release_expired(
+            now=datetime.datetime.max.replace(tzinfo=datetime.timezone.utc)
+        )
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=1)
+        response = self.checkout()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.stock(), 1)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(ShoppingCart.objects.get().status, 'active')
+
+    def test_stock_changes_invalidate_listings_and_the_product_detail(self):
+        caches[product_cache.alias].clear()
+        other = self.create_product('Toyota Wiper Blade', '9.99')
+        listing = self.client.get('/products/?in_stock=true')
+        detail = self.client.get(f'/products/{self.product.pk}/')
+        other_detail = self.client.get(f'/products/{other.pk}/')
+        self.add(5)
+
+        response = self.client.get(
+            '/products/?in_stock=true', HTTP_IF_NONE_MATCH=listing['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotIn(
+            self.product.pk,
+            [product['id'] for product in response.data['results']])
+        response = self.client.get(
+            f'/products/{other.pk}/', HTTP_IF_NONE_MATCH=other_detail['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(
+            f'/products/{self.product.pk}/', HTTP_IF_NONE_MATCH=detail['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['stock_quantity'], 0)
+
+    def test_command_releases_only_expired_reservations(self):
+        self.add(2)
+        call_command('release_expired_reservations', stdout=io.StringIO())
+        self.assertEqual(self.stock(), 3)
+        StockReservation.objects.update(
+            expires_at=datetime.datetime(
+                2000, 1, 1, tzinfo=datetime.timezone.utc
+            )
+        )
+        call_command('release_expired_reservations', stdout=io.StringIO())
+        self.assertEqual(self.stock(), 5)
+        self.assertFalse(StockReservation.objects.exists())
+
+
+class BulkAddToCartTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.products = [
+            cls.create_product(f'Toyota Part {i}', '10.00', stock_quantity=10)
+            for i in range(30)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bulk_add(self, items):
+        return self.client.post(
+            '/bulk-add-to-cart/', {'items': items}, format='json'
+        )
+
+    def test_per_line_results(self):
+        first, second, short = self.products[:3]
+        self.client.post(
+            '/add-to-cart/', {'product_id': first.pk, 'quantity': 1}
+        )
+        response = self.bulk_add([
+            {'product_id': first.pk, 'quantity': 2},
+            {'product_id': second.pk, 'quantity': 3},
+            {'product_id': 999999, 'quantity': 1},
+            {'product_id': short.pk, 'quantity': 11},
+            {'product_id': second.pk, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                (row['status'], row['cart_quantity'])
+                for row in response.data['results']
+            ],
+            [
+                ('added', 3),
+                ('added', 4),
+                ('not_found', None),
+                ('insufficient_stock', None),
+                ('added', 4),
+            ],
+        )
+        items = dict(CartItem.objects.values_list('product_id', 'quantity'))
+        self.assertEqual(items, {first.pk: 3, second.pk: 4})
+        reservations = dict(
+            StockReservation.objects.values_list('product_id', 'quantity')
+        )
+        self.assertEqual(reservations, items)
+        short.refresh_from_db()
+        self.assertEqual(short.stock_quantity, 10)
+
+    def test_invalid_payloads_are_rejected(self):
+        self.assertEqual(self.bulk_add([]).status_code, 400)
+        self.assertEqual(
+            self.bulk_add(
+                [{'product_id': self.products[0].pk, 'quantity': 0}]
+            ).status_code,
+            400,
+        )
+
+    def count_queries(self, products):
+        with CaptureQueriesContext(connection) as queries:
+            self.bulk_add(
+                [
+                    {'product_id': product.pk, 'quantity': 1}
+                    for product in products
+                ]
+            )
+        return len(queries)
+
+    def test_only_stock_updates_grow_with_the_number_of_lines(self):
+        self.count_queries(self.products[:1])
+        small = self.count_queries(self.products[:5])
+        large = self.count_queries(self.products[:25])
+        self.assertEqual(large - small, 20)
+
+
+class AsyncCartTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.product = cls.create_product(stock_quantity=5)
+
+    def setUp(self):
+        self.client = AsyncClient()
+
+    async def post(self, path, data):
+        # The async test client of Django 4.0 takes raw ASGI header names.
+        credentials = base64.b64encode(b'garage:secret').decode()
+        return await self.client.post(
+            path,
+            data,
+            content_type='application/json',
+            authorization=f'Basic {credentials}',
+        )
+
+    async def test_add_and_remove_match_the_sync_endpoints(self):
+        response = await self.post(
+            '/async/add-to-cart/',
+            {'product_id': self.product.pk, 'quantity': 2},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['quantity'], 2)
+        response = await self.post(
+            '/async/remove-from-cart/', {'product_id': self.product.pk}
+        )
+        self.assertEqual(response.json(), {'status': 'Item removed'})
+
+        item = await sync_to_async(CartItem.objects.get)()
+        self.assertEqual(item.quantity, 1)
+        product = await sync_to_async(Product.objects.get)(pk=self.product.pk)
+        self.assertEqual(product.stock_quantity, 4)
+
+    async def test_errors_match_the_sync_endpoints(self):
+        response = await self.post(
+            '/async/add-to-cart/',
+            {'product_id': self.product.pk, 'quantity': 6},
+        )
+        self.assertEqual(response.status_code, 409)
+        client = APIClient()
+        await sync_to_async(client.force_authenticate)(self.user)
+        expected = await sync_to_async(client.post)(
+            '/add-to-cart/', {'product_id': self.product.pk, 'quantity': 6},
+            format='json')
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response['Content-Type'], expected['Content-Type'])
+        response = await self.post(
+            '/async/add-to-cart/',
+            {'product_id': self.product.pk, 'quantity': 0},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('quantity', response.json())
+        response = await self.post(
+            '/async/remove-from-cart/', {'product_id': self.product.pk}
+        )
+        self.assertEqual(response.status_code, 404)
+        response = await self.client.get('/async/add-to-cart/')
+        self.assertEqual(response.status_code, 405)
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().post(
+            '/async/add-to-cart/',
+            {'product_id': self.product.pk},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class OrderValuesListTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.filter = cls.create_product('Toyota Air Filter', '25.99')
+        for quantity in range(1, 4):
+            cls.create_order(cls.user, [(cls.filter, quantity)])
+        cls.create_order(cls.user, [])
+
+    def render_list(self, params=None):
+        response = OrderViewSet.as_view({'get': 'list'})(
+            APIRequestFactory().get('/orders/', params)
+        )
+        return response.render().content
+
+    def test_listings_are_byte_identical(self):
+        for params in (None, {'pagination': 'cursor', 'page_size': 3}):
+            with self.subTest(params=params):
+                with override_settings(FAST_LIST_RESPONSES=True):
+                    fast = self.render_list(params)
+                slow = self.render_list(params)
+                self.assertEqual(fast, slow)
+                self.assertIn(b'"total_order_price":77.97', fast)
+
+    def test_cart_item_rows_match_the_serializer(self):
+        queryset = CartItem.objects.order_by('id')
+        plan = values_rows(CartItemSerializer)
+        self.assertEqual(
+            plan.rows(plan.values(queryset)),
+            CartItemSerializer(queryset, many=True).data,
+        )
+
+
+class OrderExportTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'finance', 'finance@example.com', 'secret'
+        )
+        cls.user = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.filter = cls.create_product('Toyota Air Filter', '25.99')
+        cls.pads = cls.create_product('Brake Pads', '45.00')
+        cls.first = cls.create_order(cls.user, [(cls.filter, 3), (cls.pads, 2)])
+        cls.second = cls.create_order(cls.admin, [(cls.pads, 1)])
+        Order.objects.filter(pk=cls.first.pk).update(
+            ordered_at=datetime.datetime(
+                2024, 3, 1, 9, 30, tzinfo=datetime.timezone.utc
+            )
+        )
+        Order.objects.filter(pk=cls.second.pk).update(
+            ordered_at=datetime.datetime(
+                2024, 3, 5, 23, 59, tzinfo=datetime.timezone.utc
+            )
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get('/orders/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_one_row_per_line(self):
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+        self.assertEqual(
+            [
+                (
+                    row['order_id'],
+                    row['sku'] == '',
+                    row['quantity'],
+                    row['line_total'],
+                )
+                for row in rows
+            ],
+            [
+                (str(self.first.pk), True, '3', '77.97'),
+                (str(self.first.pk), True, '2', '90.00'),
+                (str(self.second.pk), True, '1', '45.00'),
+            ],
+        )
+        self.assertEqual(rows[0]['order_total'], '167.97')
+        self.assertEqual(rows[0]['ordered_at'], '2024-03-01T09:30:00+00:00')
+
+    def test_jsonl_has_one_object_per_order(self):
+        response = self.client.get(
+            '/orders/export/', {'export_format': 'jsonl'}
+        )
+        self.assertEqual(
+            response['Content-Type'], 'application/x-ndjson; charset=utf-8'
+        )
+        orders = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content)
+            .decode()
+            .splitlines()
+        ]
+        self.assertEqual(
+            [order['total_price'] for order in orders], ['167.97', '45.00']
+        )
+        self.assertEqual(
+            [line['unit_price'] for line in orders[0]['lines']],
+            ['25.99', '45.00'],
+        )
+
+    def test_filters(self):
+        self.assertIn(
+            f'\n{self.second.pk},',
+            self.export(start='2024-03-05', end='2024-03-05'),
+        )
+        self.assertNotIn(f'\n{self.first.pk},', self.export(start='2024-03-02'))
+        self.assertNotIn(f'\n{self.second.pk},', self.export(user=self.user.pk))
+        self.assertEqual(
+            self.client.get(
+                '/orders/export/', {'start': '2024-03-05', 'end': '2024-03-01'}
+            ).status_code,
+            400,
+        )
+
+    def test_requires_an_admin(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/orders/export/').status_code, 403)
+
+    def test_lines_are_read_once_per_chunk(self):
+        for _ in range(5):
+            self.create_order(self.user, [(self.filter, 1)])
+        # Orders are read in chunks of 3 (with SQLite, one cursor query), plus
+        # one line query per chunk.
+        with self.assertNumQueries(4):
+            rows = list(export_orders(orders_for_export(), 'csv', chunk_size=3))
+        self.assertEqual(len(rows), 1 + 3 + 5)
+
+    def test_command_writes_the_same_export(self):
+        out = io.StringIO()
+        call_command(
+            'export_orders',
+            '--format',
+            'jsonl',
+            '--user',
+            str(self.user.pk),
+            stdout=out,
+        )
+        self.assertEqual(
+            [json.loads(line)['id'] for line in out.getvalue().splitlines()],
+            [self.first.pk],
+        )
+
+
+@override_settings(
+    QUOTE_VOLUME_DISCOUNTS={10: '2.5', 50: '5'}, QUOTE_TAX_RATE='21'
+)
+class QuoteTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'fleet', 'fleet@example.com', 'secret'
+        )
+        cls.filter = cls.create_product('Toyota Air Filter', '25.99')
+        cls.pads = cls.create_product('Brake Pads', '45.00')
+        cls.plug = cls.create_product('Spark Plug', '3.33')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def quote(self, items):
+        return self.client.post('/quote/', {'items': items}, format='json')
+
+    def test_prices_lines_with_tiered_discounts_and_tax(self):
+        with self.assertNumQueries(1):
+            response = self.quote([
+                {'product_id': self.filter.pk, 'quantity': 3},
+                {'product_id': self.pads.pk, 'quantity': 10},
+                {'product_id': self.plug.pk, 'quantity': 51},
+            ])
+        self.assertEqual(response.status_code, 200)
+        lines = {line['product_id']: line for line in response.data['lines']}
+        self.assertEqual(
+            (lines[self.filter.pk]['gross'], lines[self.filter.pk]['discount']),
+            ('77.97', '0.00'),
+        )
+        # 2.5% of 450.00 and 5% of 169.83 (8.4915, rounded half up).
+        self.assertEqual(
+            (lines[self.pads.pk]['discount_rate'], lines[self.pads.pk]['net']),
+            ('2.50', '438.75'),
+        )
+        self.assertEqual(
+            (lines[self.plug.pk]['discount'], lines[self.plug.pk]['net']),
+            ('8.49', '161.34'),
+        )
+        self.assertEqual(response.data['subtotal'], '678.06')
+        self.assertEqual(
+            (response.data['tax'], response.data['total']), ('142.39', '820.45')
+        )
+        self.assertEqual(response.data['tax_rate'], '21.00')
+        self.assertIn(b'"unit_price":"3.33"', response.content)
+
+    def test_merges_repeated_products_and_reports_unknown_ones(self):
+        response = self.quote([
+            {'product_id': self.pads.pk, 'quantity': 6},
+            {'product_id': 999999, 'quantity': 1},
+            {'product_id': self.pads.pk, 'quantity': 4},
+        ])
+        self.assertEqual(
+            [
+                (line['product_id'], line['quantity'], line['discount_rate'])
+                for line in response.data['lines']
+            ],
+            [(self.pads.pk, 10, '2.50')],
+        )
+        self.assertEqual(response.data['not_found'], [999999])
+
+    def test_amounts_stay_exact_over_thousands_of_lines(self):
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    name=f'Part {i}',
+                    description='Part.',
+                    price=Decimal('0.07') + i,
+                    stock_quantity=1,
+                )
+                for i in range(2000)
+            ]
+        )
+        quote = price_basket({product.pk: 3 for product in products})
+        expected = sum(
+            (product.price * 3 for product in products), Decimal('0')
+        )
+        self.assertEqual(quote.subtotal, int(expected * 100))
+        self.assertEqual(
+            self.quote(
+                [
+                    {'product_id': product.pk, 'quantity': 3}
+                    for product in products
+                ]
+            ).data['subtotal'],
+            str(expected),
+        )
+
+    def test_rejects_invalid_lines(self):
+        for items in (
+            [],
+            [{'product_id': 'one'}],
+            [{'product_id': self.pads.pk, 'quantity': 0}],
+            [{'quantity': 2}],
+            'all',
+        ):
+            with self.subTest(items=items):
+                self.assertEqual(self.quote(items).status_code, 400)
+        self.assertEqual(
+            self.quote([{'product_id': 1}] * 5001).status_code, 400
+        )
+
+    def test_rejects_ids_and_quantities_beyond_the_column_limits(self):
+        for items in (
+            [{'product_id': 10 ** 20}],
+            [{'product_id': -1}],
+            [{'product_id': self.pads.pk, 'quantity': 2 ** 31}],
+            [{'product_id': self.pads.pk, 'quantity': 2 ** 31 - 1},
+             {'product_id': self.pads.pk, 'quantity': 1}],
+        ):
+            with self.subTest(items=items):
+                response = self.quote(items)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Line', str(response.data['items'][0]))
+
+
+class CartReaperTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                f'garage{i}', f'garage{i}@example.com', 'secret'
+            )
+            for i in range(3)
+        ]
+        cls.product = cls.create_product(
+            'Toyota Spark Plugs', '22.50', stock_quantity=10
+        )
+
+    def add(self, user, quantity):
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(
+            client.post(
+                '/add-to-cart/',
+                {'product_id': self.product.pk, 'quantity': quantity},
+            ).status_code,
+            200,
+        )
+        return ShoppingCart.objects.get(user=user, status='active')
+
+    def later(self, days):
+        return timezone.now() + datetime.timedelta(days=days)
+
+    def stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock_quantity
+
+    def test_abandons_and_archives_idle_carts(self):
+        idle = self.add(self.users[0], 2)
+        busy = self.add(self.users[1], 1)
+        self.create_order(self.users[2], [(self.product, 1)])
+        # The busy cart got a new item (and renewed reservations) 10 days in.
+        CartItem.objects.filter(cart=busy).update(added_at=self.later(10))
+        StockReservation.objects.filter(cart=busy).update(
+            expires_at=self.later(10)
+        )
+
+        result = reap_carts(idle_days=30, batch_size=1, now=self.later(31))
+
+        self.assertEqual(
+            result.as_dict(),
+            {
+                'abandoned_carts': 1,
+                'released_reservations': 1,
+                'archived_carts': 1,
+                'archived_items': 1,
+                'rows_reclaimed': 3,
+            },
+        )
+        self.assertEqual(self.stock(), 9)
+        self.assertEqual(
+            set(ShoppingCart.objects.values_list('status', flat=True)),
+            {'active', 'completed'},
+        )
+        archived = ArchivedShoppingCart.objects.get()
+        self.assertEqual(
+            (archived.pk, archived.user_id, archived.status),
+            (idle.pk, self.users[0].pk, 'abandoned'),
+        )
+        self.assertEqual(
+            list(archived.items.values_list('product_id', 'quantity')),
+            [(self.product.pk, 2)],
+        )
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_checkout_after_the_reaper_is_refused(self):
+        self.add(self.users[0], 2)
+        ShoppingCart.objects.update(status='abandoned')
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        self.assertEqual(
+            client.post(
+                '/create-order/', {'delivery_date': '2024-03-01'}
+            ).status_code,
+            404,
+        )
+
+    def test_command_reports_reclaimed_rows(self):
+        self.add(self.users[0], 2)
+        out = io.StringIO()
+        call_command('reap_carts', '--idle-days', '0', stdout=out)
+        self.assertIn('3 rows reclaimed', out.getvalue())
+        self.assertEqual(self.stock(), 10)
+
+
+@override_settings(CART_BACKEND='orders.cart.CacheCartBackend')
+class CacheCartBackendTests(OrderTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        cls.product = cls.create_product(
+            'Toyota Spark Plugs', '22.50', stock_quantity=5
+        )
+
+    def setUp(self):
+        caches['carts'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, quantity, product_id=None):
+        return self.client.post(
+            '/add-to-cart/',
+            {'product_id': product_id or self.product.pk, 'quantity': quantity},
+        )
+
+    def checkout(self):
+        return self.client.post(
+            '/create-order/', {'delivery_date': '2024-03-01'}
+        )
+
+    def test_cart_lives_in_the_cache_until_checkout(self):
+        self.add(2)
+        with self.assertNumQueries(1):
+            response = get_cart_backend().add(self.user, self.product.pk, 1)
+        self.assertEqual(
+            response,
+            (
+                {
+                    'id': None,
+                    'cart': None,
+                    'product': self.product.pk,
+                    'quantity': 3,
+                },
+                200,
+            ),
+        )
+        self.assertEqual(
+            self.client.post(
+                '/remove-from-cart/', {'product_id': self.product.pk}
+            ).data,
+            {'status': 'Item removed'},
+        )
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_add_checks_the_product_and_its_stock(self):
+        self.assertEqual(self.add(1, product_id=999999).status_code, 404)
+        self.add(4)
+        self.assertEqual(self.add(2).status_code, 409)
+        self.assertEqual(
+            self.client.post(
+                '/remove-from-cart/', {'product_id': 999999}
+            ).status_code,
+            404,
+        )
+
+    def test_checkout_persists_the_cart_and_takes_stock(self):
+        self.add(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.checkout().status_code, 201)
+        item = CartItem.objects.get()
+        self.assertEqual(
+            (item.quantity, item.unit_price, item.cart.status),
+            (3, Decimal('22.50'), 'completed'),
+        )
+        self.assertEqual(
+            Order.objects.get().total_order_price, Decimal('67.50')
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 2)
+        self.assertIsNone(caches['carts'].get(f'cart:{self.user.pk}'))
+        self.assertEqual(self.checkout().status_code, 404)
+
+    def test_failed_checkout_keeps_the_cart(self):
+        self.add(3)
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=1)
+        self.assertEqual(self.checkout().status_code, 409)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(
+            caches['carts'].get(f'cart:{self.user.pk}'), {self.product.pk: 3}
+        )
+
+    def test_cached_cart_is_only_emptied_when_the_order_commits(self):
+        self.add(3)
+        backend = get_cart_backend()
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic(), backend.checkout(self.user) as cart:
+                self.assertIsNotNone(cart)
+        self.assertEqual(
+            caches['carts'].get(f'cart:{self.user.pk}'), {self.product.pk: 3}
+        )
+        self.assertIsNotNone(caches['carts'].get(f'cart:{self.user.pk}:lock'))
+        callbacks[0]()
+        self.assertIsNone(caches['carts'].get(f'cart:{self.user.pk}'))
+        self.assertIsNone(caches['carts'].get(f'cart:{self.user.pk}:lock'))
+
+    def test_concurrently_checked_out_cart_keeps_its_lines(self):
+        self.add(3)
+        with self.assertRaises(CartCheckedOut):
+            with transaction.atomic(), get_cart_backend().checkout(self.user):
+                raise CartCheckedOut('checked out by another request')
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(
+            caches['carts'].get(f'cart:{self.user.pk}'), {self.product.pk: 3}
+        )
+        self.assertEqual(self.add(1).status_code, 200)
+
+    def test_checkout_merges_database_lines(self):
+        self.client.post(
+            '/bulk-add-to-cart/',
+            {'items': [{'product_id': self.product.pk, 'quantity': 1}]},
+            format='json',
+        )
+        self.add(2)
+        self.assertEqual(self.checkout().status_code, 201)
+        self.assertEqual(CartItem.objects.get().quantity, 3)
+
+    def test_busy_cart(self):
+        backend = get_cart_backend()
+        backend.lock_attempts = 1
+        backend.cache.add(f'cart:{self.user.pk}:lock', 1)
+        with self.assertRaises(CartBusy):
+            backend.add(self.user, self.product.pk, 1)
+        self.assertEqual(self.add(1).status_code, 409)
+
+    async def test_async_add_to_cart(self):
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.user)
+        response = await client.post(
+            '/async/add-to-cart/',
+            {'product_id': self.product.pk, 'quantity': 2},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['quantity'], 2)
+        self.assertEqual(await sync_to_async(ShoppingCart.objects.count)(), 0)
@@ -1,7 +1,7 @@
 from django.urls import path
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from orders import views as order_views
+from orders import async_views, views as order_views
 
 
 # Initialize the router for the orders app.
@@ -10,9 +10,37 @@ router.register(r'orders', order_views.OrderViewSet)
 
 
 urlpatterns = [
-    path('add-to-cart/', order_views.AddToCartView.as_view(), name='add-to-cart'),
-    path('remove-from-cart/', order_views.RemoveFromCartView.as_view(), name='remove-from-cart'),
-    path('create-order/', order_views.CreateOrderView.as_view(), name='create-order'),
+    path(
+        'add-to-cart/', order_views.AddToCartView.as_view(), name='add-to-cart'
+    ),
+    path(
+        'bulk-add-to-cart/',
+        order_views.BulkAddToCartView.as_view(),
+        name='bulk-add-to-cart',
+    ),
+    path(
+        'remove-from-cart/',
+        order_views.RemoveFromCartView.as_view(),
+        name='remove-from-cart',
+    ),
+    path('quote/', order_views.QuoteView.as_view(), name='quote'),
+    path(
+        'create-order/',
+        order_views.CreateOrderView.as_view(),
+        name='create-order',
+    ),
+    path(
+        'orders/export/',
+        order_views.OrderExportView.as_view(),
+        name='order-export',
+    ),
+    path(
+        'async/add-to-cart/', async_views.add_to_cart, name='async-add-to-cart'
+    ),
+    path(
+        'async/remove-from-cart/',
+        async_views.remove_from_cart,
+        name='async-remove-from-cart',
+    ),
     # path('', include(router.urls)),
- 
 ]
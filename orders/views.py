@@ -1,67 +1,173 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated  
-from .models import ShoppingCart, CartItem, Order
-from .serializers import CartItemSerializer, OrderSerializer,AddToCartSerializer,RemoveFromCartSerializer
-from django.shortcuts import get_object_or_404
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from .models import ShoppingCart, CartItem, Order, bulk_add_quantities
+from .serializers import (
+    OrderSerializer,
+    AddToCartSerializer,
+    RemoveFromCartSerializer,
+    BulkAddToCartSerializer,
+    OrderExportSerializer,
+    QuoteSerializer,
+)
 from rest_framework import viewsets,status
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from .models import Product  
 from drf_yasg.utils import swagger_auto_schema
 import logging
 from django.db import transaction
+from autocompany.conditional import ConditionalGetMixin
+from autocompany.idempotency import idempotent
+from autocompany.pagination import KeysetPaginationMixin
+from autocompany.rendering import ValuesListMixin
+from autocompany.routers import ReplicaReadsMixin
+from .cache import order_cache
+from .export import CONTENT_TYPES, export_orders, orders_for_export
+from .pricing import price_basket
+from .cart import CartBusy, CartCheckedOut, get_cart_backend
+from .stock import InsufficientStock, commit_cart, reserve_many
 
 
 logger = logging.getLogger(__name__)
 
+CART_BUSY = 'The cart is being updated by another request; try again.'
+
+
+def add_to_cart(user, product_id, quantity):
+    """
+    Adds `quantity` units of a product to the user's active cart through the
+    configured cart backend (orders/cart.py). Shared by the sync and async
+    add-to-cart endpoints.
+
+    Returns:
+        tuple: The response data (the cart item, or an error) and the HTTP
+            status code.
+    """
+    try:
+        return get_cart_backend().add(user, product_id, quantity)
+    except CartBusy as e:
+        logger.error(f"Error adding product {product_id} to the cart: {e}")
+        return {'error': CART_BUSY}, status.HTTP_409_CONFLICT
+
+
+def remove_from_cart(user, product_id):
+    """
+    Removes one unit of a product from the user's active cart through the
+    configured cart backend (orders/cart.py). Shared by the sync and async
+    remove-from-cart endpoints.
+
+    Returns:
+        tuple: The response data and the HTTP status code.
+    """
+    try:
+        return get_cart_backend().remove(user, product_id)
+    except CartBusy as e:
+        logger.error(f"Error removing product {product_id} from the cart: {e}")
+        return {'error': CART_BUSY}, status.HTTP_409_CONFLICT
+
 
 class AddToCartView(APIView):
     """
-    View for adding products to the shopping cart of an authenticated user. It checks for the existence of the product
-    and the shopping cart, creates or updates the cart item with the specified quantity, and returns the updated cart item.
+    View for adding products to the shopping cart of an authenticated user. It
+    checks for the existence of the product and the shopping cart, creates or
+    updates the cart item with the specified quantity, and returns the updated
+    cart item. Quantities are incremented atomically in the database, so
+    concurrent requests never lose updates, and the added units are reserved
+    from the product's stock until checkout or until the reservation expires.
+    With the cache cart backend (CART_BACKEND) the cart lives in the cache until
+    checkout instead (orders/cart.py). Retries sent with the same
+    Idempotency-Key header get the first response back without adding again.
     """
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(request_body=AddToCartSerializer)
+    @idempotent
     def post(self, request):
         serializer = AddToCartSerializer(data=request.data)
         if serializer.is_valid():
             product_id = serializer.validated_data['product_id']
             quantity = serializer.validated_data.get('quantity', 1)  # Default quantity to 1 if not specified
 
-            try:
-                product = Product.objects.get(id=product_id)
-            except Product.DoesNotExist:
-                logger.error(f"Product with id {product_id} does not exist.")
-                return Response({'error': 'Invalid Product ID'}, status=status.HTTP_404_NOT_FOUND)
-
-            # Check if there's an active cart; if not, create a new one.
-            cart, created = ShoppingCart.objects.get_or_create(
-                user=request.user, 
-                status='active', 
-                defaults={
-                    'user': request.user,
-                    'status': 'active'
-                }
+            data, response_status = add_to_cart(
+                request.user, product_id, quantity
             )
+            return Response(data, status=response_status)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=product,
-                defaults={'quantity': quantity}
-            )
 
-            if not created:
-                # If the item already exists in the cart, update the quantity
-                cart_item.quantity += int(quantity)
-                cart_item.save()
+class BulkAddToCartView(APIView):
+    """
+    View for adding many products to the shopping cart of an authenticated user
+    in one request.
 
-            # Serialize the cart item to return
-            cart_item_serializer = CartItemSerializer(cart_item)
-            return Response(cart_item_serializer.data, status=status.HTTP_200_OK)
-        else:
+    All product IDs are validated with a single `IN` query and the cart items
+    are upserted in bulk inside one transaction, so the number of statements
+    does not grow with the number of lines (apart from one conditional stock
+    update per product). The response reports a status per requested line:
+    `added`, `not_found` or `insufficient_stock`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(request_body=BulkAddToCartSerializer)
+    def post(self, request):
+        serializer = BulkAddToCartSerializer(data=request.data)
+        if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        
+
+        lines = serializer.validated_data['items']
+        quantities = {}
+        for line in lines:
+            quantities[line['product_id']] = (
+                quantities.get(line['product_id'], 0) + line['quantity']
+            )
+
+        known = set(
+            Product.objects.filter(id__in=quantities).values_list(
+                'id', flat=True
+            )
+        )
+        requested = {
+            product_id: quantity
+            for product_id, quantity in quantities.items()
+            if product_id in known
+        }
+
+        with transaction.atomic():
+            cart = ShoppingCart.objects.get_active(request.user)
+            reserved = reserve_many(cart, requested)
+            if reserved:
+                bulk_add_quantities(CartItem, cart, reserved)
+            in_cart = dict(
+                cart.items.filter(product_id__in=reserved).values_list(
+                    'product_id', 'quantity'
+                )
+            )
+
+        results = []
+        for line in lines:
+            product_id = line['product_id']
+            if product_id not in known:
+                line_status = 'not_found'
+            elif product_id not in reserved:
+                line_status = 'insufficient_stock'
+            else:
+                line_status = 'added'
+            results.append({
+                'product_id': product_id,
+                'quantity': line['quantity'],
+                'status': line_status,
+                'cart_quantity': in_cart.get(product_id),
+            })
+        logger.info(
+            f"Bulk added {len(reserved)} of {len(quantities)} products to cart "
+            f"{cart.pk} for user {request.user}."
+        )
+        return Response(
+            {'cart': cart.pk, 'results': results}, status=status.HTTP_200_OK
+        )
+
+
 class RemoveFromCartView(APIView):
     """
     API view that allows authenticated users to remove products from their shopping cart.
@@ -73,8 +179,12 @@ class RemoveFromCartView(APIView):
     @swagger_auto_schema(request_body=RemoveFromCartSerializer)
     def post(self, request, *args, **kwargs):
         """
-        Receives a POST request with a product ID and removes the specified product from the user's shopping cart.
-        Adjusts the quantity of the cart item or removes it entirely if necessary.
+        Receives a POST request with a product ID and removes the specified
+        product from the user's shopping cart. Adjusts the quantity of the cart
+        item or removes it entirely if necessary, using conditional
+        single-statement updates so concurrent removals cannot drive the
+        quantity below zero. The removed unit's stock reservation is handed back
+        to the product.
         """
         product_id = request.data.get('product_id')
      
@@ -84,84 +194,224 @@ class RemoveFromCartView(APIView):
             return JsonResponse({'error': 'product_id is required'}, status=400)
         
         try:
-            cart=ShoppingCart.objects.get(
-                            user=request.user, 
-                            status='active'
-                        )        
-            cart_item = get_object_or_404(CartItem, cart=cart, product_id=product_id)
-            
-            if cart_item.quantity > 1:
-                cart_item.quantity -= 1
-                cart_item.save()
-                logger.info(f"Decreased quantity of product ID {product_id} for user {request.user.username}.")
-            else:
-                cart_item.delete()
-                logger.info(f"Removed product ID {product_id} from user {request.user.username}'s cart.")
-                
-            return Response({'status': 'Item removed'})
+            data, response_status = remove_from_cart(request.user, product_id)
         except Exception as e:
             logger.error(f"Error removing product from cart: {str(e)}")
             return JsonResponse({'error': 'An error occurred while removing the item from the cart'}, status=500)
+        return Response(data, status=response_status)
 
 
+class QuoteView(APIView):
+    """
+    Prices a basket without touching the cart, for fleet quotes of hundreds or
+    thousands of lines.
+
+    Prices are read with a single `IN` query and the basket is priced in integer
+    cents, a column at a time (orders.pricing): quantity x price, the volume
+    discount of each line's tier (QUOTE_VOLUME_DISCOUNTS) and tax on the
+    discounted subtotal (QUOTE_TAX_RATE). Repeated products are merged into one
+    line; unknown product IDs are listed in `not_found`. Amounts and rates are
+    two-decimal strings, like product prices.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(request_body=QuoteSerializer)
+    def post(self, request):
+        serializer = QuoteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            quote = price_basket(serializer.validated_data['items'])
+        except Exception as e:
+            logger.error(f"Error pricing a quote for user {request.user}: {e}")
+            return Response(
+                {'error': 'An error occurred while pricing the quote'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        return Response(quote.as_dict(), status=status.HTTP_200_OK)
+
 
 class CreateOrderView(APIView):
     """
     View to allow authenticated users to create an order from their shopping cart.
     
     This view assumes the existence of an 'active' status for shopping carts,
-    indicating carts that are currently in use and not yet converted into orders.
-    Once an order is created, the cart's status is updated to 'completed' to prevent further modifications.
+    indicating carts that are currently in use and not yet converted into
+    orders. Once an order is created, the cart's status is updated to
+    'completed' to prevent further modifications. The cart is claimed with a
+    conditional status update, so concurrent checkouts of the same cart produce
+    exactly one order, and its stock reservations are consumed; checkout fails
+    with 409 Conflict when a line can no longer be covered by stock. The current
+    product prices are frozen on the cart items and the order total is stored,
+    so later catalog price changes do not alter the order. Carts held outside
+    the database by the cart backend (CART_BACKEND) are written to
+    ShoppingCart/CartItem first, in the same transaction. Retries sent with the
+    same Idempotency-Key header get the first response back
+    (autocompany/idempotency.py).
     """
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(request_body=OrderSerializer)
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = OrderSerializer(data=request.data)
-        
+
         if serializer.is_valid():
-            with transaction.atomic():
-                cart = ShoppingCart.objects.filter(user=request.user, status='active').order_by('-created_at').first()
-                print("Cart is ", cart)
-                if not cart:
-                    logger.error(f"No active shopping cart found for user: {request.user}")
-                    return Response({'error': 'No active shopping cart found.'}, status=status.HTTP_404_NOT_FOUND)
-
-                # Assuming 'delivery_date' and 'delivery_time' are validated by the serializer
-                delivery_date = serializer.validated_data.get('delivery_date')
-                delivery_time = serializer.validated_data.get('delivery_time')
-
-                order = Order.objects.create(
-                    cart=cart,
-                    user=request.user,
-                    delivery_date=delivery_date,
-                    delivery_time=delivery_time
-                )
+            try:
+                with transaction.atomic(), get_cart_backend().checkout(
+                    request.user
+                ) as cart:
+                    if not cart:
+                        logger.error(
+                            "No active shopping cart found for user: "
+                            f"{request.user}"
+                        )
+                        return Response(
+                            {'error': 'No active shopping cart found.'},
+                            status=status.HTTP_404_NOT_FOUND,
+                        )
+
+                    # Mark the cart as completed; zero rows means another
+                    # request already checked it out.
+                    if (
+                        not ShoppingCart.objects.active()
+                        .filter(pk=cart.pk)
+                        .update(status='completed')
+                    ):
+                        raise CartCheckedOut(
+                            f"Shopping cart {cart.pk} was checked out "
+                            f"concurrently for user: {request.user}"
+                        )
+
+                    # Consume the cart's stock reservations; raises if a line
+                    # can no longer be covered.
+                    commit_cart(cart)
+
+                    # Freeze the line prices and the total the customer is
+                    # charged.
+                    total_price = cart.items.freeze_prices()
 
-                # Mark the cart as completed
-                cart.status = 'completed'
-                cart.save()
+                    # Assuming 'delivery_date' and 'delivery_time' are validated
+                    # by the serializer
+                    delivery_date = serializer.validated_data.get(
+                        'delivery_date'
+                    )
+                    delivery_time = serializer.validated_data.get(
+                        'delivery_time'
+                    )
 
-                # Instead of serializing the order again, use the validated data and add the order id
-                response_data = serializer.validated_data
-                response_data['id'] = order.id
+                    order = Order.objects.create(
+                        cart=cart,
+                        user=request.user,
+                        delivery_date=delivery_date,
+                        delivery_time=delivery_time,
+                        total_price=total_price
+                    )
+            except InsufficientStock as e:
+                logger.error(f"Checkout failed for user {request.user}: {e}")
+                return Response(
+                    {
+                        'error': 'Insufficient stock.',
+                        'product_id': e.product_id,
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
+            except CartBusy as e:
+                logger.error(f"Checkout failed for user {request.user}: {e}")
+                return Response(
+                    {'error': CART_BUSY}, status=status.HTTP_409_CONFLICT
+                )
+            except CartCheckedOut as e:
+                logger.error(str(e))
+                return Response(
+                    {'error': 'This cart has already been used for an order.'},
+                    status=status.HTTP_409_CONFLICT,
+                )
 
-                return Response(response_data, status=status.HTTP_201_CREATED)
+            # Instead of serializing the order again, use the validated data and
+            # add the order id
+            response_data = serializer.validated_data
+            response_data['id'] = order.id
+
+            return Response(response_data, status=status.HTTP_201_CREATED)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        
-        
 
-          
-class OrderViewSet(viewsets.ModelViewSet):
+
+class OrderExportView(APIView):
+    """
+    Streams every order with its lines and totals, for accounting (admin only).
+
+    Query parameters (OrderExportSerializer): `export_format` (csv, one row per
+    order line, or jsonl, one object per order), `start` and `end` (inclusive
+    days of `ordered_at`) and `user`. The export is a StreamingHttpResponse fed
+    by a database cursor (orders.export), so memory stays flat whether it holds
+    a thousand orders or millions; `python manage.py export_orders` writes the
+    same export to a file.
+    """
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(query_serializer=OrderExportSerializer)
+    def get(self, request, *args, **kwargs):
+        params = OrderExportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        export_format = params.validated_data['export_format']
+        queryset = orders_for_export(
+            start=params.validated_data.get('start'),
+            end=params.validated_data.get('end'),
+            user_id=params.validated_data.get('user'),
+        )
+        response = StreamingHttpResponse(
+            export_orders(queryset, export_format),
+            content_type=CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="orders.{export_format}"'
+        )
+        return response
+
+
+class OrderViewSet(
+    ReplicaReadsMixin,
+    KeysetPaginationMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
     """
     A viewset for viewing and editing orders.
 
-    Provides `list`, `create`, `retrieve`, `update`, and `destroy` actions automatically.
+    Provides `list`, `create`, `retrieve`, `update`, and `destroy` actions
+    automatically. Listings can opt in to keyset pagination (newest first) with
+    `?pagination=cursor`. `list` and `retrieve` responses carry
+    ETag/Last-Modified validators derived from the order version; order totals
+    are stored at checkout, so product price changes leave them alone. Listings
+    read from a replica when replicas are configured, except for clients that
+    have just written (autocompany.routers); cart changes and checkout always
+    use the primary. Listing pages are built from `.values()` rows rather than
+    model instances (autocompany.rendering).
     """
 
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    replica_actions = ('list',)
+    keyset_ordering = '-id'
+    conditional_caches = (order_cache,)
+
+    def get_queryset(self):
+        """
+        Returns the queryset for the `list` and `retrieve` actions, newest
+        orders first.
+
+        Every serialized field, the total included, is a column of the order
+        row, so a page of orders is read from the order table alone, without
+        joining carts, items or products, no matter how many items each order
+        contains.
+        """
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.order_by('-id')
+        return queryset
 
     def list(self, request, *args, **kwargs):
         """
@@ -211,4 +461,4 @@ class OrderViewSet(viewsets.ModelViewSet):
             return super().destroy(request, *args, **kwargs)
         except Exception as e:
             logger.error(f"Error deleting order: {e}")
-            return Response({"error": "Error deleting order"}, status=400)
\ No newline at end of file
+            return Response({"error": "Error deleting order"}, status=400)
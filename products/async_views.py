@@ -0,0 +1,80 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from autocompany.asynchronous import async_api_view
+from autocompany.pagination import KeysetPagination, wants_keyset_pagination
+from autocompany.routers import replica_reads
+from .cache import product_cache
+from .models import Product
+from .search import filter_products
+from .serializers import ProductSearchSerializer, ProductSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def product_page(request, filters):
+    """
+    Returns the data of a product listing page, from the product cache when
+    possible. Runs the cache lookup, the queries and the serialization as one
+    unit in the request's thread; like the sync listing, the queries may read
+    from a replica.
+    """
+    key = product_cache.make_key(request.get_full_path())
+    data = product_cache.get(key)
+    if data is None:
+        drf_request = Request(request)
+        if wants_keyset_pagination(request.GET):
+            paginator = KeysetPagination()
+        else:
+            paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+        with replica_reads():
+            queryset = filter_products(Product.objects.order_by('id'), filters)
+            page = paginator.paginate_queryset(queryset, drf_request)
+            data = paginator.get_paginated_response(
+                ProductSerializer(page, many=True).data
+            ).data
+            product_cache.set(key, data)
+    return data
+
+
+def product_data(request, pk):
+    """Returns the data of one product, from the product cache when possible."""
+    key = product_cache.make_key(request.get_full_path(), pk=pk)
+    data = product_cache.get(key)
+    if data is None:
+        with replica_reads():
+            product = Product.objects.filter(pk=pk).first()
+            if product is None:
+                raise NotFound()
+            data = ProductSerializer(product).data
+            product_cache.set(key, data)
+    return data
+
+
+@async_api_view(('GET',))
+async def product_list(request):
+    """
+    Async version of `GET /products/`: the same filters, full-text search,
+    pagination modes and response body, served from the same product cache. The
+    ETag, Last-Modified and X-Cache headers of the sync listing are not sent.
+
+    Django 4.0 has no async ORM interface (it arrives in 4.1), so the cache
+    lookup, queries and serialization run together in one `sync_to_async` call;
+    the event loop stays free while the database answers.
+    """
+    params = ProductSearchSerializer(data=request.GET)
+    params.is_valid(raise_exception=True)
+    data = await sync_to_async(product_page)(request, params.validated_data)
+    return Response(data)
+
+
+@async_api_view(('GET',))
+async def product_detail(request, pk):
+    """Async version of `GET /products/<id>/`."""
+    data = await sync_to_async(product_data)(request, pk)
+    return Response(data)
@@ -0,0 +1,289 @@
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .cache import product_cache
+from .search import TERM_RE
+
+logger = logging.getLogger(__name__)
+
+# Candidates examined per multi-word lookup, so a short leading prefix cannot
+# scan the catalog.
+MAX_SCANNED = 2000
+
+
+def name_terms(name):
+    """Returns the distinct, case-folded words of a product name."""
+    return set(TERM_RE.findall(name.casefold()))
+
+
+def posting_ids(entry):
+    """
+    Returns the product IDs of a posting, stored as a bare ID while it holds
+    only one.
+    """
+    return (entry,) if isinstance(entry, int) else entry
+
+
+def matches_all(name, prefixes):
+    """Tells whether every prefix starts some word of `name`."""
+    words = name_terms(name)
+    return all(
+        any(word.startswith(prefix) for word in words) for prefix in prefixes
+    )
+
+
+class PrefixIndex:
+    """
+    An in-process typeahead index over product names, answering prefix lookups
+    without touching the database.
+
+    Every distinct word of the catalog is kept once in a sorted list, so the
+    words starting with a prefix form one contiguous range found with two
+    bisections. A parallel list holds the sorted IDs of the products whose name
+    contains each word: a compact array, or the bare ID for words such as part
+    numbers that occur in a single name. The display names are kept by ID.
+    Memory therefore grows with the vocabulary plus eight bytes per (word,
+    product) pair rather than with every prefix of every name, as a trie would.
+
+    The index is built lazily from the database on first use and kept current by
+    `update` and `discard`, which the product signals and the feed importer call
+    after their transaction commits. Writes that land while a build is reading
+    the catalog are queued and replayed on top of the fresh index.
+
+    Those calls only reach the process that made the change; other workers (and
+    every worker, for changes made by `import_products` or another process)
+    notice it through the product cache version, which every catalog change
+    bumps and which lookups compare with the version the index was built at. A
+    changed version rebuilds the index at most once every
+    AUTOCOMPLETE_REBUILD_SECONDS, in the request that notices it, while
+    concurrent lookups keep answering from the previous index. Suggestions are
+    therefore at most AUTOCOMPLETE_REBUILD_SECONDS plus one build behind the
+    catalog.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._words = []
+        self._postings = []
+        self._names = {}
+        self._ready = False
+        self._building = False
+        self._pending = []
+        self._version = None
+        self._built_at = 0.0
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def build(self, rows=None):
+        """
+        Replaces the index with the given `(id, name)` rows, streamed from the
+        products table by default. Only an index built from the products table
+        follows the catalog version.
+        """
+        version = None
+        if rows is None:
+            from .models import Product
+            # Read before the rows, so a change committed during the build
+            # triggers another one.
+            version = product_cache.version()
+            rows = Product.objects.values_list('id', 'name').iterator(
+                chunk_size=5000
+            )
+
+        with self._lock:
+            self._building = True
+            self._pending = []
+        try:
+            names = {}
+            postings = {}
+            for product_id, name in rows:
+                names[product_id] = name
+                for term in name_terms(name):
+                    postings.setdefault(term, array('q')).append(product_id)
+            words = sorted(postings)
+            postings = [
+                ids[0] if len(ids) == 1 else array('q', sorted(ids))
+                for ids in map(postings.pop, words)
+            ]
+        except Exception:
+            with self._lock:
+                self._building = False
+                self._pending = []
+            raise
+
+        with self._lock:
+            self._names, self._words, self._postings = names, words, postings
+            self._version, self._built_at = version, time.monotonic()
+            self._ready = True
+            self._building = False
+            pending, self._pending = self._pending, []
+            for method, args in pending:
+                method(*args)
+        logger.info(
+            f"Built the product autocomplete index: {len(names)} products, "
+            f"{len(words)} words."
+        )
+
+    def ensure_built(self):
+        """
+        Builds the index on first use; concurrent first lookups wait for a
+        single build.
+        """
+        if not self._ready:
+            with self._build_lock:
+                if not self._ready:
+                    self.build()
+
+    def is_outdated(self):
+        """
+        Tells whether the catalog changed since the build and the rebuild
+        interval has passed.
+        """
+        if (
+            self._version is None
+            or time.monotonic() - self._built_at
+            < settings.AUTOCOMPLETE_REBUILD_SECONDS
+        ):
+            return False
+        return product_cache.version() != self._version
+
+    def ensure_current(self):
+        """
+        Builds the index on first use, and rebuilds it when another process
+        changed the catalog (see the class docstring). Only one thread rebuilds;
+        the others keep using the current index.
+        """
+        self.ensure_built()
+        if self.is_outdated() and self._build_lock.acquire(blocking=False):
+            try:
+                if self.is_outdated():
+                    self.build()
+            finally:
+                self._build_lock.release()
+
+    def clear(self):
+        """Drops the index; the next lookup rebuilds it from the database."""
+        with self._lock:
+            self._words, self._postings, self._names = [], [], {}
+            self._ready = False
+
+    def update(self, product_id, name):
+        """Indexes a created or renamed product."""
+        with self._lock:
+            if self._building:
+                self._pending.append((self.update, (product_id, name)))
+            if not self._ready:
+                return
+            old = self._names.get(product_id)
+            if old == name:
+                return
+            old_terms = name_terms(old) if old is not None else set()
+            new_terms = name_terms(name)
+            for term in old_terms - new_terms:
+                self._remove_posting(term, product_id)
+            for term in new_terms - old_terms:
+                self._add_posting(term, product_id)
+            self._names[product_id] = name
+
+    def discard(self, product_id):
+        """Removes a deleted product."""
+        with self._lock:
+            if self._building:
+                self._pending.append((self.discard, (product_id,)))
+            if not self._ready:
+                return
+            name = self._names.pop(product_id, None)
+            if name is not None:
+                for term in name_terms(name):
+                    self._remove_posting(term, product_id)
+
+    def _add_posting(self, term, product_id):
+        position = bisect_left(self._words, term)
+        if position == len(self._words) or self._words[position] != term:
+            self._words.insert(position, term)
+            self._postings.insert(position, product_id)
+            return
+        entry = self._postings[position]
+        if isinstance(entry, int):
+            self._postings[position] = array('q', sorted((entry, product_id)))
+        else:
+            insort(entry, product_id)
+
+    def _remove_posting(self, term, product_id):
+        position = bisect_left(self._words, term)
+        entry = self._postings[position]
+        if isinstance(entry, int):
+            del self._words[position]
+            del self._postings[position]
+            return
+        entry.pop(bisect_left(entry, product_id))
+        if len(entry) == 1:
+            self._postings[position] = entry[0]
+
+    def _prefix_range(self, prefix):
+        start = bisect_left(self._words, prefix)
+        # Every word starting with `prefix` sorts before `prefix` followed by
+        # the largest code point.
+        return start, bisect_left(self._words, prefix + '\U0010ffff', start)
+
+    def lookup(self, query, limit=10):
+        """
+        Returns up to `limit` products whose name has a word starting with every
+        word of `query`, e.g. `toy bra` matches "Toyota Brake Pad Set".
+
+        Candidates come from the longest query word, the most selective one; the
+        other words are checked against the candidates' names. Products are
+        returned in the order of the word they matched, then by ID.
+
+        Returns:
+            list: `{'id': ..., 'name': ...}` dicts.
+        """
+        terms = sorted(
+            set(TERM_RE.findall(query.casefold())), key=len, reverse=True
+        )
+        if not terms or limit < 1:
+            return []
+        self.ensure_current()
+
+        lead, others = terms[0], terms[1:]
+        results = []
+        seen = set()
+        with self._lock:
+            start, end = self._prefix_range(lead)
+            for position in range(start, end):
+                for product_id in posting_ids(self._postings[position]):
+                    if product_id in seen:
+                        continue
+                    seen.add(product_id)
+                    name = self._names[product_id]
+                    if others and not matches_all(name, others):
+                        if len(seen) >= MAX_SCANNED:
+                            return results
+                        continue
+                    results.append({'id': product_id, 'name': name})
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def stats(self):
+        """Returns the size of the index."""
+        with self._lock:
+            return {
+                'ready': self._ready,
+                'products': len(self._names),
+                'words': len(self._words),
+                'postings': sum(
+                    len(posting_ids(entry)) for entry in self._postings
+                ),
+            }
+
+
+product_index = PrefixIndex()
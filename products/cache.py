@@ -0,0 +1,34 @@
+from django.conf import settings
+
+from autocompany.cache import VersionedCache
+
+
+class ProductCache(VersionedCache):
+    """
+    Versioned cache for product list and detail responses.
+
+    The backend and entry lifetime come from settings.PRODUCT_CACHE_ALIAS and
+    settings.PRODUCT_CACHE_TIMEOUT. The version is bumped whenever a Product is
+    saved or deleted (see products/signals.py); queryset `update()` and bulk
+    operations do not send those signals and must call
+    `product_cache.invalidate_on_commit()` themselves.
+
+    Stock movements of carts and checkouts (orders/stock.py) only change
+    `stock_quantity`, so they invalidate the detail entries (and detail ETags)
+    of the products touched and the listings (`invalidate_objects_on_commit`),
+    not the whole namespace: the details of other products stay cached, while
+    listing pages, whose stock and `in_stock` filter depend on any product, are
+    rebuilt on their next request.
+    """
+    namespace = 'products'
+
+    @property
+    def alias(self):
+        return settings.PRODUCT_CACHE_ALIAS
+
+    @property
+    def timeout(self):
+        return settings.PRODUCT_CACHE_TIMEOUT
+
+
+product_cache = ProductCache()
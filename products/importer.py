@@ -0,0 +1,239 @@
+import csv
+import json
+import logging
+from itertools import islice
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+
+from .autocomplete import product_index
+from .cache import product_cache
+from .models import Product
+from .serializers import ProductImportSerializer
+
+logger = logging.getLogger(__name__)
+
+FEED_FORMATS = ('csv', 'jsonl')
+UPSERT_FIELDS = ['name', 'description', 'price', 'stock_quantity']
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportResult:
+    """
+    Running totals of a feed import.
+
+    Attributes:
+        rows (int): Rows read from the feed.
+        created (int): Products inserted.
+        updated (int): Existing products (matched by SKU) overwritten.
+        failed (int): Rows rejected by validation.
+        errors (list): The first MAX_REPORTED_ERRORS validation errors with
+            their line numbers.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+def feed_format_for(filename, default='csv'):
+    """
+    Guesses the feed format from a file name, e.g. `parts.jsonl` -> `jsonl`.
+    """
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+
+def read_feed(stream, feed_format):
+    """
+    Lazily yields `(line_number, row)` pairs from a text stream, one row at a
+    time. Lines that are not a JSON object are yielded as
+    `{'__error__': message}` rows.
+
+    Args:
+        stream: A text file object.
+        feed_format (str): `csv` (with a header row) or `jsonl` (one JSON object
+            per line).
+    """
+    if feed_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif feed_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, {'__error__': f'Invalid JSON: {e}'}
+                continue
+            if not isinstance(row, dict):
+                row = {'__error__': 'Expected a JSON object.'}
+            yield line_number, row
+    else:
+        raise ValueError(f"Unsupported feed format: {feed_format}")
+
+
+def reserved_quantities(product_ids):
+    """
+    Returns the units held by live stock reservations of carts
+    (orders.StockReservation) per product. Those units have already been taken
+    off `stock_quantity`.
+    """
+    StockReservation = apps.get_model('orders', 'StockReservation')
+    return dict(
+        StockReservation.objects.filter(product_id__in=product_ids)
+        .values('product_id')
+        .annotate(reserved=Sum('quantity'))
+        .values_list('product_id', 'reserved')
+    )
+
+
+def upsert_products(rows):
+    """
+    Writes a chunk of validated rows keyed by SKU: products whose SKU exists are
+    overwritten with `bulk_update`, the others are inserted with `bulk_create`.
+    A chunk that loses a race against a concurrent import (unique SKU) is
+    retried once.
+
+    The feed's `stock_quantity` is the stock on hand, while the column holds the
+    stock left after cart reservations, which hand their units back when they
+    expire or are removed. Existing products therefore get the feed stock minus
+    their reserved units. Their rows are locked first, so reservations taken or
+    released meanwhile wait for the chunk and apply to the new value.
+
+    Args:
+        rows (dict): Maps SKUs to validated field values.
+
+    Returns:
+        tuple: The number of created and updated products.
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                existing = dict(
+                    Product.objects.select_for_update()
+                    .filter(sku__in=rows)
+                    .order_by('pk')
+                    .values_list('sku', 'pk')
+                )
+                reserved = reserved_quantities(existing.values())
+                updates = []
+                for sku, pk in existing.items():
+                    data = dict(rows[sku])
+                    held = reserved.get(pk, 0)
+                    if held > data['stock_quantity']:
+                        logger.warning(
+                            f"Feed stock of {sku} ({data['stock_quantity']}) "
+                            f"is below the {held} units reserved in carts."
+                        )
+                    data['stock_quantity'] = max(
+                        data['stock_quantity'] - held, 0
+                    )
+                    updates.append(Product(pk=pk, **data))
+                Product.objects.bulk_update(
+                    updates,
+                    UPSERT_FIELDS,
+                    batch_size=500
+                )
+                Product.objects.bulk_create(
+                    [
+                        Product(**data)
+                        for sku, data in rows.items()
+                        if sku not in existing
+                    ],
+                    batch_size=500,
+                )
+            return len(rows) - len(existing), len(existing)
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+def index_names_on_commit(rows):
+    """
+    Refreshes the autocomplete index for an upserted chunk, which bypassed the
+    model signals.
+    """
+    names = list(Product.objects.filter(sku__in=rows).values_list('id', 'name'))
+
+    def refresh():
+        for product_id, name in names:
+            product_index.update(product_id, name)
+
+    transaction.on_commit(refresh)
+
+
+def import_products(rows, chunk_size=1000, progress=None):
+    """
+    Validates and upserts a stream of product rows chunk by chunk, so memory
+    stays bounded by the chunk size whatever the size of the feed.
+
+    Rows are validated with ProductImportSerializer (the ProductSerializer
+    rules, e.g. non-negative prices). Within a chunk, the last row for a SKU
+    wins.
+
+    Args:
+        rows: An iterable of `(line_number, row)` pairs, e.g. from `read_feed`.
+        chunk_size (int): Rows validated and written per transaction.
+        progress (callable): Called with the ImportResult after every chunk.
+
+    Returns:
+        ImportResult: The totals of the import.
+    """
+    result = ImportResult()
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        valid = {}
+        for line_number, row in chunk:
+            result.rows += 1
+            if '__error__' in row:
+                result.add_error(line_number, row['__error__'])
+                continue
+            serializer = ProductImportSerializer(data=row)
+            if serializer.is_valid():
+                valid[serializer.validated_data['sku']] = (
+                    serializer.validated_data
+                )
+            else:
+                result.add_error(line_number, serializer.errors)
+        if valid:
+            created, updated = upsert_products(valid)
+            result.created += created
+            result.updated += updated
+            product_cache.invalidate_on_commit()
+            index_names_on_commit(valid)
+        if progress:
+            progress(result)
+
+    logger.info(
+        f"Imported product feed: {result.rows} rows, {result.created} created, "
+        f"{result.updated} updated, {result.failed} failed."
+    )
+    return result
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import (
+    FEED_FORMATS,
+    feed_format_for,
+    import_products,
+    read_feed,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams a CSV or JSONL product feed into the Product table, upserting '
+        'by SKU'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the feed file')
+        parser.add_argument(
+            '--format',
+            choices=FEED_FORMATS,
+            help='Feed format (guessed from the file extension by default)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows validated and written per transaction',
+        )
+
+    def handle(self, *args, **options):
+        feed_format = options['format'] or feed_format_for(options['path'])
+
+        def progress(result):
+            self.stdout.write(
+                f"{result.rows} rows read: {result.created} created, "
+                f"{result.updated} updated, {result.failed} failed"
+            )
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as stream:
+                result = import_products(
+                    read_feed(stream, feed_format),
+                    chunk_size=options['chunk_size'],
+                    progress=progress,
+                )
+        except OSError as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        for error in result.errors:
+            self.stderr.write(f"Line {error['line']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.rows} rows: {result.created} created, "
+                f"{result.updated} updated, {result.failed} failed."
+            )
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.3 on 2026-10-17 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, help_text='The supplier part number, used as the key when importing catalog feeds.', max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -5,15 +5,35 @@ logger = logging.getLogger(__name__)
 
 class Product(models.Model):
     """
-    Represents a product with attributes for name, description, price, and stock quantity.
-    The model includes fields for storing product details and methods for product representation.
+    Represents a product with attributes for part number (SKU), name,
+    description, price, and stock quantity. The model includes fields for
+    storing product details and methods for product representation.
     """
 
+    sku = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text=(
+            "The supplier part number, used as the key when importing catalog "
+            "feeds."
+        ),
+    )
     name = models.CharField(max_length=255)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock_quantity = models.PositiveIntegerField()
 
+    class Meta:
+        indexes = [
+            # Catalog filters: price ranges and in-stock listings.
+            models.Index(fields=['price'], name='product_price_idx'),
+            models.Index(
+                fields=['stock_quantity'], name='product_stock_quantity_idx'
+            ),
+        ]
+
     def __str__(self):
         """
         Returns a string representation of the product, primarily the product name.
@@ -0,0 +1,90 @@
+import re
+
+from django.db import connections
+
+SEARCH_CONFIG = 'english'
+SQLITE_FTS_TABLE = 'products_product_fts'
+POSTGRES_SEARCH_INDEX = 'product_search_idx'
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_vector():
+    """
+    The PostgreSQL document searched by `?q=`. It must stay identical to the
+    expression of the GIN index created in products migration 0004 for the
+    planner to use that index.
+    """
+    from django.contrib.postgres.search import SearchVector
+
+    return SearchVector('name', 'description', config=SEARCH_CONFIG)
+
+
+def fts5_query(query):
+    """
+    Turns free text into an FTS5 query that matches products containing every
+    word, quoting each word so user input cannot inject FTS5 operators.
+    """
+    return ' '.join('"%s"' % term for term in TERM_RE.findall(query))
+
+
+def search_products(queryset, query):
+    """
+    Filters `queryset` to products whose name or description match `query` and
+    orders them by relevance, best match first.
+
+    Uses a `tsvector` GIN index on PostgreSQL and the FTS5 table kept in sync by
+    triggers on SQLite (both created by products migration 0004).
+
+    Args:
+        queryset (QuerySet): The Product queryset to search.
+        query (str): Free text entered by the client.
+
+    Returns:
+        QuerySet: The matching products, annotated with `search_rank`.
+    """
+    # The vendor of the database the queryset reads from, which may be a
+    # replica.
+    if connections[queryset.db].vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='plain'
+        )
+        return (
+            queryset.annotate(search=search_vector())
+            .filter(search=search_query)
+            .annotate(search_rank=SearchRank(search_vector(), search_query))
+            .order_by('-search_rank', 'id')
+        )
+
+    match = fts5_query(query)
+    if not match:
+        return queryset.none()
+    # bm25() ranks are negative: the smaller, the better the match.
+    return queryset.extra(
+        tables=[SQLITE_FTS_TABLE],
+        where=[
+            f'{SQLITE_FTS_TABLE}.rowid = products_product.id',
+            f'{SQLITE_FTS_TABLE} MATCH %s',
+        ],
+        params=[match],
+        select={'search_rank': f'bm25({SQLITE_FTS_TABLE})'},
+    ).order_by('search_rank', 'id')
+
+
+def filter_products(queryset, filters):
+    """
+    Applies the validated query parameters of ProductSearchSerializer to a
+    Product queryset: price range, stock and, last, the full-text search that
+    orders the results by relevance.
+    """
+    if 'min_price' in filters:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if 'max_price' in filters:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    if filters.get('in_stock'):
+        queryset = queryset.filter(stock_quantity__gt=0)
+    if filters.get('q', '').strip():
+        queryset = search_products(queryset, filters['q'])
+    return queryset
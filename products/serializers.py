@@ -9,12 +9,15 @@ class ProductSerializer(serializers.ModelSerializer):
     """
     Serializer for the Product model.
     
-    Serializes fields: id, name, description, price, and stock_quantity to Python data types for easy rendering to JSON or other content types. Also handles deserialization back to complex types after validating the incoming data.
+    Serializes fields: id, sku, name, description, price, and stock_quantity to
+    Python data types for easy rendering to JSON or other content types. Also
+    handles deserialization back to complex types after validating the incoming
+    data.
     """
     
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'stock_quantity']
+        fields = ['id', 'sku', 'name', 'description', 'price', 'stock_quantity']
 
     # Example of a method with error handling (theoretical)
     def validate_price(self, value):
@@ -34,3 +37,69 @@ class ProductSerializer(serializers.ModelSerializer):
             logger.error(f"Validation error: Negative price value {value} submitted.")
             raise serializers.ValidationError("Price must be a positive number.")
         return value
+
+
+class ProductImportSerializer(ProductSerializer):
+    """
+    Serializer for validating rows of a product feed.
+
+    Applies the same rules as ProductSerializer, but the SKU is required and is
+    not checked for uniqueness: rows whose SKU already exists update that
+    product instead of failing.
+    """
+    sku = serializers.CharField(max_length=64)
+
+    class Meta(ProductSerializer.Meta):
+        fields = ['sku', 'name', 'description', 'price', 'stock_quantity']
+
+
+class ProductSearchSerializer(serializers.Serializer):
+    """
+    Validates the search and filter query parameters of the product listing.
+    """
+    q = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        max_length=200,
+        help_text=(
+            'Full-text search on name and description; results are ranked by '
+            'relevance'
+        ),
+    )
+    min_price = serializers.DecimalField(
+        required=False,
+        max_digits=10,
+        decimal_places=2,
+        min_value=0,
+        help_text='Lowest price to include',
+    )
+    max_price = serializers.DecimalField(
+        required=False,
+        max_digits=10,
+        decimal_places=2,
+        min_value=0,
+        help_text='Highest price to include',
+    )
+    in_stock = serializers.BooleanField(
+        required=False, help_text='Only include products with stock left'
+    )
+
+
+class ProductAutocompleteSerializer(serializers.Serializer):
+    """
+    Validates the query parameters of the product name typeahead.
+    """
+    q = serializers.CharField(
+        max_length=100,
+        help_text=(
+            'What the client typed so far; every word is matched as a prefix '
+            'of a word of the name'
+        ),
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        default=10,
+        min_value=1,
+        max_value=50,
+        help_text='Maximum number of suggestions',
+    )
@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import product_index
+from .cache import product_cache
+from .models import Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    """
+    Drops every cached product page once a product is created, changed or
+    deleted.
+    """
+    product_cache.invalidate_on_commit()
+
+
+@receiver(post_save, sender=Product)
+def index_product_name(sender, instance, **kwargs):
+    """
+    Adds a created or renamed product to the autocomplete index once the change
+    commits.
+    """
+    product_id, name = instance.pk, instance.name
+    transaction.on_commit(lambda: product_index.update(product_id, name))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_name(sender, instance, **kwargs):
+    """
+    Removes a deleted product from the autocomplete index once the deletion
+    commits.
+    """
+    product_id = instance.pk
+    transaction.on_commit(lambda: product_index.discard(product_id))
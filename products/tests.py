@@ -1,3 +1,631 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .autocomplete import PrefixIndex, product_index
+from .cache import product_cache
+from .importer import import_products, read_feed
+from autocompany.rendering import FastJSONRenderer, values_rows
+from .models import Product
+from .serializers import ProductSerializer
+
+
+class ProductTestMixin:
+    """Shared fixtures for the products test cases."""
+
+    def setUp(self):
+        super().setUp()
+        caches[product_cache.alias].clear()
+        product_cache.reset_stats()
+        product_index.clear()
+        self.client = APIClient()
+
+    @classmethod
+    def create_products(cls, count, stock_quantity=10):
+        return Product.objects.bulk_create(
+            Product(
+                name=f'Toyota Part {i}',
+                description=f'Toyota part number {i}.',
+                price=Decimal('10.00') + i,
+                stock_quantity=stock_quantity
+            )
+            for i in range(count)
+        )
+
+
+class KeysetPaginationTests(ProductTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_products(25)
+
+    def test_default_listing_keeps_page_numbers(self):
+        response = self.client.get('/products/')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_cursor_pages_cover_the_catalog_without_count(self):
+        seen = []
+        url = '/products/?pagination=cursor&page_size=7'
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(
+            seen, sorted(Product.objects.values_list('id', flat=True))
+        )
+
+    def test_page_size_is_bounded(self):
+        Product.objects.bulk_create(
+            Product(
+                name=f'Bulk Part {i}',
+                description='',
+                price=Decimal('1.00'),
+                stock_quantity=1,
+            )
+            for i in range(120)
+        )
+        response = self.client.get(
+            '/products/?pagination=cursor&page_size=1000'
+        )
+        self.assertEqual(len(response.data['results']), 100)
+
+
+class ProductCacheTests(ProductTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = cls.create_products(3)[0]
+
+    def test_repeated_reads_are_served_from_cache(self):
+        for url in ('/products/', f'/products/{self.product.pk}/'):
+            first = self.client.get(url)
+            self.assertEqual(first['X-Cache'], 'MISS')
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second['X-Cache'], 'HIT')
+            self.assertEqual(second.data, first.data)
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get('/products/?page=1')
+        self.assertEqual(self.client.get('/products/?page=1')['X-Cache'], 'HIT')
+        self.assertEqual(
+            self.client.get('/products/?pagination=cursor')['X-Cache'], 'MISS'
+        )
+
+    def test_price_change_invalidates_list_and_detail(self):
+        self.client.get('/products/')
+        self.client.get(f'/products/{self.product.pk}/')
+        self.product.price = Decimal('99.99')
+        self.product.save()
+        detail = self.client.get(f'/products/{self.product.pk}/')
+        self.assertEqual(detail['X-Cache'], 'MISS')
+        self.assertEqual(detail.data['price'], '99.99')
+        listing = self.client.get('/products/')
+        self.assertIn(
+            '99.99', [row['price'] for row in listing.data['results']]
+        )
+
+    def test_delete_invalidates_detail(self):
+        self.client.get(f'/products/{self.product.pk}/')
+        self.product.delete()
+        self.assertEqual(
+            self.client.get(f'/products/{self.product.pk}/').status_code, 404
+        )
+
+    def test_stats_are_admin_only(self):
+        self.client.get('/products/')
+        self.client.get('/products/')
+        self.assertEqual(
+            self.client.get('/products/cache-stats/').status_code, 403
+        )
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'secret'
+        )
+        self.client.force_authenticate(admin)
+        stats = self.client.get('/products/cache-stats/').data
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+
+class ConditionalGetTests(ProductTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = cls.create_products(3)[0]
+
+    def test_matching_etag_returns_not_modified_without_queries(self):
+        for url in ('/products/', f'/products/{self.product.pk}/'):
+            response = self.client.get(url)
+            self.assertIn('ETag', response)
+            self.assertIn('Last-Modified', response)
+            with self.assertNumQueries(0):
+                not_modified = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified.content, b'')
+
+    def test_if_modified_since_returns_not_modified(self):
+        response = self.client.get('/products/')
+        not_modified = self.client.get(
+            '/products/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_etag_depends_on_the_query_string(self):
+        first = self.client.get('/products/?page=1')
+        second = self.client.get('/products/?pagination=cursor')
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_product_change_produces_a_new_etag(self):
+        etag = self.client.get(f'/products/{self.product.pk}/')['ETag']
+        self.product.price = Decimal('12.34')
+        self.product.save()
+        response = self.client.get(
+            f'/products/{self.product.pk}/', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ProductImportTests(ProductTestMixin, TestCase):
+
+    CSV_FEED = (
+        'sku,name,description,price,stock_quantity\n'
+        'TOY-001,Toyota Air Filter,Air filter.,25.99,50\n'
+        'TOY-002,Toyota Oil Filter,Oil filter.,15.75,75\n'
+        'TOY-003,Toyota Broken Part,Negative price.,-1.00,5\n'
+        'TOY-001,Toyota Air Filter v2,Air filter.,27.50,40\n'
+    )
+
+    def import_csv(self, feed, chunk_size=1000):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', delete=False
+        ) as handle:
+            handle.write(feed)
+        self.addCleanup(os.remove, handle.name)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command(
+            'import_products',
+            handle.name,
+            chunk_size=chunk_size,
+            stdout=stdout,
+            stderr=stderr,
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_command_upserts_by_sku_and_reports_errors(self):
+        stdout, stderr = self.import_csv(self.CSV_FEED)
+        self.assertIn('4 rows: 2 created, 0 updated, 1 failed', stdout)
+        self.assertIn('Line 4', stderr)
+        self.assertEqual(
+            set(Product.objects.values_list('sku', 'name', 'price')),
+            {
+                ('TOY-001', 'Toyota Air Filter v2', Decimal('27.50')),
+                ('TOY-002', 'Toyota Oil Filter', Decimal('15.75')),
+            },
+        )
+
+        stdout, _ = self.import_csv(
+            'sku,name,description,price,stock_quantity\nTOY-002,Toyota Oil '
+            'Filter,New.,16.00,70\n'
+        )
+        self.assertIn('1 rows: 0 created, 1 updated, 0 failed', stdout)
+        self.assertEqual(
+            Product.objects.get(sku='TOY-002').price, Decimal('16.00')
+        )
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_feed_stock_leaves_out_reserved_units(self):
+        self.import_csv(self.CSV_FEED)
+        user = User.objects.create_user(
+            'garage', 'garage@example.com', 'secret'
+        )
+        self.client.force_login(user)
+        product = Product.objects.get(sku='TOY-002')
+        self.client.post(
+            '/add-to-cart/', {'product_id': product.pk, 'quantity': 5}
+        )
+
+        self.import_csv(
+            'sku,name,description,price,stock_quantity\nTOY-002,Toyota Oil '
+            'Filter,Oil filter.,15.75,70\n'
+        )
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 65)
+        self.client.post('/remove-from-cart/', {'product_id': product.pk})
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 66)
+
+    def test_command_reports_progress_per_chunk(self):
+        stdout, _ = self.import_csv(self.CSV_FEED, chunk_size=2)
+        self.assertIn('2 rows read', stdout)
+        self.assertIn('4 rows read', stdout)
+
+    def test_import_invalidates_the_product_cache(self):
+        self.client.get('/products/')
+        self.import_csv(self.CSV_FEED)
+        response = self.client.get('/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_api_import_is_admin_only_and_accepts_jsonl(self):
+        feed = (
+            b'{"sku": "TOY-010", "name": "Toyota Radiator", "description": '
+            b'"Radiator.", "price": 130, "stock_quantity": 25}\n'
+            b'not json\n'
+        )
+        upload = SimpleUploadedFile('feed.jsonl', feed)
+        self.assertEqual(
+            self.client.post('/products/import/', {'file': upload}).status_code,
+            403,
+        )
+
+        self.client.force_authenticate(
+            User.objects.create_superuser(
+                'admin', 'admin@example.com', 'secret'
+            )
+        )
+        upload.seek(0)
+        response = self.client.post('/products/import/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.data['created'], response.data['failed']), (1, 1)
+        )
+        self.assertEqual(response.data['errors'][0]['line'], 2)
+        self.assertEqual(
+            Product.objects.get(sku='TOY-010').price, Decimal('130.00')
+        )
+
+    def test_jsonl_rows_that_are_not_objects_are_reported(self):
+        feed = io.StringIO(
+            '5\nnull\n[]\n"TOY-011"\n'
+            '{"sku": "TOY-011", "name": "Toyota Fan Belt", '
+            '"description": "Belt.", "price": 12, "stock_quantity": 3}\n'
+        )
+        result = import_products(read_feed(feed, 'jsonl'))
+        self.assertEqual((result.created, result.failed), (1, 4))
+        self.assertEqual(
+            [error['line'] for error in result.errors], [1, 2, 3, 4])
+        self.assertEqual(
+            result.errors[0]['errors'], 'Expected a JSON object.')
+
+
+class ProductSearchTests(ProductTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        rows = [
+            (
+                'Toyota Brake Pad Set',
+                'Durable brake pads for enhanced safety.',
+                '45.00',
+                100,
+            ),
+            (
+                'Toyota Brake Disc',
+                'Ventilated disc for the front axle.',
+                '80.00',
+                0,
+            ),
+            (
+                'Toyota Air Filter',
+                'Keeps dust out of the engine; not a brake part.',
+                '25.99',
+                50,
+            ),
+            (
+                'Toyota Oil Filter',
+                'Ensures clean oil circulates through the engine.',
+                '15.75',
+                75,
+            ),
+        ]
+        cls.products = {
+            name: Product.objects.create(
+                name=name,
+                description=description,
+                price=Decimal(price),
+                stock_quantity=stock,
+            )
+            for name, description, price, stock in rows
+        }
+
+    def names(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['name'] for row in response.data['results']]
+
+    def test_search_matches_name_and_description_ranked_by_relevance(self):
+        names = self.names('/products/?q=brake')
+        self.assertEqual(
+            set(names),
+            {'Toyota Brake Pad Set', 'Toyota Brake Disc', 'Toyota Air Filter'},
+        )
+        self.assertEqual(names[-1], 'Toyota Air Filter')
+
+    def test_search_requires_every_word(self):
+        self.assertEqual(
+            self.names('/products/?q=brake pads'), ['Toyota Brake Pad Set']
+        )
+        self.assertEqual(self.names('/products/?q=turbocharger'), [])
+
+    def test_search_input_cannot_inject_operators(self):
+        self.assertEqual(self.names('/products/?q=brake" OR "oil'), [])
+        self.assertEqual(self.names('/products/?q=*'), [])
+
+    def test_search_follows_product_changes(self):
+        product = self.products['Toyota Oil Filter']
+        product.name = 'Toyota Turbocharger'
+        product.save()
+        self.assertEqual(
+            self.names('/products/?q=turbocharger'), ['Toyota Turbocharger']
+        )
+        product.delete()
+        self.assertEqual(self.names('/products/?q=turbocharger'), [])
+
+    def test_price_and_stock_filters(self):
+        self.assertEqual(
+            set(self.names('/products/?min_price=20&max_price=50')),
+            {'Toyota Brake Pad Set', 'Toyota Air Filter'}
+        )
+        self.assertNotIn(
+            'Toyota Brake Disc', self.names('/products/?q=brake&in_stock=true')
+        )
+        self.assertIn(
+            'Toyota Brake Disc', self.names('/products/?q=brake&in_stock=false')
+        )
+
+    def test_search_results_are_paginated(self):
+        response = self.client.get('/products/?q=toyota&page_size=2')
+        self.assertEqual(response.data['count'], 4)
+        cursor = self.client.get(
+            '/products/?q=toyota&pagination=cursor&page_size=2'
+        )
+        self.assertEqual(len(cursor.data['results']), 2)
+        self.assertIsNotNone(cursor.data['next'])
+
+    def test_invalid_filters_are_rejected(self):
+        self.assertEqual(
+            self.client.get('/products/?min_price=cheap').status_code, 400
+        )
+
+
+class ProductAutocompleteTests(ProductTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.brake_pads = Product.objects.create(
+            name='Toyota Brake Pad Set',
+            description='Pads.',
+            price=Decimal('45.00'),
+            stock_quantity=10,
+        )
+        cls.brake_disc = Product.objects.create(
+            name='Toyota Brake Disc',
+            description='Disc.',
+            price=Decimal('80.00'),
+            stock_quantity=10,
+        )
+        cls.filter = Product.objects.create(
+            name='Honda Air Filter',
+            description='Filter.',
+            price=Decimal('25.99'),
+            stock_quantity=10,
+        )
+
+    def suggest(self, query, **params):
+        response = self.client.get(
+            '/products/autocomplete/', {'q': query, **params}
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['name'] for row in response.data]
+
+    def test_every_word_is_matched_as_a_prefix(self):
+        self.assertEqual(
+            self.suggest('bra'), ['Toyota Brake Pad Set', 'Toyota Brake Disc']
+        )
+        self.assertEqual(self.suggest('TOY bra p'), ['Toyota Brake Pad Set'])
+        self.assertEqual(self.suggest('filt'), ['Honda Air Filter'])
+        self.assertEqual(self.suggest('turbo'), [])
+
+    def test_limit_caps_the_suggestions(self):
+        self.assertEqual(len(self.suggest('toyota', limit=1)), 1)
+        self.assertEqual(
+            self.client.get(
+                '/products/autocomplete/', {'q': 'toy', 'limit': 500}
+            ).status_code,
+            400,
+        )
+        self.assertEqual(
+            self.client.get('/products/autocomplete/').status_code, 400
+        )
+
+    def test_lookups_do_not_query_the_database_once_built(self):
+        self.suggest('toy')
+        with CaptureQueriesContext(connection) as queries:
+            self.suggest('brake d')
+        self.assertEqual(len(queries), 0)
+
+    def test_index_follows_saves_and_deletes_after_commit(self):
+        self.suggest('toy')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brake_disc.name = 'Toyota Rotor'
+            self.brake_disc.save()
+            Product.objects.create(
+                name='Nissan Brake Hose',
+                description='Hose.',
+                price=Decimal('9.00'),
+                stock_quantity=1,
+            )
+        self.assertEqual(
+            self.suggest('brake'), ['Toyota Brake Pad Set', 'Nissan Brake Hose']
+        )
+        self.assertEqual(self.suggest('rot'), ['Toyota Rotor'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brake_pads.delete()
+        self.assertEqual(self.suggest('brake'), ['Nissan Brake Hose'])
+        self.assertEqual(self.suggest('pad'), [])
+
+    def test_changes_made_by_other_processes_rebuild_the_index(self):
+        self.suggest('toy')
+        # Another process renames a product: this process only sees the product
+        # cache version move.
+        Product.objects.filter(pk=self.brake_disc.pk).update(
+            name='Toyota Rotor'
+        )
+        product_cache.invalidate()
+        self.assertEqual(
+            self.suggest('rot'), []
+        )  # within AUTOCOMPLETE_REBUILD_SECONDS of the build
+        with override_settings(AUTOCOMPLETE_REBUILD_SECONDS=0):
+            self.assertEqual(self.suggest('rot'), ['Toyota Rotor'])
+
+    def test_imported_products_are_indexed(self):
+        self.suggest('toy')
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', delete=False
+        ) as handle:
+            handle.write(
+                'sku,name,description,price,stock_quantity\nSUB-1,Subaru '
+                'Timing Belt,Belt.,30.00,5\n'
+            )
+        self.addCleanup(os.remove, handle.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_products', handle.name, stdout=io.StringIO())
+        self.assertEqual(self.suggest('timing'), ['Subaru Timing Belt'])
+
+    def test_writes_during_a_build_are_replayed(self):
+        index = PrefixIndex()
+
+        def rows():
+            yield 1, 'Toyota Brake Pad Set'
+            index.update(2, 'Toyota Brake Disc')
+            index.discard(1)
+            yield 3, 'Honda Air Filter'
+
+        index.build(rows())
+        self.assertEqual(
+            index.lookup('brake'), [{'id': 2, 'name': 'Toyota Brake Disc'}]
+        )
+        self.assertEqual(
+            index.stats(),
+            {'ready': True, 'products': 2, 'words': 6, 'postings': 6},
+        )
+
+
+class AsyncProductTests(ProductTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = cls.create_products(12)
+
+    async def test_list_matches_the_sync_endpoint(self):
+        for query in (
+            '',
+            '?page=2',
+            '?q=toyota&min_price=12',
+            '?pagination=cursor&page_size=5',
+        ):
+            expected = await sync_to_async(self.client.get)(
+                f'/products/{query}'
+            )
+            response = await AsyncClient().get(f'/async/products/{query}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response.content.replace(b'/async/', b'/'), expected.content)
+            self.assertEqual(
+                response['Content-Type'], expected['Content-Type'])
+
+    async def test_detail_and_errors(self):
+        path = f'/products/{self.products[0].pk}/'
+        expected = await sync_to_async(self.client.get)(path)
+        response = await AsyncClient().get(f'/async{path}')
+        self.assertEqual(response.json()['name'], 'Toyota Part 0')
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response['Vary'], 'Accept')
+        missing = await sync_to_async(self.client.get)('/products/999999/')
+        response = await AsyncClient().get('/async/products/999999/')
+        self.assertEqual(response.content, missing.content)
+        self.assertEqual(
+            (await AsyncClient().get('/async/products/999999/')).status_code,
+            404,
+        )
+        self.assertEqual(
+            (await AsyncClient().get('/async/products/?page=99')).status_code,
+            404,
+        )
+        self.assertEqual(
+            (
+                await AsyncClient().get('/async/products/?min_price=cheap')
+            ).status_code,
+            400,
+        )
+        self.assertEqual(
+            (await AsyncClient().post('/async/products/')).status_code, 405
+        )
+
+
+class ValuesListTests(ProductTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_products(12)
+        Product.objects.create(
+            sku='BRK-1',
+            name='Bremsbeläge — vorne',
+            description='Ü',
+            price=Decimal('0.50'),
+            stock_quantity=0,
+        )
+
+    def get_both(self, path):
+        """
+        Returns the content of `path` served from .values() rows and through the
+        serializer.
+        """
+        with override_settings(FAST_LIST_RESPONSES=True):
+            fast = self.client.get(path)
+        caches[product_cache.alias].clear()
+        slow = self.client.get(path)
+        self.assertEqual(fast.status_code, 200)
+        self.assertIs(type(fast.accepted_renderer), FastJSONRenderer)
+        self.assertIs(type(slow.accepted_renderer), JSONRenderer)
+        return fast.content, slow.content
+
+    def test_rows_match_the_serializer(self):
+        queryset = Product.objects.order_by('id')
+        plan = values_rows(ProductSerializer)
+        self.assertEqual(
+            plan.rows(plan.values(queryset)),
+            ProductSerializer(queryset, many=True).data,
+        )
+
+    def test_listings_are_byte_identical(self):
+        for path in (
+            '/products/',
+            '/products/?page=2',
+            '/products/?pagination=cursor&page_size=5',
+            '/products/?q=toyota&max_price=15',
+            '/products/?in_stock=false&q=bremsbeläge',
+        ):
+            with self.subTest(path=path):
+                fast, slow = self.get_both(path)
+                self.assertEqual(fast, slow)
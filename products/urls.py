@@ -7,7 +7,7 @@ from django.contrib import admin
 from django.urls import path
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from products import views as product_views
+from products import async_views, views as product_views
 
 
 # Products router
@@ -16,8 +16,13 @@ router.register(r'products', product_views.ProductViewSet)
 
 
 urlpatterns = [
-
     path('', include(router.urls)),
- 
-   
+    path(
+        'async/products/', async_views.product_list, name='async-product-list'
+    ),
+    path(
+        'async/products/<int:pk>/',
+        async_views.product_detail,
+        name='async-product-detail',
+    ),
 ]
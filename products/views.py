@@ -1,13 +1,41 @@
+import csv
+import io
 import logging
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from drf_yasg.utils import swagger_auto_schema
+from autocompany.cache import CachedResponseMixin
+from autocompany.conditional import ConditionalGetMixin
+from autocompany.pagination import KeysetPaginationMixin
+from autocompany.rendering import ValuesListMixin
+from autocompany.routers import ReplicaReadsMixin
 from products.models import Product
-from .serializers import ProductSerializer
+from .autocomplete import product_index
+from .cache import product_cache
+from .importer import FEED_FORMATS, feed_format_for, import_products, read_feed
+from .search import filter_products
+from .serializers import (
+    ProductAutocompleteSerializer,
+    ProductSearchSerializer,
+    ProductSerializer,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-class ProductViewSet(viewsets.ModelViewSet):
+
+class ProductViewSet(
+    ReplicaReadsMixin,
+    KeysetPaginationMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
     """
     Provides a full set of CRUD operations for Product entities using Django REST Framework's ModelViewSet.
     
@@ -15,13 +43,41 @@ class ProductViewSet(viewsets.ModelViewSet):
         queryset: Specifies the list of items for this viewset.
         serializer_class: Defines the serializer class for serializing and deserializing the Product instances.
     
-    Automatically provides `list`, `create`, `retrieve`, `update`, and `destroy` actions.
-    Utilizes DRF's built-in pagination for efficient data retrieval.
+    Automatically provides `list`, `create`, `retrieve`, `update`, and `destroy`
+    actions. Utilizes DRF's built-in pagination for efficient data retrieval;
+    clients paging deep into the catalog can opt in to keyset pagination with
+    `?pagination=cursor`. `list` and `retrieve` responses are served from the
+    product cache, which is invalidated whenever a product is saved or deleted,
+    and carry ETag/Last-Modified validators derived from the cache version so
+    polling clients get 304 Not Modified. The listing supports full-text search
+    (`?q=`) and indexed price/stock filters, and `/products/autocomplete/?q=`
+    serves name suggestions from an in-process prefix index. `list` and
+    `retrieve` read from a replica when replicas are configured
+    (autocompany.routers). Listing pages are built from `.values()` rows rather
+    than model instances (autocompany.rendering).
     """
 
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    keyset_ordering = 'id'
+    response_cache = product_cache
+    conditional_caches = (product_cache,)
+
+    def get_queryset(self):
+        """
+        Applies the search and filter query parameters to the listing. With
+        `?q=` the results are ranked by relevance when paginated by page number;
+        keyset pages are ordered by id.
+        """
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+
+        params = ProductSearchSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return filter_products(queryset, params.validated_data)
 
+    @swagger_auto_schema(query_serializer=ProductSearchSerializer)
     def list(self, request, *args, **kwargs):
         """
         Overrides the list method to provide custom error handling and logging.
@@ -31,6 +87,97 @@ class ProductViewSet(viewsets.ModelViewSet):
             # Pagination is handled by DRF's settings; no need for manual pagination here.
             # Just call the super method and let DRF handle the rest.
             return super().list(request, *args, **kwargs)
+        except APIException:
+            # Invalid filters or cursors are client errors that DRF renders
+            # itself.
+            raise
         except Exception as e:
             logger.error(f"Error fetching product list: {e}")
             return Response({"error": f"Did you enter the correct page number; {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='cache-stats',
+        permission_classes=[IsAdminUser],
+    )
+    def cache_stats(self, request):
+        """
+        Returns the product cache hit/miss counters of the serving process, for
+        sizing the cache.
+        """
+        return Response(product_cache.stats())
+
+    @swagger_auto_schema(query_serializer=ProductAutocompleteSerializer)
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='autocomplete',
+        pagination_class=None,
+    )
+    def autocomplete(self, request):
+        """
+        Suggests products as the client types, e.g. `?q=toy bra` -> "Toyota
+        Brake Pad Set".
+
+        Suggestions come from the in-process prefix index over product names, so
+        these per-keystroke requests never reach the database once the index is
+        built.
+        """
+        params = ProductAutocompleteSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        try:
+            suggestions = product_index.lookup(
+                params.validated_data['q'], params.validated_data['limit']
+            )
+        except Exception as e:
+            logger.error(f"Error looking up product suggestions: {e}")
+            return Response(
+                {'error': 'Suggestions are unavailable.'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        return Response(suggestions)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        permission_classes=[IsAdminUser],
+        parser_classes=[MultiPartParser],
+    )
+    def import_feed(self, request):
+        """
+        Upserts products from an uploaded CSV or JSONL feed (multipart field
+        `file`), keyed by SKU.
+
+        The upload is streamed and processed in chunks, so memory does not grow
+        with the feed size. The format is taken from the optional `feed_format`
+        field or the file extension. Returns the created/updated/failed counts
+        and the first validation errors with their line numbers.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'A feed file is required in the `file` field.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        feed_format = request.data.get('feed_format') or feed_format_for(
+            upload.name
+        )
+        if feed_format not in FEED_FORMATS:
+            formats = ', '.join(FEED_FORMATS)
+            return Response(
+                {'error': f'feed_format must be one of {formats}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+            result = import_products(read_feed(stream, feed_format))
+        except (UnicodeDecodeError, ValueError, csv.Error) as e:
+            logger.error(f"Error importing product feed {upload.name}: {e}")
+            return Response(
+                {'error': f'Could not read the feed: {e}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(result.as_dict(), status=status.HTTP_200_OK)